@@ -1 +1,8 @@
 from .client import AMIEClient, UsageClient
+from .aio import AsyncAMIEClient, AsyncUsageClient
+from .poller import PacketPoller
+from .dispatch import PacketDispatcher
+from .scheduler import PacketScheduler
+from .cache import PacketCache
+from .metrics import ClientMetrics
+from .transport import TransportPolicy
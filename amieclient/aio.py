@@ -0,0 +1,359 @@
+"""
+asyncio versions of the AMIE and Usage clients.
+
+These need the optional aiohttp dependency, which you can install with
+``pip install amieclient[async]``.
+"""
+import json
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .client import AMIEClient, AMIERequestError, UsageClient
+from .packet import PacketList
+from .packet.base import Packet
+from .transaction import Transaction
+from .usage import (UsageResponse, UsageResponseError, FailedUsageResponse,
+                    UsageStatus)
+from .usage.message import MAX_REQUEST_SIZE, _chunk_records
+
+
+def _query_params(params):
+    """
+    Drops parameters with a value of None and turns booleans into strings,
+    to match what requests does with query parameters
+    """
+    return {k: str(v) if isinstance(v, bool) else v
+            for k, v in params.items() if v is not None}
+
+
+class _AsyncClientBase(object):
+    """
+    Manages the aiohttp session shared by the async clients. The session is
+    created on first use, since aiohttp sessions need a running event loop.
+    """
+    def __init__(self, site_name, api_key, connection_limit):
+        if aiohttp is None:
+            raise ImportError('The async clients require aiohttp. Install it '
+                              'with "pip install amieclient[async]"')
+        self.site_name = site_name
+        self._headers = {
+            'XA-API-KEY': api_key,
+            'XA-SITE': site_name
+        }
+        self._connection_limit = connection_limit
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            # Connections are kept alive and shared between requests, so
+            # connection_limit bounds how many requests are in flight at once
+            connector = aiohttp.TCPConnector(limit=self._connection_limit)
+            self._session = aiohttp.ClientSession(headers=self._headers,
+                                                  connector=connector)
+        return self._session
+
+    async def close(self):
+        """
+        Closes all open connections
+        """
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+class AsyncAMIEClient(_AsyncClientBase):
+    """
+    asyncio AMIE Client. Has the same methods as AMIEClient, as coroutines.
+
+    Args:
+        site_name (str): Name of the client site.
+        api_key (str): API key secret
+        amie_url (str): Base URL for the XSEDE AMIE api
+        connection_limit (int): Maximum number of simultaneous connections
+
+    Examples:
+        >>> async with amieclient.AsyncAMIEClient(site_name='PSC', api_key=some_secrets_store['amie_api_key']) as psc_client:
+        ...     packets = await psc_client.list_packets()
+    """
+    def __init__(self, site_name, api_key,
+                 amie_url='https://amieclient.xsede.org/v0.10/',
+                 connection_limit=100):
+        super().__init__(site_name, api_key, connection_limit)
+        if not amie_url.endswith('/'):
+            self.amie_url = amie_url + '/'
+        else:
+            self.amie_url = amie_url
+
+    async def _request(self, method, url, **kwargs):
+        """
+        Makes a request, raising an AMIERequestError on an error response.
+        Returns the response and its decoded JSON.
+        """
+        async with self._get_session().request(method, url, **kwargs) as r:
+            response = await r.json(content_type=None)
+        if r.status > 200:
+            message = response.get('message', 'Server did not provide an error message')
+            raise AMIERequestError(message, response=r)
+        return r, response
+
+    async def get_transaction(self, transaction_or_id):
+        """
+        Given a single transaction record id, fetches the related transaction.
+
+        Args:
+            transaction_or_id: The transaction or transaction record ID.
+
+        Returns:
+            amieclient.Transaction
+        """
+        if isinstance(transaction_or_id, Transaction):
+            tx_id = transaction_or_id.trans_rec_id
+        else:
+            tx_id = transaction_or_id
+
+        url = self.amie_url + 'transactions/{}/{}/packets'.format(self.site_name, tx_id)
+        r, response = await self._request('GET', url)
+        return Transaction.from_dict(response['result'])
+
+    async def set_transaction_failed(self, transaction_or_id):
+        """
+        Given a single transaction or transaction record id, marks it failed.
+
+        Args:
+            transaction_or_id: The transaction or transaction record ID.
+        """
+        if isinstance(transaction_or_id, Transaction):
+            tx_id = transaction_or_id.trans_rec_id
+        else:
+            tx_id = transaction_or_id
+
+        url = self.amie_url + 'transactions/{}/{}/state/failed'.format(self.site_name, tx_id)
+        r, response = await self._request('PUT', url)
+        return r
+
+    async def get_packet(self, packet_rec_id):
+        """
+        Given a single packet record id, fetches the packet.
+
+        Args:
+            packet_rec_id: The transaction record ID.
+
+        Returns:
+            amieclient.Packet
+        """
+        url = self.amie_url + 'packets/{}/{}'.format(self.site_name, packet_rec_id)
+        r, response = await self._request('GET', url)
+        return Packet.from_dict(response['result'])
+
+    async def list_packets(self, *, trans_rec_ids=None, outgoing=None,
+                           update_time_start=None, update_time_until=None,
+                           states=None, client_states=None, transaction_states=None,
+                           incoming=None, lazy=False):
+        """
+        Fetches a list of packets based on the provided search parameters.
+        Takes the same arguments as AMIEClient.list_packets.
+
+        Returns:
+            amieclient.PacketList: a list of packets matching the provided parameters.
+        """
+        params = AMIEClient._list_packets_params(
+            trans_rec_ids=trans_rec_ids, outgoing=outgoing,
+            update_time_start=update_time_start,
+            update_time_until=update_time_until, states=states,
+            client_states=client_states, transaction_states=transaction_states,
+            incoming=incoming)
+
+        url = self.amie_url + 'packets/{}'.format(self.site_name)
+        r, response = await self._request('GET', url, params=_query_params(params))
+        return PacketList.from_dict(response, lazy=lazy)
+
+    async def send_packet(self, packet, skip_validation=False):
+        """
+        Send a packet
+
+        Args:
+            packet (amieclient.Packet): The packet to send.
+
+        Returns:
+            aiohttp.ClientResponse: The response from the AMIE API.
+        """
+        if not skip_validation:
+            packet.validate_data(raise_on_invalid=True)
+
+        url = self.amie_url + 'packets/{}'.format(self.site_name)
+        r, response = await self._request('POST', url, json=packet.as_dict())
+        return r
+
+    async def set_packet_client_state(self, packet_or_id, state):
+        """
+        Set the client state on the server of the packet corresponding to the given
+        packet_or_id.
+
+        Args:
+          packet_or_id (Packet, int): The packet or packet_rec_id to set state on.
+          state (str): The state to set
+        """
+        if isinstance(packet_or_id, Packet):
+            pkt_id = packet_or_id.packet_rec_id
+        else:
+            pkt_id = packet_or_id
+
+        url = self.amie_url + 'packets/{}/{}/client_state/{}'.format(self.site_name,
+                                                                     pkt_id, state)
+        r, response = await self._request('PUT', url)
+        return r
+
+    async def clear_packet_client_state(self, packet_or_id):
+        """
+        Clears the client state on the server of the packet corresponding to the given
+        packet_or_id.
+
+        Args:
+          packet_or_id (Packet, int): The packet or packet_rec_id to clear client_state on.
+        """
+        if isinstance(packet_or_id, Packet):
+            pkt_id = packet_or_id.packet_rec_id
+        else:
+            pkt_id = packet_or_id
+
+        url = self.amie_url + 'packets/{}/{}/client_state'.format(self.site_name, pkt_id)
+        r, response = await self._request('DELETE', url)
+        return r
+
+    async def set_packet_client_json(self, packet_or_id, client_json):
+        """
+        Set the client JSON on the server of the packet corresponding to the given
+        packet_or_id.
+
+        Args:
+          packet_or_id (Packet, int): The packet or packet_rec_id to set client_json on.
+          client_json: The json to set. Can be any serializable object or a string of
+            JSON.
+        """
+        if isinstance(packet_or_id, Packet):
+            pkt_id = packet_or_id.packet_rec_id
+        else:
+            pkt_id = packet_or_id
+
+        url = self.amie_url + 'packets/{}/{}/client_json'.format(self.site_name, pkt_id)
+
+        if isinstance(client_json, str):
+            client_json = json.loads(client_json)
+
+        r, response = await self._request('PUT', url, json=client_json)
+        return r
+
+    async def clear_packet_client_json(self, packet_or_id):
+        """
+        Clears the client JSON on the server of the packet corresponding to the given
+        packet_or_id.
+
+        Args:
+          packet_or_id (Packet, int): The packet or packet_rec_id to clear client_json on.
+        """
+        if isinstance(packet_or_id, Packet):
+            pkt_id = packet_or_id.packet_rec_id
+        else:
+            pkt_id = packet_or_id
+
+        url = self.amie_url + 'packets/{}/{}/client_json'.format(self.site_name, pkt_id)
+        r, response = await self._request('DELETE', url)
+        return r
+
+
+class AsyncUsageClient(_AsyncClientBase):
+    """
+    asyncio Usage Client. Has the same methods as UsageClient, as coroutines.
+
+    Args:
+        site_name (str): Name of the client site.
+        api_key (str): API key secret
+        usage_url (str): Base URL for the XSEDE Usage api
+        connection_limit (int): Maximum number of simultaneous connections
+    """
+    # Largest request body, in bytes, that we'll send to the Usage API
+    max_request_size = MAX_REQUEST_SIZE
+
+    def __init__(self, site_name, api_key,
+                 usage_url='https://usage.xsede.org/api/v1',
+                 connection_limit=100):
+        super().__init__(site_name, api_key, connection_limit)
+        if not usage_url.endswith('/'):
+            self.usage_url = usage_url + '/'
+        else:
+            self.usage_url = usage_url
+
+    async def _request(self, method, url, **kwargs):
+        """
+        Makes a request, returning the decoded JSON of the response. Like
+        UsageClient, a Bad Request response (or any error response to a
+        GET) raises a UsageResponseError with the server's error message.
+        """
+        async with self._get_session().request(method, url, **kwargs) as r:
+            if r.status == 400 or (method == 'GET' and r.status > 200):
+                # Get the message if we're given one; otherwise placeholder
+                response = await r.json(content_type=None)
+                msg = response.get('error', 'Bad Request, but error not specified by server')
+                raise UsageResponseError(msg)
+            r.raise_for_status()
+            if method == 'DELETE':
+                return None
+            return await r.json(content_type=None)
+
+    async def send(self, usage_packets):
+        """
+        Sends a usage update to the Usage API host. Takes the same arguments
+        as UsageClient.send, and likewise returns a list of UsageResponses,
+        one for each chunk of records sent.
+        """
+        url = self.usage_url + 'usage/'
+        results = list()
+        records = UsageClient._usage_records(usage_packets)
+        for chunk in _chunk_records(records, max_size=self.max_request_size):
+            response = await self._request('POST', url, data=chunk.body,
+                                           headers={'Content-Type': 'application/json'})
+            results.append(UsageResponse.from_dict(response))
+        return results
+
+    async def get_failed_records(self):
+        """
+        Gets all failed records
+        """
+        url = self.usage_url + 'usage/failed'
+        response = await self._request('GET', url)
+        return FailedUsageResponse.from_dict(response)
+
+    async def clear_failed_records(self, failed_records_or_ids):
+        """
+        Tells the server to clear the failed records given
+
+        Args:
+            failed_records_or_ids ([FailedUsageRecord], [int]):
+                A list of FailedUsageRecords, or plain FailedRecordIds, to unmark as
+                failed
+        """
+        fids = UsageClient._failed_ids_str(failed_records_or_ids)
+        url = self.usage_url + 'usage/failed/{}'.format(fids)
+        await self._request('DELETE', url)
+        return True
+
+    async def status(self, from_time=None, to_time=None):
+        """
+        Gets the status of records processed from the queue in the provided interval.
+
+        Args:
+            from_date (Datetime): Start date and time
+            to_date (Datetime): End date and time
+        """
+        p = UsageClient._status_params(from_time, to_time)
+        url = self.usage_url + 'usage/status'
+        response = await self._request('GET', url, params=_query_params(p))
+        return UsageStatus.from_list(response)
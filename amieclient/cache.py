@@ -0,0 +1,178 @@
+"""
+A local cache for packets and transactions fetched from the AMIE API
+"""
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class _CacheEntry(object):
+    def __init__(self, data, validators, stored_at):
+        self.data = data
+        self.validators = validators
+        self.stored_at = stored_at
+
+
+class PacketCache(object):
+    """
+    An in-memory cache of the packets and transactions an AMIEClient has
+    fetched, keyed by packet_rec_id and trans_rec_id. Give one to an
+    AMIEClient to have get_packet and get_transaction check it before going
+    to the server. Packets from list_packets are added to it automatically,
+    and packets are dropped from it when their client state or client JSON is
+    changed through the client.
+
+    Entries are kept as the data we got from the server, and decoded into a
+    new Packet or Transaction each time they're used, so changing a packet
+    you got from the cache doesn't change the cache.
+
+    Args:
+        maxsize (int): How many packets, and how many transactions, to keep.
+            Once full, the least recently used entries are dropped.
+        ttl (float): How long, in seconds, an entry can be used before we
+            check back with the server. If the server gave us an ETag or
+            Last-Modified header with it, an expired entry is revalidated
+            with a conditional request; otherwise it's fetched again. If
+            None, entries never expire.
+
+    Attributes:
+        hits (int): Number of lookups answered from the cache, including
+            expired entries the server told us were still current.
+        misses (int): Number of lookups that had to fetch from the server.
+        revalidations (int): Number of expired entries the server told us
+            were still current.
+
+    Example:
+        >>> client = AMIEClient(site_name='PSC', api_key=api_key,
+        ...                     cache=PacketCache(maxsize=10000, ttl=300))
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = {
+            'packet': OrderedDict(),
+            'transaction': OrderedDict(),
+        }
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(id_):
+        try:
+            return int(id_)
+        except (TypeError, ValueError):
+            return id_
+
+    def _lookup(self, kind, id_):
+        """
+        Looks up an entry. Returns (data, None) for a fresh entry, (None,
+        validators) for an expired one that can be revalidated, and (None,
+        None) if there's nothing usable. Fresh entries count as a hit;
+        anything else counts as a miss unless it's later revalidated.
+        """
+        key = self._key(id_)
+        with self._lock:
+            entries = self._entries[kind]
+            entry = entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            entries.move_to_end(key)
+            if self.ttl is None or time.monotonic() - entry.stored_at < self.ttl:
+                self.hits += 1
+                return entry.data, None
+            if entry.validators:
+                return None, entry.validators
+            del entries[key]
+            self.misses += 1
+            return None, None
+
+    def _peek(self, kind, id_):
+        """
+        Gets an entry's data if it's fresh, without counting a hit or miss
+        or changing its place in line for eviction
+        """
+        with self._lock:
+            entry = self._entries[kind].get(self._key(id_))
+            if entry is None:
+                return None
+            if self.ttl is not None and time.monotonic() - entry.stored_at >= self.ttl:
+                return None
+            return entry.data
+
+    def _revalidated(self, kind, id_):
+        """
+        Marks an expired entry as current again, returning its data
+        """
+        key = self._key(id_)
+        with self._lock:
+            entry = self._entries[kind].get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry.stored_at = time.monotonic()
+            self.hits += 1
+            self.revalidations += 1
+            return entry.data
+
+    def _store(self, kind, id_, data, validators=None, count_miss=False):
+        key = self._key(id_)
+        with self._lock:
+            if count_miss:
+                self.misses += 1
+            entries = self._entries[kind]
+            entries[key] = _CacheEntry(data, validators or {}, time.monotonic())
+            entries.move_to_end(key)
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    def _packet_trans_rec_id(self, packet_rec_id):
+        with self._lock:
+            entry = self._entries['packet'].get(self._key(packet_rec_id))
+        if entry is None:
+            return None
+        return entry.data.get('header', {}).get('trans_rec_id')
+
+    def invalidate_packet(self, packet_rec_id):
+        """
+        Drops a packet, and the transaction it's part of, from the cache
+        """
+        trans_rec_id = self._packet_trans_rec_id(packet_rec_id)
+        with self._lock:
+            self._entries['packet'].pop(self._key(packet_rec_id), None)
+            if trans_rec_id is not None:
+                self._entries['transaction'].pop(self._key(trans_rec_id), None)
+
+    def invalidate_transaction(self, trans_rec_id):
+        """
+        Drops a transaction from the cache
+        """
+        with self._lock:
+            self._entries['transaction'].pop(self._key(trans_rec_id), None)
+
+    def clear(self):
+        """
+        Empties the cache. Doesn't reset the counters.
+        """
+        with self._lock:
+            for entries in self._entries.values():
+                entries.clear()
+
+    def stats(self):
+        """
+        The cache's counters and sizes, as a dictionary
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'packets': len(self._entries['packet']),
+                'transactions': len(self._entries['transaction']),
+            }
+
+    def __repr__(self):
+        return "<PacketCache: {hits} hits, {misses} misses>".format(**self.stats())
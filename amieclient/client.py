@@ -1,14 +1,21 @@
 import json
+import queue
+import threading
 
-from math import ceil, floor
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 import requests
 
+from .metrics import _timed_decode
 from .packet import PacketList
-from .packet.base import Packet
+from .packet.base import Packet, PacketInvalidData
 from .transaction import Transaction
 from .usage import (UsageMessage, UsageRecord, UsageResponse, UsageResponseError,
                     FailedUsageResponse, UsageStatus)
+from .usage.message import MAX_REQUEST_SIZE, _chunk_records
+from .transport import TransportPolicy, _ensure_pool_size, _new_session, _request
 
 
 """AMIE client and Usage Client classes"""
@@ -18,6 +25,65 @@ class AMIERequestError(requests.RequestException):
     pass
 
 
+class RequestResult(object):
+    """
+    The outcome of one request made as part of a batch.
+
+    Attributes:
+        item: What the request was made for, such as a packet or an ID.
+        response: What the request returned, if it succeeded.
+        error (Exception): The error the request raised, if it failed.
+        skipped (bool): True if the request wasn't needed, and so wasn't made.
+    """
+    def __init__(self, item, response=None, error=None, skipped=False):
+        self.item = item
+        self.response = response
+        self.error = error
+        self.skipped = skipped
+
+    @property
+    def ok(self):
+        """
+        True if the request succeeded
+        """
+        return self.error is None
+
+    def __repr__(self):
+        if self.skipped:
+            return "<RequestResult: {s.item!r} skipped>".format(s=self)
+        if self.ok:
+            return "<RequestResult: {s.item!r} ok>".format(s=self)
+        return "<RequestResult: {s.item!r} failed: {s.error!r}>".format(s=self)
+
+
+def _run_concurrently(fn, items, max_workers):
+    """
+    Calls fn on each of items from a pool of max_workers threads. Returns a
+    RequestResult for each item, in the same order as items. Errors raised
+    by fn are kept on the results rather than raised, so one failure
+    doesn't stop the rest.
+    """
+    def call(item):
+        try:
+            return RequestResult(item, response=fn(item))
+        except Exception as e:
+            return RequestResult(item, error=e)
+
+    if max_workers <= 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(call, items))
+
+
+def _pairs(mapping_or_pairs):
+    """
+    A list of (key, value) pairs from a dict, or from an iterable of pairs
+    """
+    if hasattr(mapping_or_pairs, 'items'):
+        return list(mapping_or_pairs.items())
+    return list(mapping_or_pairs)
+
+
 class AMIEClient(object):
     """
     AMIE Client.
@@ -26,6 +92,12 @@ class AMIEClient(object):
         site_name (str): Name of the client site.
         api_key (str): API key secret
         amie_url (str): Base URL for the XSEDE AMIE api
+        cache (amieclient.PacketCache): Optional cache for packets and
+            transactions fetched by this client
+        metrics (amieclient.ClientMetrics): Optional collector for request
+            timings and sizes
+        transport (amieclient.TransportPolicy): Connection pool size,
+            timeouts and retries to use. By default, TransportPolicy().
 
     Examples:
         >>> psc_client = amieclient.AMIEClient(site_name='PSC', api_key=some_secrets_store['amie_api_key'])
@@ -37,21 +109,23 @@ class AMIEClient(object):
 
     """
     def __init__(self, site_name, api_key,
-                 amie_url='https://amieclient.xsede.org/v0.10/'):
+                 amie_url='https://amieclient.xsede.org/v0.10/', cache=None,
+                 metrics=None, transport=None):
         if not amie_url.endswith('/'):
             self.amie_url = amie_url + '/'
         else:
             self.amie_url = amie_url
 
         self.site_name = site_name
+        self.cache = cache
+        self.metrics = metrics
+        self.transport = transport if transport is not None else TransportPolicy()
 
         amie_headers = {
             'XA-API-KEY': api_key,
             'XA-SITE': site_name
         }
-        s = requests.Session()
-        s.headers.update(amie_headers)
-        self._session = s
+        self._session = _new_session(amie_headers, self.transport)
 
     def __enter__(self):
         return self
@@ -59,6 +133,13 @@ class AMIEClient(object):
     def __exit__(self, *args):
         self._session.close()
 
+    def _request(self, endpoint, method, url, **kwargs):
+        return _request(self._session, self.transport, self.metrics, endpoint,
+                        method, url, **kwargs)
+
+    def _decode(self, endpoint, stage, fn, *args, **kwargs):
+        return _timed_decode(self.metrics, endpoint, stage, fn, *args, **kwargs)
+
     @staticmethod
     def _join_list(things):
         if things is not None and things != []:
@@ -82,6 +163,79 @@ class AMIEClient(object):
             time_str = "{},{}".format(start_str, end_str)
         return time_str
 
+    @classmethod
+    def _list_packets_params(cls, trans_rec_ids, outgoing, update_time_start,
+                             update_time_until, states, client_states,
+                             transaction_states, incoming):
+        """
+        Builds the query parameters for list_packets
+        """
+        trans_rec_ids_str = cls._join_list(trans_rec_ids)
+        states_str = cls._join_list(states)
+        client_states_str = cls._join_list(client_states)
+        transaction_states_str = cls._join_list(transaction_states)
+        time_str = cls._dt_range(update_time_start, update_time_until)
+
+        # Build a dict of parameters. Requests skips any with a None value,
+        # so no need to weed them out
+        params = {
+            'trans_rec_id': trans_rec_ids_str,
+            'outgoing': outgoing,
+            'update_time': time_str,
+            'states': states_str,
+            'client_state': client_states_str,
+            'transaction_state': transaction_states_str,
+            'incoming': incoming
+        }
+        return params
+
+    def _cached_get(self, kind, id_, url):
+        """
+        GETs a single packet or transaction, going through the cache if we
+        have one, and returns the 'result' of the response.
+        """
+        headers = {}
+        if self.cache is not None:
+            data, validators = self.cache._lookup(kind, id_)
+            if data is not None:
+                return data
+            if validators is not None:
+                if 'ETag' in validators:
+                    headers['If-None-Match'] = validators['ETag']
+                if 'Last-Modified' in validators:
+                    headers['If-Modified-Since'] = validators['Last-Modified']
+
+        endpoint = 'get_' + kind
+        r = self._request(endpoint, 'GET', url, headers=headers)
+        if r.status_code == 304:
+            if not headers:
+                # Only a conditional request, made through the cache, should
+                # get a 304
+                raise AMIERequestError('Server returned 304 Not Modified to an '
+                                       'unconditional request', response=r)
+            data = self.cache._revalidated(kind, id_)
+            if data is not None:
+                return data
+            # We lost the entry in the meantime; fetch it properly
+            headers = {}
+            r = self._request(endpoint, 'GET', url)
+
+        response = self._decode(endpoint, 'json', r.json)
+        if r.status_code > 200:
+            message = response.get('message', 'Server did not provide an error message')
+            raise AMIERequestError(message, response=r)
+        result = response['result']
+        if self.cache is not None:
+            validators = {k: r.headers[k] for k in ['ETag', 'Last-Modified']
+                          if k in r.headers}
+            # An expired entry we tried to revalidate counts as a miss too
+            self.cache._store(kind, id_, result, validators,
+                              count_miss=bool(headers))
+            if kind == 'transaction':
+                for d in result.get('DATA', []):
+                    self.cache._store('packet', d['header']['packet_rec_id'], d)
+        return result
+
     def get_transaction(self, transaction_or_id):
         """
         Given a single transaction record id, fetches the related transaction.
@@ -100,13 +254,34 @@ class AMIEClient(object):
             tx_id = transaction_or_id
 
         url = self.amie_url + 'transactions/{}/{}/packets'.format(self.site_name, tx_id)
-        r = self._session.get(url)
-        response = r.json()
-        print(response)
-        if r.status_code > 200:
-            message = response.get('message', 'Server did not provide an error message')
-            raise AMIERequestError(message, response=r)
-        return Transaction.from_dict(response['result'])
+        result = self._cached_get('transaction', tx_id, url)
+        return self._decode('get_transaction', 'from_dict', Transaction.from_dict, result)
+
+    def get_transactions(self, trans_rec_ids, concurrency=4):
+        """
+        Fetches many transactions at once, from a pool of concurrency threads
+        sharing the client's connections. An error fetching one transaction
+        doesn't stop the others from being fetched.
+
+        Args:
+            trans_rec_ids: An iterable of transaction record IDs.
+            concurrency (int): How many transactions to fetch at once.
+
+        Returns:
+            dict: A RequestResult for each transaction record ID, keyed by
+            that ID, in the order given. On success, the result's response is
+            the amieclient.Transaction; otherwise, its error is the exception
+            raised.
+
+        Example:
+            >>> results = client.get_transactions(open_trans_rec_ids, concurrency=8)
+            >>> transactions = {i: r.response for i, r in results.items() if r.ok}
+        """
+        # Skip any duplicate IDs, keeping the order we were given
+        tx_ids = list(OrderedDict.fromkeys(trans_rec_ids))
+        _ensure_pool_size(self._session, concurrency)
+        results = _run_concurrently(self.get_transaction, tx_ids, concurrency)
+        return OrderedDict((r.item, r) for r in results)
 
     def set_transaction_failed(self, transaction_or_id):
         """
@@ -121,9 +296,11 @@ class AMIEClient(object):
             tx_id = transaction_or_id.trans_rec_id
         else:
             tx_id = transaction_or_id
+        if self.cache is not None:
+            self.cache.invalidate_transaction(tx_id)
 
         url = self.amie_url + 'transactions/{}/{}/state/failed'.format(self.site_name, tx_id)
-        r = self._session.put(url)
+        r = self._request('set_transaction_failed', 'PUT', url)
         response = r.json()
         if r.status_code > 200:
             message = response.get('message', 'Server did not provide an error message')
@@ -144,17 +321,13 @@ class AMIEClient(object):
             amieclient.Packet
         """
         url = self.amie_url + 'packets/{}/{}'.format(self.site_name, packet_rec_id)
-        r = self._session.get(url)
-        response = r.json()
-        if r.status_code > 200:
-            message = response.get('message', 'Server did not provide an error message')
-            raise AMIERequestError(message, response=r)
-        return Packet.from_dict(response['result'])
+        result = self._cached_get('packet', packet_rec_id, url)
+        return self._decode('get_packet', 'from_dict', Packet.from_dict, result)
 
     def list_packets(self, *, trans_rec_ids=None, outgoing=None,
                      update_time_start=None, update_time_until=None,
                      states=None, client_states=None, transaction_states=None,
-                     incoming=None):
+                     incoming=None, lazy=False):
         """
         Fetches a list of packets based on the provided search parameters
 
@@ -169,36 +342,133 @@ class AMIEClient(object):
             client_states (list): Searches for packets in the provided client states.
             transaction_states (list): Searches for packets in the provided client states.
             incoming (bool): If true, search is limited to incoming packets.
+            lazy (bool): If true, packets are only decoded when accessed. See
+                PacketList.from_dict.
 
         Returns:
             amieclient.PacketList: a list of packets matching the provided parameters.
         """
-        trans_rec_ids_str = self._join_list(trans_rec_ids)
-        states_str = self._join_list(states)
-        client_states_str = self._join_list(client_states)
-        transaction_states_str = self._join_list(transaction_states)
-        time_str = self._dt_range(update_time_start, update_time_until)
-
-        # Build a dict of parameters. Requests skips any with a None value,
-        # so no need to weed them out
-        params = {
-            'trans_rec_id': trans_rec_ids_str,
-            'outgoing': outgoing,
-            'update_time': time_str,
-            'states': states_str,
-            'client_state': client_states_str,
-            'transaction_state': transaction_states_str,
-            'incoming': incoming
-        }
-
-        # Get the list of packets
+        params = self._list_packets_params(
+            trans_rec_ids=trans_rec_ids, outgoing=outgoing,
+            update_time_start=update_time_start,
+            update_time_until=update_time_until, states=states,
+            client_states=client_states, transaction_states=transaction_states,
+            incoming=incoming)
+
+        response = self._fetch_packet_list(params)
+        return self._decode('list_packets', 'from_dict', PacketList.from_dict,
+                            response, lazy=lazy)
+
+    def _fetch_packet_list(self, params):
+        """
+        GETs a list of packets, and returns the response as a dictionary
+        """
         url = self.amie_url + 'packets/{}'.format(self.site_name)
-        r = self._session.get(url, params=params)
-        response = r.json()
+        r = self._request('list_packets', 'GET', url, params=params)
+        response = self._decode('list_packets', 'json', r.json)
         if r.status_code > 200:
             message = response.get('message', 'Server did not provide an error message')
             raise AMIERequestError(message, response=r)
-        return PacketList.from_dict(response)
+        if self.cache is not None:
+            for d in response['result']:
+                self.cache._store('packet', d['header']['packet_rec_id'], d)
+        return response
+
+    def iter_packets(self, update_time_start, update_time_until=None, *,
+                     window=timedelta(hours=6), prefetch=2, trans_rec_ids=None,
+                     outgoing=None, states=None, client_states=None,
+                     transaction_states=None, incoming=None):
+        """
+        Generator that yields the packets updated between two times, fetching
+        them one window of update times at a time rather than in one big
+        response. Windows are fetched in a background thread, up to prefetch
+        windows ahead, so handling one window's packets overlaps with
+        downloading the next; and each packet is only decoded when it's
+        yielded. Only about prefetch + 1 windows' worth of packets are held
+        in memory at once, so pick a window that keeps those small.
+
+        A packet that shows up at the boundary of two windows is only
+        yielded once. One that's updated again while we're walking through
+        the windows can be yielded again, with its new state.
+
+        Args:
+            update_time_start (datetime.Datetime): Start of the first window.
+            update_time_until (datetime.Datetime): End of the last window.
+                Defaults to now.
+            window (datetime.timedelta): How much update time each request
+                covers.
+            prefetch (int): How many windows to fetch ahead.
+            trans_rec_ids, outgoing, states, client_states,
+            transaction_states, incoming: As for list_packets.
+
+        Example:
+            >>> since_outage = datetime(2021, 8, 20, tzinfo=tzutc())
+            >>> for packet in client.iter_packets(since_outage, incoming=True):
+            ...     handle(packet)
+        """
+        if update_time_until is None:
+            update_time_until = datetime.now(update_time_start.tzinfo)
+        if window <= timedelta(0):
+            raise ValueError('window must be positive')
+
+        def params_for(start, end):
+            return self._list_packets_params(
+                trans_rec_ids=trans_rec_ids, outgoing=outgoing,
+                update_time_start=start, update_time_until=end, states=states,
+                client_states=client_states, transaction_states=transaction_states,
+                incoming=incoming)
+
+        windows = []
+        start = update_time_start
+        while start < update_time_until:
+            end = min(start + window, update_time_until)
+            windows.append(params_for(start, end))
+            start = end
+
+        # Fetched windows (or the error that stopped us) are handed over
+        # through a bounded queue, so we never get too far ahead
+        fetched = queue.Queue(maxsize=max(prefetch, 1))
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    fetched.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def fetch_all():
+            try:
+                for params in windows:
+                    if stop.is_set() or not put(self._fetch_packet_list(params)['result']):
+                        return
+            except Exception as e:
+                put(e)
+                return
+            put(None)
+
+        fetcher = threading.Thread(target=fetch_all, daemon=True)
+        fetcher.start()
+        try:
+            previous_ids = set()
+            while True:
+                raw_packets = fetched.get()
+                if raw_packets is None:
+                    return
+                if isinstance(raw_packets, Exception):
+                    raise raw_packets
+                ids = set()
+                for d in raw_packets:
+                    packet_rec_id = d['header']['packet_rec_id']
+                    ids.add(packet_rec_id)
+                    if packet_rec_id in previous_ids:
+                        continue
+                    yield self._decode('list_packets', 'from_dict', Packet.from_dict, d)
+                previous_ids = ids
+        finally:
+            stop.set()
 
     def send_packet(self, packet, skip_validation=False):
         """
@@ -216,13 +486,191 @@ class AMIEClient(object):
             packet.validate_data(raise_on_invalid=True)
 
         url = self.amie_url + 'packets/{}'.format(self.site_name)
-        r = self._session.post(url, json=packet.as_dict())
+        r = self._request('send_packet', 'POST', url, json=packet.as_dict())
         response = r.json()
         if r.status_code > 200:
             message = response.get('message', 'Server did not provide an error message')
             raise AMIERequestError(message, response=r)
         return r
 
+    def send_packets(self, packets, concurrency=4, skip_validation=False):
+        """
+        Sends many packets, such as a batch of replies, at once.
+
+        Every packet is validated before any are sent. Packets that pass are
+        then sent from a pool of concurrency threads, sharing the client's
+        connections. A packet that fails validation, or that the server
+        rejects, doesn't stop the others from being sent.
+
+        Args:
+            packets: An iterable of amieclient.Packet objects to send.
+            concurrency (int): How many packets to send at once.
+            skip_validation (bool): Send the packets without validating them.
+
+        Returns:
+            list of RequestResult: One for each packet, in the order given.
+            On success, the result's response is the requests.Response from
+            the AMIE API; otherwise, its error is the exception raised.
+
+        Example:
+            >>> results = client.send_packets(replies, concurrency=8)
+            >>> failed = [r for r in results if not r.ok]
+        """
+        packets = list(packets)
+        results = [None] * len(packets)
+        valid = []
+        for i, packet in enumerate(packets):
+            if not skip_validation:
+                try:
+                    packet.validate_data(raise_on_invalid=True)
+                except PacketInvalidData as e:
+                    results[i] = RequestResult(packet, error=e)
+                    continue
+            valid.append(i)
+
+        _ensure_pool_size(self._session, concurrency)
+        sent = _run_concurrently(
+            lambda i: self.send_packet(packets[i], skip_validation=True),
+            valid, concurrency)
+        for result in sent:
+            i = result.item
+            result.item = packets[i]
+            results[i] = result
+        return results
+
+    def _has_header_value(self, packet_or_id, field, value):
+        """
+        Checks whether a packet's header field already has the given value on
+        the server, as of the last time we fetched the packet: either the
+        client's cached copy of it, or the data the packet we're given was
+        decoded from. Changes made to a packet locally don't count.
+        """
+        if isinstance(packet_or_id, Packet):
+            packet_rec_id = packet_or_id.packet_rec_id
+            data = packet_or_id._original_data
+        else:
+            packet_rec_id = packet_or_id
+            data = None
+        if self.cache is not None and packet_rec_id is not None:
+            cached = self.cache._peek('packet', packet_rec_id)
+            if cached is not None:
+                data = cached
+        if data is None:
+            return False
+        return data.get('header', {}).get(field) == value
+
+    def _update_packets(self, updates, update_fn, field, concurrency):
+        """
+        Calls update_fn(packet_or_id, value) for each (packet_or_id, value) in
+        updates, from a pool of concurrency threads. Updates that wouldn't
+        change anything are skipped.
+        """
+        results = [None] * len(updates)
+        to_send = []
+        for i, (packet_or_id, value) in enumerate(updates):
+            if self._has_header_value(packet_or_id, field, value):
+                results[i] = RequestResult(packet_or_id, skipped=True)
+            else:
+                to_send.append(i)
+
+        _ensure_pool_size(self._session, concurrency)
+        sent = _run_concurrently(lambda i: update_fn(*updates[i]),
+                                 to_send, concurrency)
+        for result in sent:
+            i = result.item
+            result.item = updates[i][0]
+            results[i] = result
+        return results
+
+    def set_packets_client_state(self, states, concurrency=4):
+        """
+        Sets the client state on many packets at once, from a pool of
+        concurrency threads sharing the client's connections. Packets that
+        the server already has the given state for, going by the client's
+        cache or the data the packet was decoded from, are skipped.
+
+        Args:
+            states: A list of (packet or packet_rec_id, state) pairs, or a
+                dict mapping each packet or packet_rec_id to its state.
+            concurrency (int): How many packets to update at once.
+
+        Returns:
+            list of RequestResult: One for each packet, in the order given.
+            For a dict, that's only its insertion order on Python 3.7+.
+
+        Example:
+            >>> client.set_packets_client_state([(pkt, 'processed') for pkt in handled])
+        """
+        return self._update_packets(_pairs(states), self.set_packet_client_state,
+                                    'client_state', concurrency)
+
+    def clear_packets_client_state(self, packets_or_ids, concurrency=4):
+        """
+        Clears the client state on many packets at once. Packets that have no
+        client state on the server, going by the client's cache or the data
+        the packet was decoded from, are skipped.
+
+        Args:
+            packets_or_ids: An iterable of packets or packet_rec_ids.
+            concurrency (int): How many packets to update at once.
+
+        Returns:
+            list of RequestResult: One for each packet, in the order given.
+        """
+        return self._update_packets([(p, None) for p in packets_or_ids],
+                                    lambda p, _: self.clear_packet_client_state(p),
+                                    'client_state', concurrency)
+
+    def set_packets_client_json(self, client_jsons, concurrency=4):
+        """
+        Sets the client JSON on many packets at once, from a pool of
+        concurrency threads sharing the client's connections. Packets that
+        the server already has the same client JSON for, going by the
+        client's cache or the data the packet was decoded from, are skipped.
+
+        Args:
+            client_jsons: A list of (packet or packet_rec_id, JSON) pairs, or
+                a dict mapping each packet or packet_rec_id to its JSON. Like
+                set_packet_client_json, the JSON can be any serializable
+                object or a string of JSON.
+            concurrency (int): How many packets to update at once.
+
+        Returns:
+            list of RequestResult: One for each packet, in the order given.
+            For a dict, that's only its insertion order on Python 3.7+.
+        """
+        updates = [(p, json.loads(j) if isinstance(j, str) else j)
+                   for p, j in _pairs(client_jsons)]
+        return self._update_packets(updates, self.set_packet_client_json,
+                                    'client_json', concurrency)
+
+    def clear_packets_client_json(self, packets_or_ids, concurrency=4):
+        """
+        Clears the client JSON on many packets at once. Packets that have no
+        client JSON, going by the packet we're given or the client's cache,
+        are skipped.
+
+        Args:
+            packets_or_ids: An iterable of packets or packet_rec_ids.
+            concurrency (int): How many packets to update at once.
+
+        Returns:
+            list of RequestResult: One for each packet, in the order given.
+        """
+        return self._update_packets([(p, None) for p in packets_or_ids],
+                                    lambda p, _: self.clear_packet_client_json(p),
+                                    'client_json', concurrency)
+
+    def _invalidate_packet(self, packet_or_id, pkt_id):
+        """
+        Drops a packet we're about to change, and its transaction, from the
+        cache
+        """
+        if self.cache is not None:
+            self.cache.invalidate_packet(pkt_id)
+            if isinstance(packet_or_id, Packet) and packet_or_id.trans_rec_id is not None:
+                self.cache.invalidate_transaction(packet_or_id.trans_rec_id)
+
     def set_packet_client_state(self, packet_or_id, state):
         """
         Set the client state on the server of the packet corresponding to the given
@@ -238,11 +686,12 @@ class AMIEClient(object):
             pkt_id = packet_or_id.packet_rec_id
         else:
             pkt_id = packet_or_id
+        self._invalidate_packet(packet_or_id, pkt_id)
 
         url = self.amie_url + 'packets/{}/{}/client_state/{}'.format(self.site_name,
                                                                      pkt_id, state)
 
-        r = self._session.put(url)
+        r = self._request('set_packet_client_state', 'PUT', url)
         response = r.json()
         if r.status_code > 200:
             message = response.get('message', 'Server did not provide an error message')
@@ -263,10 +712,11 @@ class AMIEClient(object):
             pkt_id = packet_or_id.packet_rec_id
         else:
             pkt_id = packet_or_id
+        self._invalidate_packet(packet_or_id, pkt_id)
 
         url = self.amie_url + 'packets/{}/{}/client_state'.format(self.site_name, pkt_id)
 
-        r = self._session.delete(url)
+        r = self._request('clear_packet_client_state', 'DELETE', url)
         response = r.json()
         if r.status_code > 200:
             message = response.get('message', 'Server did not provide an error message')
@@ -289,6 +739,7 @@ class AMIEClient(object):
             pkt_id = packet_or_id.packet_rec_id
         else:
             pkt_id = packet_or_id
+        self._invalidate_packet(packet_or_id, pkt_id)
 
         url = self.amie_url + 'packets/{}/{}/client_json'.format(self.site_name, pkt_id)
 
@@ -297,7 +748,7 @@ class AMIEClient(object):
             # serializes back properly when we do the PUT
             client_json = json.loads(client_json)
 
-        r = self._session.put(url, json=client_json)
+        r = self._request('set_packet_client_json', 'PUT', url, json=client_json)
         response = r.json()
         if r.status_code > 200:
             message = response.get('message', 'Server did not provide an error message')
@@ -318,10 +769,11 @@ class AMIEClient(object):
             pkt_id = packet_or_id.packet_rec_id
         else:
             pkt_id = packet_or_id
+        self._invalidate_packet(packet_or_id, pkt_id)
 
         url = self.amie_url + 'packets/{}/{}/client_json'.format(self.site_name, pkt_id)
 
-        r = self._session.delete(url)
+        r = self._request('clear_packet_client_json', 'DELETE', url)
         response = r.json()
         if r.status_code > 200:
             message = response.get('message', 'Server did not provide an error message')
@@ -337,6 +789,10 @@ class UsageClient:
         site_name (str): Name of the client site.
         api_key (str): API key secret
         usage_url (str): Base URL for the XSEDE Usage api
+        metrics (amieclient.ClientMetrics): Optional collector for request
+            timings and sizes
+        transport (amieclient.TransportPolicy): Connection pool size,
+            timeouts and retries to use. By default, TransportPolicy().
 
     Examples:
         >>> psc_client = amieclient.UsageClient(site_name='PSC', api_key=some_secrets_store['amie_api_key'])
@@ -347,8 +803,12 @@ class UsageClient:
         >>> psc_alt_base_client = amieclient.UsageClient(site_name='PSC', api_key='test_api_key', usage_url='https://amieclient.xsede.org/v0.20_beta/)
 
     """
+    # Largest request body, in bytes, that we'll send to the Usage API
+    max_request_size = MAX_REQUEST_SIZE
+
     def __init__(self, site_name, api_key,
-                 usage_url='https://usage.xsede.org/api/v1'):
+                 usage_url='https://usage.xsede.org/api/v1', metrics=None,
+                 transport=None):
 
         if not usage_url.endswith('/'):
             self.usage_url = usage_url + '/'
@@ -356,14 +816,14 @@ class UsageClient:
             self.usage_url = usage_url
 
         self.site_name = site_name
+        self.metrics = metrics
+        self.transport = transport if transport is not None else TransportPolicy()
 
         amie_headers = {
             'XA-API-KEY': api_key,
             'XA-SITE': site_name
         }
-        s = requests.Session()
-        s.headers.update(amie_headers)
-        self._session = s
+        self._session = _new_session(amie_headers, self.transport)
 
     def __enter__(self):
         return self
@@ -371,7 +831,14 @@ class UsageClient:
     def __exit__(self, *args):
         self._session.close()
 
-    def send(self, usage_packets):
+    def _request(self, endpoint, method, url, **kwargs):
+        return _request(self._session, self.transport, self.metrics, endpoint,
+                        method, url, **kwargs)
+
+    def _decode(self, endpoint, stage, fn, *args, **kwargs):
+        return _timed_decode(self.metrics, endpoint, stage, fn, *args, **kwargs)
+
+    def send(self, usage_packets, journal=None, seen_index=None):
         """
         Sends a usage update to the Usage API host. This function accepts
         individual UsageMessages, lists of UsageRecords, or even a single
@@ -385,50 +852,163 @@ class UsageClient:
         more than one response, so for the sake of consistency this method
         will return a list of responses.
 
+        Records are serialized one at a time, and each chunk is sent as soon
+        as it is full, so you can also pass in a generator of UsageRecords
+        without ever holding the whole upload in memory.
+
+        To be able to resume a big upload if it's interrupted, pass in an
+        UploadJournal. Each chunk the server accepts is recorded in it, and
+        chunks already recorded in it aren't sent again.
+
+        To skip records that have been sent before, such as when exports
+        overlap, pass in a SeenIndex. Records in it are dropped before
+        they're serialized, and records the server accepts are added to it.
+        Records the server rejects aren't, so they can be fixed and sent
+        again.
+
         Args:
-            usage_packets (UsageMessage, [UsageRecord], UsageRecord):
-                A UsageMessage object, list of UsageRecords, or a single
-                UsageRecord to send.
+            usage_packets (UsageMessage, UsageBatch, [UsageRecord], UsageRecord):
+                A UsageMessage or UsageBatch object, list (or other
+                iterable) of UsageRecords, or a single UsageRecord to send.
+            journal (amieclient.usage.UploadJournal): Optional journal of
+                the chunks already sent.
+            seen_index (amieclient.usage.SeenIndex): Optional index of the
+                records already sent.
         Returns:
             list of responses
         """
+        results = list()
+        records = self._usage_records(usage_packets, seen_index)
+        for chunk in _chunk_records(records, max_size=self.max_request_size):
+            response = journal.response(chunk) if journal is not None else None
+            if response is None:
+                response = self._send_chunk(chunk)
+                self._chunk_sent(chunk, response, journal, seen_index)
+            results.append(response)
+        return results
+
+    def send_concurrent(self, usage_packets, max_workers=4, max_in_flight=None,
+                        journal=None, seen_index=None):
+        """
+        Sends a usage update like send(), but POSTs the chunks from a pool of
+        max_workers threads, so the round trips overlap.
+
+        At most max_in_flight chunks (by default, twice max_workers) are
+        serialized and waiting to be sent at any one time. Once that many are
+        outstanding, we wait for the oldest to finish before serializing any
+        more records, so memory use stays bounded no matter how much usage
+        is being sent.
+
+        Responses are returned in the same order as the chunks were built,
+        just as with send(). Use UsageResponse.merge() to combine them into a
+        single response.
+
+        Args:
+            usage_packets (UsageMessage, UsageBatch, [UsageRecord], UsageRecord):
+                A UsageMessage or UsageBatch object, list (or other
+                iterable) of UsageRecords, or a single UsageRecord to send.
+            max_workers (int): Number of chunks to send at once
+            max_in_flight (int): Maximum number of chunks to hold in memory
+            journal (amieclient.usage.UploadJournal): Optional journal of
+                the chunks already sent. See send().
+            seen_index (amieclient.usage.SeenIndex): Optional index of the
+                records already sent. See send().
+        Returns:
+            list of responses
+        """
+        if max_in_flight is None:
+            max_in_flight = max_workers * 2
+        max_in_flight = max(max_in_flight, max_workers)
+        _ensure_pool_size(self._session, max_workers)
+
+        def collect(entry):
+            # Only called from this thread, since the journal and seen index
+            # may not be usable from others
+            chunk, pending = entry
+            if chunk is None:
+                return pending
+            response = pending.result()
+            self._chunk_sent(chunk, response, journal, seen_index)
+            return response
+
+        results = list()
+        records = self._usage_records(usage_packets, seen_index)
+        # (chunk, future), or (None, saved response) for chunks the journal
+        # says were already sent
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for chunk in _chunk_records(records, max_size=self.max_request_size):
+                    saved = journal.response(chunk) if journal is not None else None
+                    if saved is not None:
+                        in_flight.append((None, saved))
+                        continue
+                    if len(in_flight) >= max_in_flight:
+                        results.append(collect(in_flight.popleft()))
+                    in_flight.append((chunk, executor.submit(self._send_chunk, chunk)))
+                while in_flight:
+                    results.append(collect(in_flight.popleft()))
+            except BaseException:
+                # Don't start sending anything else once a chunk has failed,
+                # but keep track of any that went through
+                for chunk, future in in_flight:
+                    if chunk is None:
+                        continue
+                    future.cancel()
+                    if future.done() and not future.cancelled() \
+                            and future.exception() is None:
+                        self._chunk_sent(chunk, future.result(), journal, seen_index)
+                raise
+        return results
+
+    @staticmethod
+    def _usage_records(usage_packets, seen_index=None):
+        """
+        Gets an iterable of UsageRecords from anything send() accepts,
+        leaving out any that are in seen_index
+        """
         if isinstance(usage_packets, UsageRecord):
-            pkt_list = UsageMessage([usage_packets])
+            records = UsageMessage([usage_packets]).records
         elif isinstance(usage_packets, list):
-            pkt_list = UsageMessage(usage_packets)
+            # Check for mixed types before we send anything
+            records = UsageMessage(usage_packets).records
         elif isinstance(usage_packets, UsageMessage):
-            pkt_list = usage_packets
-        url = self.usage_url + 'usage/'
+            records = usage_packets.records
+        else:
+            records = usage_packets
+        if seen_index is not None:
+            records = seen_index.filter(records)
+        return records
+
+    @staticmethod
+    def _chunk_sent(chunk, response, journal, seen_index):
+        """
+        Records a chunk the server accepted in the journal, and the records
+        in it that passed validation in the seen index
+        """
+        if journal is not None:
+            journal.record(chunk, response)
+        if seen_index is not None:
+            failed = set(seen_index.key(f.record) for f in response.failed_records)
+            seen_index.add(r for r in chunk.records if seen_index.key(r) not in failed)
 
-        # prepare the request
-        req = requests.Request('POST',  url, json=pkt_list.as_dict())
-        prepped_req = self._session.prepare_request(req)
-        # Get the size of the content
-        content_length = int(prepped_req.headers.get('Content-Length'))
-
-        # Cap content_length at 786432 bytes
-        if content_length >= 786432:
-            # Get the safe number of safe chunks:
-            number_of_chunks = ceil(content_length / 786432)
-            # Get the size of those chunks
-            chunk_size = floor(len(pkt_list) / number_of_chunks)
-            results = list()
-            for chunk in pkt_list._chunked(chunk_size=chunk_size):
-                # Send each chunk
-                r = self.send_usage(chunk)
-                results.extend(r)
-            return results
-
-        r = self._session.send(prepped_req)
-        if r.status_code == 200:
-            resp = UsageResponse.from_dict(r.json())
-        elif r.status_code == 400:
+    def _send_chunk(self, chunk):
+        """
+        POSTs a single, already serialized, UsageChunk
+        """
+        url = self.usage_url + 'usage/'
+        # Records are keyed by their LocalRecordID, so sending a chunk twice
+        # just updates the same records; it's safe to retry
+        r = self._request('send', 'POST', url, data=chunk.body,
+                          headers={'Content-Type': 'application/json'},
+                          idempotent=True)
+        if r.status_code == 400:
             # Get the message if we're given one; otherwise
             msg = r.json().get('error', 'Bad Request, but error not specified by server')
             raise UsageResponseError(msg)
-        else:
-            r.raise_for_status()
-        return [resp]
+        r.raise_for_status()
+        response = self._decode('send', 'json', r.json)
+        return self._decode('send', 'from_dict', UsageResponse.from_dict, response)
 
     def summary(self):
         """
@@ -446,13 +1026,15 @@ class UsageClient:
         """
 
         url = self.usage_url + 'usage/failed'
-        r = self._session.get(url)
+        r = self._request('get_failed_records', 'GET', url)
 
         if r.status_code > 200:
             # Get the message if we're given one; otherwise placeholder
             msg = r.json().get('error', 'Bad Request, but error not specified by server')
             raise UsageResponseError(msg)
-        return FailedUsageResponse.from_dict(r.json())
+        response = self._decode('get_failed_records', 'json', r.json)
+        return self._decode('get_failed_records', 'from_dict',
+                            FailedUsageResponse.from_dict, response)
 
     def clear_failed_records(self, failed_records_or_ids):
         """
@@ -464,6 +1046,20 @@ class UsageClient:
                 failed
         """
 
+        fids = self._failed_ids_str(failed_records_or_ids)
+
+        url = self.usage_url + 'usage/failed/{}'.format(fids)
+
+        r = self._request('clear_failed_records', 'DELETE', url)
+        r.raise_for_status()
+        return True
+
+    @staticmethod
+    def _failed_ids_str(failed_records_or_ids):
+        """
+        Joins FailedUsageRecords, or plain FailedRecordIds, for the
+        clear_failed_records URL
+        """
         def _get_id(fr):
             if hasattr(fr, 'failed_record_id'):
                 return str(fr.failed_record_id)
@@ -475,13 +1071,16 @@ class UsageClient:
         else:
             failed_ids = [_get_id(failed_records_or_ids)]
 
-        fids = ','.join(failed_ids)
+        return ','.join(failed_ids)
 
-        url = self.usage_url + 'usage/failed/{}'.format(fids)
-
-        r = self._session.delete(url)
-        r.raise_for_status()
-        return True
+    @staticmethod
+    def _status_params(from_time, to_time):
+        """
+        Builds the query parameters for status
+        """
+        from_iso = from_time.isoformat() if from_time is not None else None
+        to_iso = to_time.isoformat() if to_time is not None else None
+        return {'FromTime': from_iso, 'ToTime': to_iso}
 
     def status(self, from_time=None, to_time=None):
         """
@@ -493,14 +1092,13 @@ class UsageClient:
             to_date (Datetime): End date and time
 
         """
-        from_iso = from_time.isoformat() if from_time is not None else None
-        to_iso = to_time.isoformat() if to_time is not None else None
-        p = {'FromTime': from_iso, 'ToTime': to_iso}
+        p = self._status_params(from_time, to_time)
 
         url = self.usage_url + 'usage/status'
-        r = self._session.get(url, params=p)
+        r = self._request('status', 'GET', url, params=p)
         if r.status_code > 200:
             # Get the message if we're given one; otherwise
             msg = r.json().get('error', 'Bad Request, but error not specified by server')
             raise UsageResponseError(msg)
-        return UsageStatus.from_list(r.json())
+        response = self._decode('status', 'json', r.json)
+        return self._decode('status', 'from_dict', UsageStatus.from_list, response)
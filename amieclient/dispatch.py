@@ -0,0 +1,236 @@
+"""
+Dispatching packets to handlers by packet type
+"""
+import threading
+import time
+
+from collections import OrderedDict
+
+from .client import _run_concurrently
+from .metrics import DEFAULT_BUCKETS, _Histogram
+from .packet.base import Packet
+
+
+def _handler_name(handler):
+    return getattr(handler, '__qualname__', None) or repr(handler)
+
+
+class DispatchResult(object):
+    """
+    What happened to one packet given to PacketDispatcher.dispatch().
+
+    Attributes:
+        packet: The packet that was dispatched.
+        handler: The handler it was given to, or None if there wasn't one.
+        replies (list): The reply packets the handler returned.
+        error (Exception): The error the handler raised, if it failed, or the
+            TypeError from it returning something other than replies.
+        sent (list of RequestResult): The results of sending each of replies,
+            if they were sent.
+    """
+    def __init__(self, packet, handler=None, replies=None, error=None):
+        self.packet = packet
+        self.handler = handler
+        self.replies = replies if replies is not None else []
+        self.error = error
+        self.sent = []
+
+    @property
+    def skipped(self):
+        """
+        True if no handler was registered for the packet
+        """
+        return self.handler is None
+
+    @property
+    def ok(self):
+        """
+        True if the handler succeeded, and any replies that were sent were
+        accepted
+        """
+        return self.error is None and all(r.ok for r in self.sent)
+
+    def __repr__(self):
+        if self.skipped:
+            status = 'no handler'
+        elif self.error is not None:
+            status = 'failed: {!r}'.format(self.error)
+        else:
+            status = '{} replies'.format(len(self.replies))
+        return "<DispatchResult: {p!r} {s}>".format(p=self.packet, s=status)
+
+
+class PacketDispatcher(object):
+    """
+    Hands each packet in a list to the handler registered for its type,
+    runs the handlers from a pool of threads, and sends the replies they
+    return all at once.
+
+    A handler takes a packet and returns its reply (usually built with
+    packet.reply_packet()), a list of replies, or None if there's nothing
+    to send. Handlers are looked up by the packet's class and then its base
+    classes, so a handler registered for a packet class also handles any
+    subclass of it registered with register_packet_type, and one
+    registered for Packet handles everything else.
+
+    How long each handler takes is kept as a histogram; see handler_stats().
+
+    Args:
+        client (amieclient.AMIEClient): The client to send replies with.
+            Can be None if you only want the replies.
+        max_workers (int): How many handlers to run at once. Handlers must be
+            thread-safe if this is more than 1.
+        send_concurrency (int): How many replies to send at once.
+        buckets (tuple): Upper bounds, in seconds, of the latency histogram
+            buckets.
+
+    Example:
+        >>> dispatcher = PacketDispatcher(amie_client, max_workers=8)
+        >>> @dispatcher.register(RequestAccountCreate)
+        ... def create_account(rac):
+        ...     nac = rac.reply_packet()
+        ...     nac.UserRemoteSiteLogin = make_account(rac)
+        ...     return nac
+        >>> results = dispatcher.dispatch(amie_client.list_packets(incoming=True))
+        >>> failed = [r for r in results if not r.ok]
+    """
+    def __init__(self, client=None, max_workers=4, send_concurrency=4,
+                 buckets=DEFAULT_BUCKETS):
+        self.client = client
+        self.max_workers = max_workers
+        self.send_concurrency = send_concurrency
+        self.buckets = buckets
+        self._handlers = {}
+        # Packet class -> handler, as found by walking its MRO
+        self._resolved = {}
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._errors = {}
+
+    def register(self, packet_type, handler=None):
+        """
+        Registers a handler for a packet class. Can also be used as a
+        decorator, by leaving out handler.
+
+        Args:
+            packet_type: The Packet subclass to handle, or its AMIE packet
+                type (e.g. 'request_account_create').
+            handler (callable): Takes a packet and returns its reply, a list
+                of replies, or None.
+        """
+        if isinstance(packet_type, type) and issubclass(packet_type, Packet):
+            packet_class = packet_type
+        else:
+            packet_class = Packet._find_packet_type(packet_type)
+
+        if handler is None:
+            def decorator(fn):
+                self.register(packet_class, fn)
+                return fn
+            return decorator
+
+        self._handlers[packet_class] = handler
+        self._resolved = {}
+        return handler
+
+    def handler_for(self, packet):
+        """
+        The handler for a packet, or None if there isn't one
+        """
+        cls = packet.__class__
+        try:
+            return self._resolved[cls]
+        except KeyError:
+            pass
+        handler = None
+        for klass in cls.__mro__:
+            if klass in self._handlers:
+                handler = self._handlers[klass]
+                break
+        self._resolved[cls] = handler
+        return handler
+
+    def _record(self, handler, elapsed, failed):
+        with self._lock:
+            if handler not in self._latency:
+                self._latency[handler] = _Histogram(self.buckets)
+                self._errors[handler] = 0
+            self._latency[handler].observe(elapsed)
+            if failed:
+                self._errors[handler] += 1
+
+    def _handle(self, packet):
+        handler = self.handler_for(packet)
+        if handler is None:
+            return DispatchResult(packet)
+        result = DispatchResult(packet, handler)
+        start = time.perf_counter()
+        try:
+            replies = handler(packet)
+            if replies is None:
+                replies = []
+            elif isinstance(replies, Packet):
+                replies = [replies]
+            result.replies = list(replies)
+        except Exception as e:
+            result.error = e
+        self._record(handler, time.perf_counter() - start, result.error is not None)
+        return result
+
+    def dispatch(self, packets, send=True):
+        """
+        Runs the handlers for a list of packets, then sends their replies in
+        one batch with the client's send_packets().
+
+        A handler that raises doesn't stop the others; its error is kept on
+        its packet's DispatchResult. Packets with no handler are skipped.
+
+        Args:
+            packets: An amieclient.PacketList, or an iterable of packets.
+            send (bool): Send the replies. If False, or the dispatcher has no
+                client, the replies are only collected.
+
+        Returns:
+            list of DispatchResult: One for each packet, in the order given.
+        """
+        if hasattr(packets, 'packets'):
+            packets = packets.packets
+        packets = list(packets)
+        results = [r.response for r in
+                   _run_concurrently(self._handle, packets, self.max_workers)]
+
+        if send and self.client is not None:
+            replies = [(result, reply) for result in results for reply in result.replies]
+            if replies:
+                sent = self.client.send_packets([reply for _, reply in replies],
+                                                concurrency=self.send_concurrency)
+                for (result, _), send_result in zip(replies, sent):
+                    result.sent.append(send_result)
+        return results
+
+    def handler_stats(self):
+        """
+        How long each handler has taken, as an OrderedDict keyed by handler,
+        slowest (by total time) first. Each value has the handler's name
+        (its __qualname__), the count and sum of its run times, the
+        cumulative counts in each latency bucket, and how many times it
+        raised an error or returned something that isn't a reply.
+        """
+        with self._lock:
+            stats = {}
+            for handler, h in self._latency.items():
+                stats[handler] = h.as_dict()
+                stats[handler]['name'] = _handler_name(handler)
+                stats[handler]['errors'] = self._errors[handler]
+        return OrderedDict(sorted(stats.items(), key=lambda item: -item[1]['sum']))
+
+    def reset_stats(self):
+        """
+        Clears the handler timings
+        """
+        with self._lock:
+            self._latency = {}
+            self._errors = {}
+
+    def __repr__(self):
+        return "<PacketDispatcher: {n} handlers>".format(n=len(self._handlers))
@@ -0,0 +1,260 @@
+"""
+Request metrics for the AMIE and usage clients
+"""
+import threading
+import time
+
+from bisect import bisect_left
+from collections import defaultdict
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+
+
+class _Histogram(object):
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket, plus one for anything above the last bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        (upper bound, count of values at or below it) for each bucket, ending
+        with (float('inf'), count)
+        """
+        total = 0
+        out = []
+        for bound, n in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(self.cumulative()),
+        }
+
+
+class _EndpointMetrics(object):
+    def __init__(self, buckets):
+        self.latency = _Histogram(buckets)
+        self.statuses = defaultdict(int)
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.decode = defaultdict(lambda: _Histogram(buckets))
+
+    def as_dict(self):
+        return {
+            'latency': self.latency.as_dict(),
+            'statuses': dict(self.statuses),
+            'errors': self.errors,
+            'retries': self.retries,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'decode': {stage: h.as_dict() for stage, h in self.decode.items()},
+        }
+
+
+def _prometheus_value(v):
+    if v == float('inf'):
+        return '+Inf'
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def _prometheus_labels(**labels):
+    return ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in sorted(labels.items()))
+
+
+class ClientMetrics(object):
+    """
+    Collects metrics about the requests an AMIEClient or UsageClient makes,
+    by endpoint (the name of the client method that made the request, like
+    list_packets or send):
+
+    - how long each request took, as a histogram. This is the whole of the
+      round trip, including connecting (DNS and TLS) when a new connection
+      is needed, and downloading the response body.
+    - the HTTP status codes of the responses, and how many requests failed
+      without a response at all
+    - bytes sent in request bodies, and received in response bodies
+    - how many requests were retried
+    - time spent decoding responses, separately from the request itself, by
+      stage: 'json' for parsing the response JSON, and 'from_dict' for turning
+      that into packets, transactions or usage responses.
+
+    Give one to a client with metrics=; a client with no metrics doesn't time
+    anything. The same ClientMetrics can be shared by several clients, and
+    by several threads.
+
+    To send metrics somewhere else as they happen, subclass ClientMetrics and
+    override observe_request, observe_error, observe_retry and observe_decode.
+
+    Args:
+        buckets (tuple): Upper bounds, in seconds, of the histogram buckets.
+
+    Example:
+        >>> metrics = ClientMetrics()
+        >>> client = AMIEClient(site_name='PSC', api_key=api_key, metrics=metrics)
+        >>> client.list_packets()
+        >>> print(metrics.prometheus_text())
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint):
+        # Only called with the lock held
+        m = self._endpoints.get(endpoint)
+        if m is None:
+            m = self._endpoints[endpoint] = _EndpointMetrics(self.buckets)
+        return m
+
+    def observe_request(self, endpoint, status_code, elapsed, bytes_sent,
+                        bytes_received):
+        """
+        Records a request that got a response
+
+        Args:
+            endpoint (str): Which endpoint the request was for.
+            status_code (int): The HTTP status of the response.
+            elapsed (float): How long the request took, in seconds.
+            bytes_sent (int): Size of the request body.
+            bytes_received (int): Size of the response body.
+        """
+        with self._lock:
+            m = self._endpoint(endpoint)
+            m.latency.observe(elapsed)
+            m.statuses[str(status_code)] += 1
+            m.bytes_sent += bytes_sent
+            m.bytes_received += bytes_received
+
+    def observe_error(self, endpoint, error):
+        """
+        Records a request that failed without a response, such as from a
+        connection error or timeout
+        """
+        with self._lock:
+            self._endpoint(endpoint).errors += 1
+
+    def observe_retry(self, endpoint):
+        """
+        Records that a request is being retried
+        """
+        with self._lock:
+            self._endpoint(endpoint).retries += 1
+
+    def observe_decode(self, endpoint, stage, elapsed):
+        """
+        Records time spent decoding a response
+
+        Args:
+            endpoint (str): Which endpoint the response was from.
+            stage (str): 'json' or 'from_dict'.
+            elapsed (float): How long decoding took, in seconds.
+        """
+        with self._lock:
+            self._endpoint(endpoint).decode[stage].observe(elapsed)
+
+    def reset(self):
+        """
+        Clears all of the metrics collected so far
+        """
+        with self._lock:
+            self._endpoints = {}
+
+    def as_dict(self):
+        """
+        The metrics collected so far, as a dictionary keyed by endpoint.
+        Histograms are dictionaries of their count, their sum, and the
+        cumulative count for each bucket, keyed by the bucket's upper bound.
+        """
+        with self._lock:
+            return {name: m.as_dict() for name, m in self._endpoints.items()}
+
+    def prometheus_text(self, prefix='amieclient'):
+        """
+        The metrics collected so far, in the Prometheus text exposition
+        format
+
+        Args:
+            prefix (str): Prefix for the metric names.
+        """
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = []
+
+            def header(name, kind, help_text):
+                lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+                lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+
+            def sample(name, value, **labels):
+                lines.append('{}_{}{{{}}} {}'.format(
+                    prefix, name, _prometheus_labels(**labels),
+                    _prometheus_value(value)))
+
+            def histogram(name, h, **labels):
+                for bound, count in h.cumulative():
+                    sample(name + '_bucket', count, le=_prometheus_value(bound), **labels)
+                sample(name + '_sum', h.sum, **labels)
+                sample(name + '_count', h.count, **labels)
+
+            header('request_duration_seconds', 'histogram',
+                   'Time taken by requests to the API.')
+            for name, m in endpoints:
+                histogram('request_duration_seconds', m.latency, endpoint=name)
+
+            header('responses_total', 'counter',
+                   'Responses from the API, by HTTP status.')
+            for name, m in endpoints:
+                for status, count in sorted(m.statuses.items()):
+                    sample('responses_total', count, endpoint=name, status=status)
+
+            for metric, attr, help_text in [
+                    ('request_errors_total', 'errors',
+                     'Requests that failed without a response.'),
+                    ('request_retries_total', 'retries', 'Requests retried.'),
+                    ('request_bytes_total', 'bytes_sent', 'Bytes sent in request bodies.'),
+                    ('response_bytes_total', 'bytes_received',
+                     'Bytes received in response bodies.')]:
+                header(metric, 'counter', help_text)
+                for name, m in endpoints:
+                    sample(metric, getattr(m, attr), endpoint=name)
+
+            header('decode_duration_seconds', 'histogram',
+                   'Time taken decoding responses, by stage.')
+            for name, m in endpoints:
+                for stage, h in sorted(m.decode.items()):
+                    histogram('decode_duration_seconds', h, endpoint=name, stage=stage)
+
+        return '\n'.join(lines) + '\n'
+
+    def __repr__(self):
+        with self._lock:
+            n = sum(m.latency.count for m in self._endpoints.values())
+        return "<ClientMetrics: {n} requests>".format(n=n)
+
+
+def _timed_decode(metrics, endpoint, stage, fn, *args, **kwargs):
+    """
+    Calls fn, recording how long it took in metrics if it isn't None
+    """
+    if metrics is None:
+        return fn(*args, **kwargs)
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    metrics.observe_decode(endpoint, stage, time.perf_counter() - start)
+    return result
@@ -14,9 +14,10 @@ from .project import (DataProjectCreate, NotifyProjectCreate,
                       )
 from .user import (NotifyUserModify, RequestUserModify)
 
-from .packetlist import PacketList
+from .packetlist import PacketList, PacketHeader
 
-from .base import Packet, PacketInvalidData, PacketInvalidType
+from .base import (Packet, PacketInvalidData, PacketInvalidType,
+                   register_packet_type)
 
 __all__ = ['DataAccountCreate', 'NotifyAccountCreate',
            'NotifyAccountInactivate', 'NotifyAccountReactivate',
@@ -27,4 +28,5 @@ __all__ = ['DataAccountCreate', 'NotifyAccountCreate',
            'NotifyProjectInactivate', 'NotifyProjectReactivate',
            'RequestProjectCreate', 'RequestProjectInactivate',
            'RequestProjectReactivate', 'NotifyUserModify', 'RequestUserModify',
-           'PacketList', 'Packet', 'PacketInvalidData', 'PacketInvalidType']
+           'PacketList', 'PacketHeader', 'Packet', 'PacketInvalidData', 'PacketInvalidType',
+           'register_packet_type']
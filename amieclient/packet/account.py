@@ -2,8 +2,7 @@
 AMIE packets relating to accounts
 """
 
-from .base import Packet, PacketInvalidData
-from .validators import _validate_resource_list
+from .base import Packet
 
 
 class DataAccountCreate(Packet):
@@ -63,20 +62,7 @@ class NotifyAccountCreate(Packet):
         'UserZip',
         'UserUID'
     ]
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class NotifyAccountInactivate(Packet):
@@ -85,20 +71,7 @@ class NotifyAccountInactivate(Packet):
     _data_keys_required = ['PersonID', 'ProjectID', 'ResourceList']
     _data_keys_not_required_in_reply = ['PersonID', 'ProjectID', 'ResourceList']
     _data_keys_allowed = ['Comment']
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class NotifyAccountReactivate(Packet):
@@ -107,24 +80,12 @@ class NotifyAccountReactivate(Packet):
     _data_keys_required = ['PersonID', 'ProjectID', 'ResourceList']
     _data_keys_not_required_in_reply = []
     _data_keys_allowed = ['Comment']
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class RequestAccountCreate(Packet):
     _packet_type = 'request_account_create'
+    _type_id = 16
     _expected_reply = ['notify_account_create']
     _data_keys_required = [
         'GrantNumber',
@@ -166,20 +127,7 @@ class RequestAccountCreate(Packet):
         'UserTitle',
         'UserZip',
     ]
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class RequestAccountInactivate(Packet):
@@ -188,20 +136,7 @@ class RequestAccountInactivate(Packet):
     _data_keys_required = ['PersonID', 'ProjectID', 'ResourceList']
     _data_keys_not_required_in_reply = []
     _data_keys_allowed = ['Comment']
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class RequestAccountReactivate(Packet):
@@ -210,17 +145,4 @@ class RequestAccountReactivate(Packet):
     _data_keys_required = ['PersonID', 'ProjectID', 'ResourceList']
     _data_keys_not_required_in_reply = []
     _data_keys_allowed = ['Comment']
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
@@ -1,9 +1,15 @@
 import json
+import re
 
 from datetime import datetime
 from collections import defaultdict
 from dateutil.parser import parse as dtparse
-from dateutil.tz import tzutc
+from dateutil.tz import tzoffset, tzutc
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class PacketInvalidData(Exception):
@@ -16,6 +22,47 @@ class PacketInvalidType(Exception):
     pass
 
 
+# The ISO 8601 format the AMIE server uses for timestamps and dates, e.g.
+# 2021-08-24T14:47:51.507Z or 2021-08-24
+_ISO_8601 = re.compile(r'(\d{4})-(\d\d)-(\d\d)'
+                       r'(?:[T ](\d\d):(\d\d)(?::(\d\d)(?:\.(\d{1,6})\d*)?)?)?'
+                       r'(Z|[+-]\d\d(?::?\d\d)?)?$')
+
+# Exactly the format Packet.json() gives timestamps in. Timestamps we got
+# from the server in this format are passed through without being parsed.
+_JSON_TIMESTAMP = re.compile(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z$')
+
+
+def _parse_datetime(value):
+    """
+    Parses a timestamp or date string into a datetime. Strings in the ISO
+    8601 format that the server sends are parsed directly; anything else is
+    handed off to dateutil. Either way, the result is the same as
+    dateutil.parser.parse would give.
+    """
+    m = _ISO_8601.match(value)
+    if m is None:
+        return dtparse(value)
+    year, month, day, hour, minute, second, fraction, tz = m.groups()
+    if tz is None:
+        tzinfo = None
+    elif tz == 'Z':
+        tzinfo = tzutc()
+    else:
+        offset = int(tz[1:3]) * 3600 + (int(tz[-2:]) * 60 if len(tz) > 3 else 0)
+        if tz[0] == '-':
+            offset = -offset
+        tzinfo = tzoffset(None, offset) if offset else tzutc()
+    try:
+        return datetime(int(year), int(month), int(day),
+                        int(hour or 0), int(minute or 0), int(second or 0),
+                        int(fraction.ljust(6, '0')) if fraction else 0,
+                        tzinfo=tzinfo)
+    except ValueError:
+        # Out of range values, which dateutil has its own ideas about
+        return dtparse(value)
+
+
 # Closures, for properly handling properties
 # in the metaclass
 def _make_get_required(key):
@@ -48,12 +95,175 @@ def _make_set_allowed(key):
     return set_allowed
 
 
+def _declared_keys(cls, attr):
+    """
+    The data keys declared in attr by a packet class and its bases, base
+    classes first. Properties for all of them are on the class, so these
+    are all the keys its packets can hold data for.
+    """
+    keys = []
+    for klass in reversed(cls.__mro__):
+        for k in klass.__dict__.get(attr, []):
+            if k not in keys:
+                keys.append(k)
+    return tuple(keys)
+
+
+def _present(data):
+    """
+    The items of a data dict that have a value. Returns the dict itself when
+    they all do, as they usually all do.
+    """
+    if None in data.values():
+        return {k: v for k, v in data.items() if v is not None}
+    return data
+
+
+def _encode_packet(pkt, timestamp):
+    """
+    Turns a packet into a dictionary, for as_dict() and json(). Datetimes in
+    the body are formatted with isoformat(), whatever key they're under.
+    """
+    body = {**_present(pkt._required_data), **_present(pkt._allowed_data)}
+    if pkt.additional_data:
+        body.update(_present(pkt.additional_data))
+    for k in [k for k, v in body.items() if isinstance(v, datetime)]:
+        body[k] = body[k].isoformat()
+
+    header = {
+        'packet_rec_id': pkt.packet_rec_id,
+        'packet_id': pkt.packet_id,
+        'transaction_id': pkt.transaction_id,
+        'trans_rec_id': pkt.trans_rec_id,
+        'expected_reply_list': pkt.expected_reply,
+        'local_site_name': pkt.local_site_name,
+        'remote_site_name': pkt.remote_site_name,
+        'originating_site_name': pkt.originating_site_name,
+        'outgoing_flag': pkt.outgoing_flag,
+        'transaction_state': pkt.transaction_state,
+        'packet_state': pkt.packet_state,
+        'packet_timestamp': timestamp,
+    }
+    if pkt.in_reply_to_id:
+        header['in_reply_to'] = pkt.in_reply_to_id
+    if pkt.client_state:
+        header['client_state'] = pkt.client_state
+    if pkt._client_json:
+        header['client_json'] = pkt._client_json
+    data_dict = {
+        'DATA_TYPE': 'Packet',
+        'type': pkt._packet_type,
+        'body': body,
+        'header': header
+    }
+    if pkt.type_id is not None:
+        data_dict['type_id'] = pkt.type_id
+    return data_dict
+
+
+def _json_timestamp(timestamp):
+    """
+    Formats a packet timestamp the way the server does, e.g.
+    2021-08-24T14:47:51.507Z
+    """
+    if isinstance(timestamp, str):
+        if _JSON_TIMESTAMP.match(timestamp):
+            return timestamp
+        timestamp = _parse_datetime(timestamp)
+    t = timestamp.astimezone(tzutc())
+    return '%04d-%02d-%02dT%02d:%02d:%02d.%03dZ' % (
+        t.year, t.month, t.day, t.hour, t.minute, t.second, t.microsecond // 1000)
+
+
+def _make_validator(cls):
+    """
+    Builds the function that checks packets of one class against the
+    schema declared on it (see Packet), and returns a list of what's wrong
+    """
+    required = frozenset(_declared_keys(cls, '_data_keys_required'))
+    not_required_in_reply = frozenset(cls._data_keys_not_required_in_reply)
+    # Each key is paired with whether it's kept in the packet's required data
+    single_element = tuple((k, k in required) for k in cls._data_keys_single_element)
+    either = tuple((a, a in required, b, b in required) for a, b in cls._data_keys_either)
+    choices = tuple((k, k in required, tuple(c)) for k, c in cls._data_key_choices.items())
+    packet_type = getattr(cls, '_packet_type', None)
+
+    def validation_errors(pkt):
+        errors = []
+        required_data = pkt._required_data
+        allowed_data = pkt._allowed_data
+        if None in required_data.values():
+            in_reply = bool(pkt.in_reply_to_id)
+            for k, v in required_data.items():
+                # If this is a packet in reply to another, and this key is
+                # one that the server can infer, skip it.
+                if v is None and not (in_reply and k in not_required_in_reply):
+                    errors.append('Missing required data field: "{}"'.format(k))
+        for k, is_required in single_element:
+            v = (required_data if is_required else allowed_data).get(k)
+            if v is None:
+                continue
+            if not isinstance(v, list):
+                errors.append('{} must be a list'.format(k))
+            elif len(v) != 1:
+                errors.append('{} must have exactly one element'.format(k))
+        for a, a_required, b, b_required in either:
+            if ((required_data if a_required else allowed_data).get(a) is None and
+                    (required_data if b_required else allowed_data).get(b) is None):
+                errors.append('Must provide either {} or {}'.format(a, b))
+        for k, is_required, allowed in choices:
+            v = (required_data if is_required else allowed_data).get(k)
+            if v not in allowed:
+                errors.append('Invalid {} for {}: "{}", must be one of {}'.format(
+                    k, packet_type, v, ', '.join(allowed)))
+        return errors
+    return validation_errors
+
+
+# Packet classes, keyed by their AMIE packet type, and by their type_id
+# for those that declare one. Filled in by MetaPacket and register_packet_type
+_packet_types = {}
+_packet_type_ids = {}
+
+
+def register_packet_type(packet_class, type_id=None):
+    """
+    Registers a packet class as the one to use for its packet type, and
+    optionally for the given numeric type_id.
+
+    Every class that declares its own _packet_type is registered when it is
+    defined. Use this to have a subclass of one of those classes (e.g. a
+    site-specific version of RequestAccountCreate) be used instead when
+    packets of that type are decoded or replied to. Can also be used as a
+    class decorator.
+
+    Args:
+        packet_class: The Packet subclass to register
+        type_id (int): The type_id for this packet type, if known. Defaults to
+            the class's _type_id attribute.
+    """
+    if not (isinstance(packet_class, type) and issubclass(packet_class, Packet)):
+        raise PacketInvalidType("{!r} is not a Packet class".format(packet_class))
+    _packet_types[packet_class._packet_type] = packet_class
+    if type_id is None:
+        type_id = packet_class._type_id
+    if type_id is not None:
+        _packet_type_ids[int(type_id)] = packet_class
+    return packet_class
+
+
 class MetaPacket(type):
     """Metaclass for packets.
 
     Looks at the _data_keys_allowed and _data_keys_required attributes
     when a subclass is declared, then adds class properties that
     stores the information in two separate dictionaries on the object.
+
+    Each class also gets its own validator, built from the schema it
+    declares.
+
+    Classes that declare a _packet_type are also registered as the class
+    for that packet type.
     """
     def __new__(cls, name, base, attrs):
         required_fields = attrs.get('_data_keys_required', [])
@@ -65,26 +275,36 @@ class MetaPacket(type):
         for k in allowed_fields:
             attrs[k] = property(_make_get_allowed(k), _make_set_allowed(k))
 
-        # fix expected_replies to add a default timeouts
-        expected_replies = attrs.get('_expected_reply', [])
-        expected_with_timeouts = []
-        for r in expected_replies:
-            if isinstance(r, dict):
-                expected_with_timeouts.append(r)
-            elif isinstance(r, Packet):
-                expected_with_timeouts.append(
-                    {'type': r._packet_type,
-                     'timeout': 30240}
-                )
-            elif isinstance(r, str):
-                expected_with_timeouts.append(
-                    {'type': r,
-                     'timeout': 30240}
-                )
-            else:
-                raise Exception("Invalid reply_type")
-        attrs['expected_reply'] = expected_with_timeouts
-        return type.__new__(cls, name, base, attrs)
+        # fix expected_replies to add a default timeouts. Subclasses that
+        # don't declare their own expected replies keep their parent's
+        if ('_expected_reply' in attrs or
+                not any(hasattr(b, 'expected_reply') for b in base)):
+            expected_replies = attrs.get('_expected_reply', [])
+            expected_with_timeouts = []
+            for r in expected_replies:
+                if isinstance(r, dict):
+                    expected_with_timeouts.append(r)
+                elif isinstance(r, type) and issubclass(r, Packet):
+                    expected_with_timeouts.append(
+                        {'type': r._packet_type,
+                         'timeout': 30240}
+                    )
+                elif isinstance(r, str):
+                    expected_with_timeouts.append(
+                        {'type': r,
+                         'timeout': 30240}
+                    )
+                else:
+                    raise Exception("Invalid reply_type")
+            attrs['expected_reply'] = expected_with_timeouts
+        new_cls = type.__new__(cls, name, base, attrs)
+        new_cls._validation_errors = staticmethod(_make_validator(new_cls))
+        new_cls._required_in_reply = tuple(
+            k for k in new_cls._data_keys_required
+            if k not in new_cls._data_keys_not_required_in_reply)
+        if '_packet_type' in attrs:
+            register_packet_type(new_cls)
+        return new_cls
 
 
 class Packet(object, metaclass=MetaPacket):
@@ -99,6 +319,13 @@ class Packet(object, metaclass=MetaPacket):
                                           whose value can be inferred if
                                           this is a reply packet
         _data_keys_allowed: Data keys that are allowed for this packet type
+        _data_keys_single_element: Data keys whose value must be a list with
+                                   exactly one element, like ResourceList
+        _data_keys_either: Pairs of data keys, at least one of which must
+                           have a value
+        _data_key_choices: The values allowed for data keys that only take
+                           certain values (dict of key to list of values)
+        _type_id: the numeric type_id the server uses for this packet type, if known
 
 
     Args:
@@ -110,7 +337,11 @@ class Packet(object, metaclass=MetaPacket):
     _data_keys_required = []
     _data_keys_not_required_in_reply = []
     _data_keys_allowed = []
+    _data_keys_single_element = []
+    _data_keys_either = []
+    _data_key_choices = {}
     _expected_replies = []
+    _type_id = None
 
     def __init__(self, packet_rec_id=None, trans_rec_id=None,
                  packet_id=None, transaction_id=None,
@@ -149,12 +380,10 @@ class Packet(object, metaclass=MetaPacket):
         self._original_data = _original_data
 
         self.additional_data = additional_data if additional_data is not None else {}
-        if isinstance(packet_timestamp, datetime):
+        if (isinstance(packet_timestamp, (datetime, str)) or
+                packet_timestamp is None):
+            # Strings are parsed the first time packet_timestamp is read
             self._packet_timestamp = packet_timestamp
-        elif isinstance(packet_timestamp, str):
-            self._packet_timestamp = dtparse(packet_timestamp)
-        elif packet_timestamp is None:
-            self._packet_timestamp = None
         else:
             ts_type = type(packet_timestamp)
             packet_error = 'Invalid type for timestamp: {} is {}, must be parsable str or datetime object'.format(packet_timestamp, ts_type)
@@ -175,9 +404,9 @@ class Packet(object, metaclass=MetaPacket):
 
         for key, value in kwargs.items():
             if key in self._data_keys_required or key in self._data_keys_allowed:
-                if 'Date' in key:
+                if 'Date' in key and isinstance(value, str):
                     # TODO check if this is a valid assumption
-                    setattr(self, key, dtparse(value))
+                    setattr(self, key, _parse_datetime(value))
                 else:
                     setattr(self, key, value)
             else:
@@ -185,6 +414,8 @@ class Packet(object, metaclass=MetaPacket):
 
     @property
     def packet_timestamp(self):
+        if isinstance(self._packet_timestamp, str):
+            self._packet_timestamp = _parse_datetime(self._packet_timestamp)
         return self._packet_timestamp
 
     @property
@@ -205,19 +436,17 @@ class Packet(object, metaclass=MetaPacket):
     @classmethod
     def _find_packet_type(cls, packet_or_packet_type):
         """
-        Finds the class for the given packet or packet type
+        Finds the class for the given packet, packet type, or type_id
         """
-        pkt_cls = None
-        if type(packet_or_packet_type) == str:
-            # We're given a string, search in
-            # subclasses
-            for subclass in Packet.__subclasses__():
-                if subclass._packet_type == packet_or_packet_type:
-                    pkt_cls = subclass
-                    break
-        elif packet_or_packet_type.__class__ in Packet.__subclasses__():
+        if isinstance(packet_or_packet_type, str):
+            pkt_cls = _packet_types.get(packet_or_packet_type)
+        elif isinstance(packet_or_packet_type, int):
+            pkt_cls = _packet_type_ids.get(packet_or_packet_type)
+        elif isinstance(packet_or_packet_type, Packet):
             # We've been given a packet, just get its class attribute
             pkt_cls = packet_or_packet_type.__class__
+        else:
+            pkt_cls = None
 
         if pkt_cls is None:
             # Raise a NotImplementedError if we can't find a subclass
@@ -234,7 +463,7 @@ class Packet(object, metaclass=MetaPacket):
             data (dict): Packet data
         """
         # Get the subclass that matches this json input
-        pkt_class = cls._find_packet_type(data['type'])
+        pkt_class = cls._find_packet_type(data.get('type', data.get('type_id')))
 
         obj = pkt_class(packet_rec_id=data['header']['packet_rec_id'],
                         trans_rec_id=data['header']['trans_rec_id'],
@@ -328,46 +557,7 @@ class Packet(object, metaclass=MetaPacket):
         """
         This packet, as a dictionary.
         """
-        data_body = {}
-        # Filter out non-defined items from our data collections, converting
-        # if neccessary
-        for d in [self._required_data, self._allowed_data, self.additional_data]:
-            for k, v in d.items():
-                if isinstance(v, datetime):
-                    data_body[k] = v.isoformat()
-                elif v is not None:
-                    data_body[k] = v
-
-        header = {
-            'packet_rec_id': self.packet_rec_id,
-            'packet_id': self.packet_id,
-            'transaction_id': self.transaction_id,
-            'trans_rec_id': self.trans_rec_id,
-            'expected_reply_list': self.expected_reply,
-            'local_site_name': self.local_site_name,
-            'remote_site_name': self.remote_site_name,
-            'originating_site_name': self.originating_site_name,
-            'outgoing_flag': self.outgoing_flag,
-            'transaction_state': self.transaction_state,
-            'packet_state': self.packet_state,
-            'packet_timestamp': self.packet_timestamp,
-        }
-        if self.in_reply_to_id:
-            header['in_reply_to'] = self.in_reply_to_id
-        if self.client_state:
-            header['client_state'] = self.client_state
-        if self.client_json:
-            header['client_json'] = self.client_json
-        data_dict = {
-            'DATA_TYPE': 'Packet',
-            'type': self.packet_type,
-            'body': data_body,
-            'header': header
-        }
-        if self.type_id is not None:
-            data_dict['type_id'] = self.type_id
-
-        return data_dict
+        return _encode_packet(self, self.packet_timestamp)
 
     def missing_attributes(self):
         """
@@ -375,29 +565,33 @@ class Packet(object, metaclass=MetaPacket):
         order for this packet to be valid.
         """
         if self.in_reply_to_id:
-            reqd = list(set(self._data_keys_required)
-                        - set(self._data_keys_not_required_in_reply))
+            reqd = self._required_in_reply
         else:
             reqd = self._data_keys_required
 
         missing = [r for r in reqd if self._required_data.get(r) is None]
         return missing
 
-    def json(self, **json_kwargs):
+    def json(self, fast=False, **json_kwargs):
         """
         The JSON representation of this AMIE packet
+
+        Args:
+            fast (bool): Serialize with orjson, if it's installed and no
+                json_kwargs are given. The JSON is the same apart from
+                whitespace, and non-ASCII characters not being escaped.
+            **json_kwargs: Passed on to json.dumps.
         """
-        # We need to format the datetime object before the JSON serializer can handle it
-        d = self.as_dict()
-        # 2021-08-24T14:47:51.507Z
-        if d['header']['packet_timestamp'] is not None:
-            formatted_time = (d['header']['packet_timestamp']
-                              .astimezone(tzutc())
-                              .isoformat()
-                              .split('+', 1)[0][:-3] + 'Z')
-            d['header']['packet_timestamp'] = formatted_time
-        else:
+        timestamp = self._packet_timestamp
+        d = _encode_packet(self, None if timestamp is None else _json_timestamp(timestamp))
+        if timestamp is None:
             del d['header']['packet_timestamp']
+        if fast and orjson is not None and not json_kwargs:
+            try:
+                return orjson.dumps(d).decode('utf-8')
+            except TypeError:
+                # Something orjson won't serialize, like a very large int
+                pass
         return json.dumps(d, **json_kwargs)
 
     def pretty_print(self):
@@ -406,28 +600,33 @@ class Packet(object, metaclass=MetaPacket):
         """
         print(self.json(indent=4, sort_keys=True))
 
+    def validation_errors(self):
+        """
+        Checks this packet against the schema for its type, and returns a list
+        of everything wrong with it, which is empty if it's valid.
+
+        Required data items must have a defined value, unless in_reply_to is
+        not None and the server can infer the item from the referenced packet.
+        The packet type's _data_keys_single_element, _data_keys_either and
+        _data_key_choices are checked as well.
+        """
+        return self._validation_errors(self)
+
     def validate_data(self, raise_on_invalid=False):
         """
-        By default, checks to see that all required data items have a
-        defined value, unless in_reply_to is not None (in which case,
-        we assume the missing data will be filled in based on the referenced
-        packet ID.
+        Checks to see that this packet is valid for its type (see
+        validation_errors).
 
-        Some packet types will override this function, or add additional checks.
+        Args:
+            raise_on_invalid (bool): Raise a PacketInvalidData with all the
+                errors, rather than returning False, if the packet is invalid
         """
-        for k, v in self._required_data.items():
-            # If this is a packet in reply to another, and this key is one that
-            # the server can infer, skip it.
-            if (self.in_reply_to_id and
-               k in self._data_keys_not_required_in_reply):
-                continue
-            # Otherwise, throw an error or return false.
-            elif v is None:
-                if raise_on_invalid:
-                    raise PacketInvalidData('Missing required data field: "{}"'.format(k))
-                else:
-                    return False
-        return True
+        errors = self.validation_errors()
+        if not errors:
+            return True
+        if raise_on_invalid:
+            raise PacketInvalidData('; '.join(errors))
+        return False
 
     @property
     def packet_type(self):
@@ -1,7 +1,121 @@
 import json
 
+from collections import namedtuple
+from collections.abc import MutableSequence
+
 from .base import Packet
 
+PacketHeader = namedtuple('PacketHeader',
+                          ['packet_type', 'type_id', 'packet_rec_id',
+                           'trans_rec_id', 'in_reply_to_id', 'client_state',
+                           'packet_state', 'transaction_state'],
+                          )
+
+
+def _int_or_none(v):
+    return int(v) if v is not None else None
+
+
+def _header_from_dict(data):
+    """
+    Gets the PacketHeader of a packet dictionary, without decoding the rest
+    of the packet
+    """
+    header = data['header']
+    return PacketHeader(
+        packet_type=data.get('type'),
+        type_id=_int_or_none(data.get('type_id')),
+        packet_rec_id=_int_or_none(header.get('packet_rec_id')),
+        trans_rec_id=_int_or_none(header.get('trans_rec_id')),
+        in_reply_to_id=_int_or_none(header.get('in_reply_to')),
+        client_state=header.get('client_state'),
+        packet_state=header.get('packet_state'),
+        transaction_state=header.get('transaction_state'),
+    )
+
+
+def _header_from_packet(pkt):
+    return PacketHeader(
+        packet_type=pkt.packet_type,
+        type_id=pkt.type_id,
+        packet_rec_id=pkt.packet_rec_id,
+        trans_rec_id=pkt.trans_rec_id,
+        in_reply_to_id=pkt.in_reply_to_id,
+        client_state=pkt.client_state,
+        packet_state=pkt.packet_state,
+        transaction_state=pkt.transaction_state,
+    )
+
+
+class _LazyPackets(MutableSequence):
+    """
+    A list of packets that holds on to the packet dictionaries we got from
+    the server, and only decodes each one into a Packet the first time it's
+    accessed.
+    """
+    def __init__(self, raw_packets):
+        self._raw = list(raw_packets)
+        self._packets = [None] * len(self._raw)
+
+    def _decoded(self, i):
+        pkt = self._packets[i]
+        if pkt is None:
+            pkt = Packet.from_dict(self._raw[i])
+            self._packets[i] = pkt
+        return pkt
+
+    def header(self, i):
+        pkt = self._packets[i]
+        if pkt is None:
+            return _header_from_dict(self._raw[i])
+        return _header_from_packet(pkt)
+
+    def is_decoded(self, i):
+        return self._packets[i] is not None
+
+    def select(self, indices):
+        """
+        Returns a new _LazyPackets with just the packets at the given
+        indices, without decoding any of them
+        """
+        selected = self.__class__([])
+        selected._raw = [self._raw[i] for i in indices]
+        selected._packets = [self._packets[i] for i in indices]
+        return selected
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._decoded(j) for j in range(*i.indices(len(self)))]
+        return self._decoded(i)
+
+    def __setitem__(self, i, pkt):
+        if isinstance(i, slice):
+            pkts = list(pkt)
+            self._packets[i] = pkts
+            self._raw[i] = [None] * len(pkts)
+        else:
+            self._packets[i] = pkt
+            self._raw[i] = None
+
+    def __delitem__(self, i):
+        del self._packets[i]
+        del self._raw[i]
+
+    def insert(self, i, pkt):
+        self._packets.insert(i, pkt)
+        self._raw.insert(i, None)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._decoded(i)
+
+    def __repr__(self):
+        decoded = sum(1 for p in self._packets if p is not None)
+        return "<LazyPackets: {d} of {n} decoded>".format(d=decoded, n=len(self))
+
 
 class PacketList(object):
     """
@@ -15,17 +129,72 @@ class PacketList(object):
             self.packets = []
 
     @classmethod
-    def from_dict(cls, dict_in):
+    def from_dict(cls, dict_in, lazy=False):
+        """
+        Generates a PacketList from a provided dictionary
+
+        Args:
+            dict_in (dict): Packet list data
+            lazy (bool): If true, each packet is only decoded the first time
+                it is accessed. Use header() or headers() to look at packets'
+                types, IDs and states without decoding them at all.
+        """
+        if lazy:
+            packets = _LazyPackets(dict_in['result'])
+        else:
+            packets = [Packet.from_dict(d) for d in dict_in['result']]
         pkt_list = cls(
             message=dict_in.get('message', ''),
-            packets=[Packet.from_dict(d) for d in dict_in['result']]
+            packets=packets
         )
         return pkt_list
 
     @classmethod
-    def from_json(cls, json_in):
+    def from_json(cls, json_in, lazy=False):
         pkt_list_in = json.loads(json_in)
-        return cls.from_dict(pkt_list_in)
+        return cls.from_dict(pkt_list_in, lazy=lazy)
+
+    def header(self, i):
+        """
+        The PacketHeader of the i-th packet: its packet_type, type_id,
+        packet_rec_id, trans_rec_id, in_reply_to_id, client_state,
+        packet_state and transaction_state. On a lazy PacketList, this
+        doesn't decode the packet.
+        """
+        if isinstance(self.packets, _LazyPackets):
+            return self.packets.header(i)
+        return _header_from_packet(self.packets[i])
+
+    def headers(self):
+        """
+        Generator that yields the PacketHeader of each packet, in order.
+        """
+        for i in range(len(self.packets)):
+            yield self.header(i)
+
+    def _select(self, indices):
+        """
+        Returns a new PacketList with just the packets at the given indices.
+        If this list is lazy, so is the new one.
+        """
+        if isinstance(self.packets, _LazyPackets):
+            packets = self.packets.select(indices)
+        else:
+            packets = [self.packets[i] for i in indices]
+        return self.__class__(message=self.message, packets=packets)
+
+    def validation_errors(self):
+        """
+        Checks every packet in the list, and returns a dictionary of the
+        validation errors (see Packet.validation_errors) of the invalid ones,
+        keyed by their index. Empty if they're all valid.
+        """
+        errors = {}
+        for i, pkt in enumerate(self.packets):
+            pkt_errors = pkt.validation_errors()
+            if pkt_errors:
+                errors[i] = pkt_errors
+        return errors
 
     def as_dict(self):
         data_dict = {
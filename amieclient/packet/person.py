@@ -2,7 +2,7 @@
 AMIE packets relating to persons
 """
 
-from .base import Packet, PacketInvalidData
+from .base import Packet
 
 
 class NotifyPersonDuplicate(Packet):
@@ -11,26 +11,7 @@ class NotifyPersonDuplicate(Packet):
     _data_keys_required = []
     _data_keys_not_required_in_reply = []
     _data_keys_allowed = ['GlobalID1', 'GlobalID2', 'PersonID1', 'PersonID2']
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there are no unallowed tags, and additionally checks to
-        make sure that either a global ID or person ID is provided for
-        the two duplicate people
-        """
-        if (self._allowed_data.get('GlobalID1') is None and
-                self._allowed_data.get('PersonID1') is None):
-            if raise_on_invalid:
-                raise PacketInvalidData('Must provide either GlobalID1 or PersonID1')
-            else:
-                return False
-        if (self._allowed_data.get('GlobalID2') is None and
-                self._allowed_data.get('PersonID2') is None):
-            if raise_on_invalid:
-                raise PacketInvalidData('Must provide either GlobalID2 or PersonID2')
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_either = [('GlobalID1', 'PersonID1'), ('GlobalID2', 'PersonID2')]
 
 
 class NotifyPersonIDs(Packet):
@@ -2,8 +2,7 @@
 AMIE packets relating to projects
 """
 
-from .base import Packet, PacketInvalidData
-from .validators import _validate_resource_list
+from .base import Packet
 
 
 class DataProjectCreate(Packet):
@@ -74,20 +73,7 @@ class NotifyProjectCreate(Packet):
         'RoleList',
         'Sfos',
     ]
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class NotifyProjectInactivate(Packet):
@@ -98,20 +84,7 @@ class NotifyProjectInactivate(Packet):
         'Comment', 'PersonID', 'ProjectID', 'ResourceList'
     ]
     _data_keys_allowed = []
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class NotifyProjectReactivate(Packet):
@@ -122,20 +95,7 @@ class NotifyProjectReactivate(Packet):
         'Comment', 'PersonID', 'ProjectID', 'ResourceList'
     ]
     _data_keys_allowed = []
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class RequestProjectCreate(Packet):
@@ -194,20 +154,7 @@ class RequestProjectCreate(Packet):
         'Sfos',
         'SitePersonId',
     ]
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class RequestProjectInactivate(Packet):
@@ -223,20 +170,7 @@ class RequestProjectInactivate(Packet):
                           'ServiceUnitsAllocated',
                           'ServiceUnitsRemaining',
                           ]
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
 
 
 class RequestProjectReactivate(Packet):
@@ -253,17 +187,4 @@ class RequestProjectReactivate(Packet):
                           'ServiceUnitsAllocated',
                           'ServiceUnitsRemaining'
                           ]
-
-    def validate_data(self, raise_on_invalid=False):
-        """
-        Validates that there is only one element in the ResourceList attribute
-        """
-        try:
-            _validate_resource_list(self)
-
-        except PacketInvalidData as e:
-            if raise_on_invalid:
-                raise e
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_keys_single_element = ['ResourceList']
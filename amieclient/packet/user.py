@@ -2,11 +2,11 @@
 AMIE packets relating to users
 """
 
-from .base import Packet, PacketInvalidData
+from .base import Packet
 
 
 class NotifyUserModify(Packet):
-    _packet_type = 'notify_account_inactivate'
+    _packet_type = 'notify_user_modify'
     _expected_reply = [{'type': 'inform_transaction_complete', 'timeout': 30240}]
     _data_keys_required = [
         'ActionType',
@@ -34,16 +34,7 @@ class NotifyUserModify(Packet):
         'OrgCode',
         'State'
     ]
-
-    def validate_data(self, raise_on_invalid=False):
-        action_type = self.ActionType
-        if action_type not in ['add', 'delete', 'replace']:
-            if raise_on_invalid:
-                error_str = 'Invalid action type for notify_user_modify: "{}"'.format(action_type)
-                raise PacketInvalidData(error_str)
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_key_choices = {'ActionType': ['add', 'delete', 'replace']}
 
 
 class RequestUserModify(Packet):
@@ -82,13 +73,4 @@ class RequestUserModify(Packet):
         'Title',
         'Zip',
     ]
-
-    def validate_data(self, raise_on_invalid=False):
-        action_type = self.ActionType
-        if action_type not in ['add', 'delete', 'replace']:
-            if raise_on_invalid:
-                error_str = 'Invalid action type for request_user_modify: "{}"'.format(action_type)
-                raise PacketInvalidData(error_str)
-            else:
-                return False
-        return super().validate_data(raise_on_invalid)
+    _data_key_choices = {'ActionType': ['add', 'delete', 'replace']}
@@ -0,0 +1,127 @@
+"""
+Incremental polling for packets
+"""
+import json
+import os
+
+from datetime import datetime, timedelta
+
+from dateutil.tz import tzutc
+
+from .packet.base import _parse_datetime
+
+
+class PacketPoller(object):
+    """
+    Polls the AMIE API for packets, keeping track (in a JSON file) of when it
+    last polled and which packets it has already handed out. Each poll only
+    asks the server for packets updated since the last one, and drops any
+    packets we've already seen, unchanged, in an earlier poll.
+
+    A packet that comes back with a different packet, transaction or client
+    state than when we last saw it counts as changed, and is returned again.
+
+    State is only written to the file when you call commit(), so if your
+    process dies while working through a poll's packets, the next run will
+    get those packets again.
+
+    Args:
+        client (amieclient.AMIEClient): The client to poll with.
+        state_path (str): Path of the JSON file to keep state in. It's
+            created if it doesn't exist yet.
+        overlap (datetime.timedelta): Each poll asks for packets updated since
+            this long before the previous poll started, to allow for clock
+            differences with the server. Packets that show up in the overlap
+            are de-duplicated.
+        initial_start (datetime.datetime): Where the first ever poll starts.
+            If None, the first poll fetches every packet that matches.
+        **list_kwargs: Any other filters to pass to list_packets, such as
+            incoming=True or client_states.
+
+    Examples:
+        >>> poller = PacketPoller(amie_client, 'amie_poll_state.json', incoming=True)
+        >>> for packet in poller.poll().packets:
+        ...     handle(packet)
+        >>> poller.commit()
+    """
+    def __init__(self, client, state_path, overlap=timedelta(minutes=5),
+                 initial_start=None, **list_kwargs):
+        self.client = client
+        self.state_path = state_path
+        self.overlap = overlap
+        self.initial_start = initial_start
+        self._list_kwargs = list_kwargs
+        self._update_time = None
+        # packet_rec_id (as a string) -> [states, time last seen]
+        self._seen = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, 'r') as f:
+            state = json.load(f)
+        if state.get('update_time') is not None:
+            self._update_time = _parse_datetime(state['update_time'])
+        self._seen = state.get('seen', {})
+
+    def commit(self):
+        """
+        Saves the poller's state, marking the packets from every poll so far
+        as handled.
+        """
+        state = {
+            'update_time': (self._update_time.isoformat()
+                            if self._update_time is not None else None),
+            'seen': self._seen,
+        }
+        # Write to a temporary file first, so a crash can't leave us with
+        # a half-written state file
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def update_time(self):
+        """
+        When the latest poll started, or None if we've never polled
+        """
+        return self._update_time
+
+    def poll(self):
+        """
+        Fetches the packets that are new, or have changed, since the last
+        poll.
+
+        Returns:
+            amieclient.PacketList: A lazy PacketList of the new and changed
+            packets.
+        """
+        now = datetime.now(tzutc())
+        if self._update_time is not None:
+            start = self._update_time - self.overlap
+        else:
+            start = self.initial_start
+
+        pkt_list = self.client.list_packets(update_time_start=start, lazy=True,
+                                            **self._list_kwargs)
+
+        now_str = now.isoformat()
+        new = []
+        for i, header in enumerate(pkt_list.headers()):
+            key = str(header.packet_rec_id)
+            states = [header.packet_state, header.transaction_state,
+                      header.client_state]
+            previous = self._seen.get(key)
+            if previous is None or previous[0] != states:
+                new.append(i)
+            self._seen[key] = [states, now_str]
+
+        # Anything we last saw before the next poll's window starts can only
+        # come back if it's been updated, so we can forget about it
+        cutoff = now - self.overlap
+        self._seen = {k: v for k, v in self._seen.items()
+                      if _parse_datetime(v[1]) >= cutoff}
+        self._update_time = now
+        return pkt_list._select(new)
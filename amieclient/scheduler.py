@@ -0,0 +1,154 @@
+"""
+Ordering incoming packets by how soon their replies are due
+"""
+import heapq
+import itertools
+import threading
+
+from datetime import datetime, timedelta
+
+from dateutil.tz import tzutc
+
+from .metrics import _Histogram
+
+# Upper bounds, in seconds, of the buckets for how much time was left before
+# a packet's deadline when it was taken off the queue. Anything at or below
+# zero was overdue.
+SLACK_BUCKETS = (0, 3600, 6 * 3600, 86400, 3 * 86400, 7 * 86400,
+                 14 * 86400, 21 * 86400)
+
+_NO_DEADLINE = float('inf')
+
+
+def packet_deadline(packet):
+    """
+    When a reply to a packet is due: its packet_timestamp plus the shortest
+    timeout (in minutes) among its expected replies. None if the packet has
+    no timestamp or doesn't expect a reply.
+    """
+    timeouts = [r['timeout'] for r in packet.expected_reply if r.get('timeout') is not None]
+    timestamp = packet.packet_timestamp
+    if not timeouts or timestamp is None:
+        return None
+    return timestamp + timedelta(minutes=min(timeouts))
+
+
+class PacketScheduler(object):
+    """
+    A queue of packets waiting to be handled, in order of when their replies
+    are due (see packet_deadline), so that when there's a backlog, the
+    packets closest to timing out are handled first. Packets without a
+    deadline come after all the ones with one. Packets with the same
+    deadline come out in the order they were added.
+
+    A packet that's already waiting in the queue (going by packet_rec_id)
+    isn't added again, so the same backlog can be added from repeated
+    calls to list_packets().
+
+    Besides depth and the slack of the most urgent packet (see stats()),
+    the scheduler keeps a histogram of how much time was left before each
+    packet's deadline when it was taken off the queue.
+
+    Args:
+        packets: Packets, or an amieclient.PacketList, to start with.
+        slack_buckets (tuple): Upper bounds, in seconds, of the slack
+            histogram buckets.
+
+    Example:
+        >>> scheduler = PacketScheduler(amie_client.list_packets(incoming=True))
+        >>> dispatcher.dispatch(scheduler.drain())
+    """
+    def __init__(self, packets=None, slack_buckets=SLACK_BUCKETS):
+        self._heap = []
+        self._counter = itertools.count()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._slack = _Histogram(slack_buckets)
+        if packets is not None:
+            self.extend(packets)
+
+    def push(self, packet):
+        """
+        Adds a packet to the queue. Returns False if it was already waiting.
+        """
+        deadline = packet_deadline(packet)
+        key = deadline.timestamp() if deadline is not None else _NO_DEADLINE
+        with self._lock:
+            if packet.packet_rec_id is not None:
+                if packet.packet_rec_id in self._queued:
+                    return False
+                self._queued.add(packet.packet_rec_id)
+            heapq.heappush(self._heap, (key, next(self._counter), packet))
+        return True
+
+    def extend(self, packets):
+        """
+        Adds packets, or the packets in an amieclient.PacketList, to the queue
+        """
+        if hasattr(packets, 'packets'):
+            packets = packets.packets
+        for packet in packets:
+            self.push(packet)
+
+    def pop(self):
+        """
+        Removes and returns the packet whose reply is due soonest. Raises
+        IndexError if the queue is empty.
+        """
+        with self._lock:
+            key, _, packet = heapq.heappop(self._heap)
+            self._queued.discard(packet.packet_rec_id)
+            if key != _NO_DEADLINE:
+                self._slack.observe(key - datetime.now(tzutc()).timestamp())
+        return packet
+
+    def peek(self):
+        """
+        The packet whose reply is due soonest, without removing it, or None
+        if the queue is empty
+        """
+        with self._lock:
+            return self._heap[0][2] if self._heap else None
+
+    def drain(self):
+        """
+        Generator that removes and yields packets, soonest due first, until
+        the queue is empty
+        """
+        while True:
+            try:
+                yield self.pop()
+            except IndexError:
+                return
+
+    def __len__(self):
+        return len(self._heap)
+
+    def stats(self, now=None):
+        """
+        The scheduler's metrics, as a dictionary:
+
+        - depth: how many packets are waiting
+        - overdue: how many of those are past their deadline
+        - min_slack: seconds until the most urgent packet's deadline
+          (negative if it's overdue), or None if no packet has a deadline
+        - popped_slack: the histogram of the slack, in seconds, of packets
+          when they were taken off the queue, with the count, sum and
+          cumulative bucket counts
+
+        Args:
+            now (datetime.datetime): The time to measure slack from. Defaults
+                to the current time.
+        """
+        now = (now or datetime.now(tzutc())).timestamp()
+        with self._lock:
+            deadlines = [key for key, _, _ in self._heap if key != _NO_DEADLINE]
+            return {
+                'depth': len(self._heap),
+                'overdue': sum(1 for key in deadlines if key <= now),
+                'min_slack': (self._heap[0][0] - now) if deadlines else None,
+                'popped_slack': self._slack.as_dict(),
+            }
+
+    def __repr__(self):
+        return "<PacketScheduler: {n} packets>".format(n=len(self))
@@ -1,6 +1,8 @@
 import json
 import pytest
 
+from ..usage import ComputeUsageRecord, StorageUsageRecord
+
 # This one includes UserFavoriteColor: blue
 # to make sure that we handle unexpected data properly
 DEMO_JSON_PKT_1 = {
@@ -169,3 +171,29 @@ DEMO_JSON_SINGLE_PKT = {
   'message': '',
   'result': DEMO_JSON_PKT_1
 }
+
+
+def compute_record(i, job_name='test_job'):
+    return ComputeUsageRecord(
+        charge='1.0',
+        end_time='2021-08-24T15:47:51Z',
+        local_project_id='TST123',
+        local_record_id=str(i),
+        resource='test.psc.xsede',
+        start_time='2021-08-24T14:47:51Z',
+        submit_time='2021-08-24T14:40:00Z',
+        username='testuser',
+        node_count='1',
+        job_name=job_name,
+    )
+
+
+def storage_record(i):
+    return StorageUsageRecord(
+        charge='1.0',
+        collection_time='2021-08-24T14:47:51Z',
+        local_project_id='TST123',
+        local_record_id=str(i),
+        resource='test.psc.xsede',
+        username='testuser',
+    )
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import pytest
+
+from ..packet import RequestAccountCreate, PacketList
+from .fixtures import DEMO_JSON_SINGLE_PKT, DEMO_JSON_PKT_LIST, compute_record
+
+web = pytest.importorskip('aiohttp.web')
+
+from ..aio import AsyncAMIEClient, AsyncUsageClient  # noqa: E402
+
+
+def _run_with_server(routes, test_coro):
+    """
+    Runs test_coro(base_url) against a local aiohttp server with the given
+    routes
+    """
+    async def run():
+        app = web.Application()
+        app.add_routes(routes)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            await test_coro('http://127.0.0.1:{}/'.format(port))
+        finally:
+            await runner.cleanup()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+
+class TestAsyncAMIEClient:
+
+    def test_get_packet(self):
+        async def get_packet(request):
+            assert request.headers['XA-SITE'] == 'test'
+            assert request.match_info['packet_rec_id'] == '12345'
+            return web.json_response(DEMO_JSON_SINGLE_PKT)
+
+        async def test(base_url):
+            async with AsyncAMIEClient(site_name='test', api_key='test',
+                                       amie_url=base_url) as client:
+                packet = await client.get_packet(packet_rec_id='12345')
+            assert isinstance(packet, RequestAccountCreate)
+
+        routes = [web.get('/packets/test/{packet_rec_id}', get_packet)]
+        _run_with_server(routes, test)
+
+    def test_list_packets_concurrently(self):
+        async def list_packets(request):
+            assert request.query['incoming'] == 'True'
+            assert 'outgoing' not in request.query
+            return web.json_response(DEMO_JSON_PKT_LIST)
+
+        async def test(base_url):
+            async with AsyncAMIEClient(site_name='test', api_key='test',
+                                       amie_url=base_url) as client:
+                results = await asyncio.gather(*[client.list_packets(incoming=True)
+                                                 for _ in range(20)])
+            for r in results:
+                assert isinstance(r, PacketList)
+                assert r.packets[0].packet_type == 'request_account_create'
+
+        routes = [web.get('/packets/test', list_packets)]
+        _run_with_server(routes, test)
+
+
+class TestAsyncUsageClient:
+
+    def test_send_chunked(self):
+        bodies = []
+
+        async def post_usage(request):
+            body = await request.read()
+            bodies.append(body)
+            return web.json_response({'Message': 'ok'})
+
+        async def test(base_url):
+            async with AsyncUsageClient(site_name='test', api_key='test',
+                                        usage_url=base_url) as client:
+                client.max_request_size = 4096
+                responses = await client.send([compute_record(i) for i in range(100)])
+            assert len(responses) == len(bodies) > 1
+            sent = [r['LocalRecordID'] for b in bodies
+                    for r in json.loads(b.decode('utf-8'))['Records']]
+            assert sent == [str(i) for i in range(100)]
+
+        routes = [web.post('/usage/', post_usage)]
+        _run_with_server(routes, test)
@@ -0,0 +1,87 @@
+import pytest
+
+from ..cache import PacketCache
+from ..client import AMIEClient, AMIERequestError
+from .fixtures import DEMO_JSON_PKT_1, DEMO_JSON_SINGLE_PKT, DEMO_JSON_PKT_LIST
+
+PACKET_ID = DEMO_JSON_PKT_1['header']['packet_rec_id']
+PACKETS_URL = 'https://amieclient.xsede.org/v0.10/packets/test'
+PACKET_URL = PACKETS_URL + '/{}'.format(PACKET_ID)
+
+
+class TestPacketCache:
+
+    def test_get_packet_cached(self, requests_mock):
+        """
+        Packets are only fetched once, and each fetch gives a new Packet
+        """
+        cache = PacketCache()
+        client = AMIEClient(site_name='test', api_key='test', cache=cache)
+        requests_mock.get(PACKET_URL, json=DEMO_JSON_SINGLE_PKT)
+
+        first = client.get_packet(PACKET_ID)
+        second = client.get_packet(str(PACKET_ID))
+        assert requests_mock.call_count == 1
+        assert first is not second
+        assert first.packet_rec_id == second.packet_rec_id
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_list_packets_fills_cache(self, requests_mock):
+        cache = PacketCache()
+        client = AMIEClient(site_name='test', api_key='test', cache=cache)
+        requests_mock.get(PACKETS_URL, json=DEMO_JSON_PKT_LIST)
+        requests_mock.get(PACKET_URL, json=DEMO_JSON_SINGLE_PKT)
+
+        client.list_packets()
+        client.get_packet(PACKET_ID)
+        assert requests_mock.call_count == 1
+        assert cache.stats()['packets'] == 2
+
+    def test_client_state_invalidates(self, requests_mock):
+        cache = PacketCache()
+        client = AMIEClient(site_name='test', api_key='test', cache=cache)
+        requests_mock.get(PACKET_URL, json=DEMO_JSON_SINGLE_PKT)
+        requests_mock.put(PACKET_URL + '/client_state/done', json={})
+
+        packet = client.get_packet(PACKET_ID)
+        client.set_packet_client_state(packet, 'done')
+        client.get_packet(PACKET_ID)
+        assert requests_mock.request_history[-1].url == PACKET_URL
+        assert cache.misses == 2
+
+    def test_expired_revalidation(self, requests_mock):
+        """
+        Expired entries are revalidated with the server's ETag
+        """
+        cache = PacketCache(ttl=0)
+        client = AMIEClient(site_name='test', api_key='test', cache=cache)
+        requests_mock.get(PACKET_URL, json=DEMO_JSON_SINGLE_PKT,
+                          headers={'ETag': '"v1"'})
+        client.get_packet(PACKET_ID)
+
+        requests_mock.get(PACKET_URL, status_code=304)
+        packet = client.get_packet(PACKET_ID)
+        assert requests_mock.last_request.headers['If-None-Match'] == '"v1"'
+        assert packet.packet_rec_id == PACKET_ID
+        assert cache.revalidations == 1
+        assert cache.hits == 1
+
+    def test_unexpected_not_modified(self, requests_mock):
+        """
+        A 304 to a request we didn't make conditional is an error, with or
+        without a cache
+        """
+        requests_mock.get(PACKET_URL, status_code=304)
+        for cache in [None, PacketCache()]:
+            client = AMIEClient(site_name='test', api_key='test', cache=cache)
+            with pytest.raises(AMIERequestError):
+                client.get_packet(PACKET_ID)
+
+    def test_lru_eviction(self):
+        cache = PacketCache(maxsize=2)
+        for i in range(3):
+            cache._store('packet', i, {'header': {}})
+        assert cache._lookup('packet', 0) == (None, None)
+        assert cache._lookup('packet', 2)[0] is not None
+        assert cache.stats()['packets'] == 2
@@ -1,6 +1,16 @@
-from ..client import AMIEClient
-from ..packet import RequestAccountCreate, PacketList
-from .fixtures import DEMO_JSON_SINGLE_PKT, DEMO_JSON_PKT_LIST
+import copy
+import pytest
+
+from datetime import datetime, timedelta
+
+from dateutil.tz import tzutc
+
+from ..cache import PacketCache
+from ..client import AMIEClient, AMIERequestError
+from ..packet import Packet, PacketInvalidData, RequestAccountCreate, PacketList
+from ..transaction import Transaction
+from .fixtures import (DEMO_JSON_PKT_1, DEMO_JSON_SINGLE_PKT, DEMO_JSON_PKT_LIST,
+                       DEMO_JSON_TXN)
 
 
 class TestAMIEClient:
@@ -40,3 +50,124 @@ class TestAMIEClient:
         assert isinstance(r, PacketList)
         assert r.packets[0].packet_type == 'request_account_create'
         assert r.packets[1].packet_type == 'request_account_create'
+
+    def test_send_packets(self, requests_mock):
+        client = AMIEClient(site_name='test', api_key='test')
+        packet_url = 'https://amieclient.xsede.org/v0.10/packets/test'
+
+        def post_packet(request, context):
+            if request.json()['body']['Message'] == 'BAD':
+                context.status_code = 400
+                return {'message': 'bad packet'}
+            return {'message': 'ok'}
+
+        requests_mock.post(packet_url, json=post_packet)
+
+        parent = Packet.from_dict(DEMO_JSON_PKT_1)
+        good = parent.reply_with_failure()
+        rejected = parent.reply_with_failure(message='BAD')
+        invalid = parent.reply_with_failure()
+        invalid.StatusCode = None
+        results = client.send_packets([good, rejected, invalid], concurrency=2)
+
+        assert [r.item for r in results] == [good, rejected, invalid]
+        assert results[0].ok
+        assert isinstance(results[1].error, AMIERequestError)
+        assert isinstance(results[2].error, PacketInvalidData)
+        # The invalid packet is never sent
+        assert requests_mock.call_count == 2
+
+    def test_iter_packets(self, requests_mock):
+        """
+        Packets are fetched a window of update times at a time, and ones at
+        the boundary of two windows are only yielded once
+        """
+        client = AMIEClient(site_name='test', api_key='test')
+        packet_url = 'https://amieclient.xsede.org/v0.10/packets/test'
+
+        def packet(packet_rec_id):
+            d = copy.deepcopy(DEMO_JSON_PKT_1)
+            d['header']['packet_rec_id'] = packet_rec_id
+            return d
+
+        windows = {
+            '2021-08-01': [packet(1)],
+            '2021-08-02': [packet(1), packet(2)],
+            '2021-08-03': [packet(3)],
+        }
+
+        def get_window(request, context):
+            start = request.qs['update_time'][0].split('t')[0]
+            if start not in windows:
+                context.status_code = 400
+                return {'message': 'bad window'}
+            return {'message': '', 'result': windows[start]}
+
+        requests_mock.get(packet_url, json=get_window)
+        start = datetime(2021, 8, 1, tzinfo=tzutc())
+        packets = client.iter_packets(start, start + timedelta(days=3),
+                                      window=timedelta(days=1), incoming=True)
+        assert [p.packet_rec_id for p in packets] == [1, 2, 3]
+        assert requests_mock.call_count == 3
+        assert requests_mock.last_request.qs['incoming'] == ['true']
+
+        # An error fetching a window is raised when we get to it
+        packets = client.iter_packets(start, start + timedelta(days=4),
+                                      window=timedelta(days=1), prefetch=1)
+        assert [next(packets).packet_rec_id for _ in range(3)] == [1, 2, 3]
+        with pytest.raises(AMIERequestError):
+            next(packets)
+
+    def test_get_transactions(self, requests_mock, capsys):
+        client = AMIEClient(site_name='test', api_key='test')
+        txn_url = 'https://amieclient.xsede.org/v0.10/transactions/test/{}/packets'
+        requests_mock.get(txn_url.format(1), json={'result': DEMO_JSON_TXN})
+        requests_mock.get(txn_url.format(2), status_code=404,
+                          json={'message': 'not found'})
+
+        results = client.get_transactions([1, 2, 1], concurrency=2)
+        assert list(results) == [1, 2]
+        assert isinstance(results[1].response, Transaction)
+        assert len(results[1].response.packets) == 2
+        assert not results[2].ok
+        assert isinstance(results[2].error, AMIERequestError)
+        assert requests_mock.call_count == 2
+        assert capsys.readouterr().out == ''
+
+    def test_set_packets_client_state(self, requests_mock):
+        """
+        Packets are skipped if the server already has the state, going by
+        what we last fetched, not by changes made to the packet locally
+        """
+        client = AMIEClient(site_name='test', api_key='test', cache=PacketCache())
+        base_url = 'https://amieclient.xsede.org/v0.10/packets/test'
+        pkt_list = copy.deepcopy(DEMO_JSON_PKT_LIST)
+        pkt_list['result'][1]['header']['client_state'] = 'done'
+        requests_mock.get(base_url, json=pkt_list)
+        new_pkt, done_pkt = client.list_packets().packets
+        requests_mock.put('{}/{}/client_state/done'.format(base_url, new_pkt.packet_rec_id),
+                          json={})
+        requests_mock.put(base_url + '/2/client_state/done', status_code=404,
+                          json={'message': 'no such packet'})
+
+        new_pkt.client_state = 'done'
+        updates = [(new_pkt, 'done'), (done_pkt, 'done'),
+                   (done_pkt.packet_rec_id, 'done'), (2, 'done')]
+        results = client.set_packets_client_state(updates)
+        assert [r.item for r in results] == [u[0] for u in updates]
+        assert results[0].ok and not results[0].skipped
+        assert results[1].skipped and results[2].skipped
+        assert isinstance(results[3].error, AMIERequestError)
+        # One GET for the list, and the two PUTs that weren't skipped
+        assert requests_mock.call_count == 3
+
+    def test_clear_packets_client_json(self, requests_mock):
+        client = AMIEClient(site_name='test', api_key='test')
+        base_url = 'https://amieclient.xsede.org/v0.10/packets/test'
+        requests_mock.delete(base_url + '/1/client_json', json={})
+        packet = Packet.from_dict(DEMO_JSON_PKT_1)
+
+        results = client.clear_packets_client_json([packet, 1])
+        assert results[0].skipped
+        assert results[1].ok
+        assert requests_mock.call_count == 1
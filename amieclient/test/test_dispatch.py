@@ -0,0 +1,102 @@
+import copy
+
+from ..client import AMIEClient
+from ..dispatch import PacketDispatcher
+from ..packet import (Packet, PacketList, RequestAccountCreate,
+                      NotifyAccountCreate, DataAccountCreate,
+                      register_packet_type)
+from .fixtures import DEMO_JSON_PKT_1
+
+
+class TestPacketDispatcher:
+
+    def test_dispatch(self, requests_mock):
+        """
+        Each packet goes to its handler, and the replies are sent in one batch
+        """
+        client = AMIEClient(site_name='test', api_key='test')
+        packet_url = 'https://amieclient.xsede.org/v0.10/packets/test'
+        requests_mock.post(packet_url, json={'message': 'ok'})
+
+        dispatcher = PacketDispatcher(client, max_workers=2)
+
+        @dispatcher.register(RequestAccountCreate)
+        def create_account(rac):
+            nac = rac.reply_packet()
+            nac.UserRemoteSiteLogin = 'vraunak'
+            return nac
+
+        @dispatcher.register('data_account_create')
+        def data_account(dac):
+            raise RuntimeError('database is down')
+
+        rac = Packet.from_dict(copy.deepcopy(DEMO_JSON_PKT_1))
+        packet_list = PacketList(packets=[
+            rac, DataAccountCreate(PersonID='vraunak', ProjectID='CMU139'),
+            rac.reply_with_failure()])
+        results = dispatcher.dispatch(packet_list)
+
+        assert [r.packet for r in results] == packet_list.packets
+        rac_result = results[0]
+        assert rac_result.handler is create_account
+        assert isinstance(rac_result.replies[0], NotifyAccountCreate)
+        assert rac_result.ok and rac_result.sent[0].ok
+        assert isinstance(results[1].error, RuntimeError)
+        assert not results[1].ok
+        assert results[2].skipped
+        assert requests_mock.call_count == 1
+        assert requests_mock.last_request.json()['body']['UserRemoteSiteLogin'] == 'vraunak'
+
+        stats = dispatcher.handler_stats()
+        assert stats[create_account]['count'] == 1
+        assert stats[create_account]['name'] == \
+            'TestPacketDispatcher.test_dispatch.<locals>.create_account'
+        assert stats[data_account]['errors'] == 1
+
+    def test_handler_lookup(self):
+        """
+        Handlers are found through the packet's base classes, and replies are
+        only collected when there's no client
+        """
+        class SiteRequestAccountCreate(RequestAccountCreate):
+            pass
+
+        dispatcher = PacketDispatcher(max_workers=1)
+        dispatcher.register(Packet, lambda pkt: None)
+        dispatcher.register(RequestAccountCreate,
+                            lambda pkt: [pkt.reply_packet(), pkt.reply_with_failure()])
+        try:
+            register_packet_type(SiteRequestAccountCreate)
+            packet = Packet.from_dict(DEMO_JSON_PKT_1)
+            assert type(packet) is SiteRequestAccountCreate
+            assert dispatcher.handler_for(packet) is dispatcher._handlers[RequestAccountCreate]
+        finally:
+            register_packet_type(RequestAccountCreate)
+
+        results = dispatcher.dispatch([packet, packet.reply_with_failure()])
+        assert len(results[0].replies) == 2
+        assert results[0].sent == []
+        assert results[1].replies == [] and not results[1].skipped
+
+    def test_bad_reply(self, requests_mock):
+        """
+        A handler that returns something other than replies fails like one
+        that raises, and handlers with the same name are timed separately
+        """
+        client = AMIEClient(site_name='test', api_key='test')
+        dispatcher = PacketDispatcher(client, max_workers=1)
+        dispatcher.register(RequestAccountCreate, lambda pkt: 42)
+        dispatcher.register(DataAccountCreate, lambda pkt: None)
+
+        rac = Packet.from_dict(DEMO_JSON_PKT_1)
+        results = dispatcher.dispatch([rac, DataAccountCreate(PersonID='vraunak')])
+        assert isinstance(results[0].error, TypeError)
+        assert results[0].replies == []
+        assert results[1].ok
+        assert requests_mock.call_count == 0
+
+        stats = dispatcher.handler_stats()
+        assert len(stats) == 2
+        name = 'TestPacketDispatcher.test_bad_reply.<locals>.<lambda>'
+        assert [s['name'] for s in stats.values()] == [name, name]
+        assert stats[dispatcher.handler_for(rac)]['errors'] == 1
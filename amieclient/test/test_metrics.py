@@ -0,0 +1,55 @@
+import json
+import pytest
+
+from ..client import AMIEClient, AMIERequestError, UsageClient
+from ..metrics import ClientMetrics
+from .fixtures import DEMO_JSON_PKT_LIST, compute_record
+
+
+class TestClientMetrics:
+    def test_histogram_buckets(self):
+        metrics = ClientMetrics(buckets=(0.1, 1.0))
+        for elapsed in [0.05, 0.1, 0.5, 2.0]:
+            metrics.observe_request('list_packets', 200, elapsed, 0, 10)
+        latency = metrics.as_dict()['list_packets']['latency']
+        assert latency['count'] == 4
+        assert latency['sum'] == 2.65
+        # Buckets are cumulative, with values on a bound counting in it
+        assert latency['buckets'] == {0.1: 2, 1.0: 3, float('inf'): 4}
+
+    def test_amie_client(self, requests_mock):
+        metrics = ClientMetrics()
+        client = AMIEClient(site_name='test', api_key='test', metrics=metrics)
+        url = 'https://amieclient.xsede.org/v0.10/packets/test'
+        body = json.dumps(DEMO_JSON_PKT_LIST).encode()
+        requests_mock.get(url, content=body)
+        requests_mock.put(url + '/1/client_state/done', status_code=404,
+                          json={'message': 'nope'})
+
+        client.list_packets()
+        with pytest.raises(AMIERequestError):
+            client.set_packet_client_state(1, 'done')
+
+        d = metrics.as_dict()
+        assert d['list_packets']['latency']['count'] == 1
+        assert d['list_packets']['statuses'] == {'200': 1}
+        assert d['list_packets']['bytes_received'] == len(body)
+        assert set(d['list_packets']['decode']) == {'json', 'from_dict'}
+        assert d['set_packet_client_state']['statuses'] == {'404': 1}
+
+        text = metrics.prometheus_text()
+        assert '# TYPE amieclient_request_duration_seconds histogram' in text
+        assert 'amieclient_request_duration_seconds_bucket{endpoint="list_packets",le="+Inf"} 1' in text
+        assert 'amieclient_responses_total{endpoint="set_packet_client_state",status="404"} 1' in text
+        assert 'amieclient_decode_duration_seconds_count{endpoint="list_packets",stage="json"} 1' in text
+
+    def test_usage_client(self, requests_mock):
+        metrics = ClientMetrics()
+        client = UsageClient(site_name='test', api_key='test', metrics=metrics)
+        requests_mock.post('https://usage.xsede.org/api/v1/usage/',
+                           json={'Message': 'OK', 'ValidationFailedRecords': []})
+        client.send(compute_record(1, 'job'))
+        send = metrics.as_dict()['send']
+        assert send['latency']['count'] == 1
+        assert send['bytes_sent'] == len(requests_mock.last_request.body)
+        assert set(send['decode']) == {'json', 'from_dict'}
@@ -1,16 +1,20 @@
+import copy
 import pytest
 import json
 
 from datetime import datetime
 
-from dateutil.tz import tzutc
+from dateutil.tz import tzoffset, tzutc
 from dateutil.parser import parse as dtparse
 
 from ..packet import (Packet, RequestAccountCreate, Packet, PacketInvalidData,
                       NotifyAccountCreate, NotifyPersonDuplicate,
+                      NotifyProjectCreate,
                       NotifyUserModify, RequestUserModify,
-                      InformTransactionComplete)
-from .fixtures import DEMO_JSON_PKT_1, DEMO_JSON_PKT_2
+                      InformTransactionComplete, PacketInvalidType,
+                      PacketList, register_packet_type)
+from ..packet.base import _parse_datetime
+from .fixtures import DEMO_JSON_PKT_1, DEMO_JSON_PKT_2, DEMO_JSON_PKT_LIST
 
 
 
@@ -211,6 +215,43 @@ class TestClient:
             rum_packet.validate_data(raise_on_invalid=True)
         assert not rum_packet.validate_data()
 
+    def test_validation_errors(self):
+        """
+        validation_errors gives every problem with a packet at once, and
+        validate_data raises with all of them
+        """
+        npd_packet = NotifyPersonDuplicate('12345')
+        assert npd_packet.validation_errors() == [
+            'Must provide either GlobalID1 or PersonID1',
+            'Must provide either GlobalID2 or PersonID2',
+        ]
+        with pytest.raises(PacketInvalidData, match='GlobalID1.*; .*GlobalID2'):
+            npd_packet.validate_data(raise_on_invalid=True)
+
+        rac_packet = Packet.from_dict(DEMO_JSON_PKT_1)
+        assert rac_packet.validation_errors() == []
+        rac_packet.UserFirstName = None
+        rac_packet.ResourceList = ['a', 'b']
+        assert rac_packet.validation_errors() == [
+            'Missing required data field: "UserFirstName"',
+            'ResourceList must have exactly one element',
+        ]
+
+    def test_validation_schema_inherited(self):
+        """
+        Subclasses are checked against their parent's schema, plus their own
+        """
+        class SiteRequestUserModify(RequestUserModify):
+            _data_key_choices = {'ActionType': ['add']}
+            _data_keys_single_element = ['DnList']
+
+        packet = SiteRequestUserModify('12345', PersonID='abcde', ActionType='delete',
+                                       DnList=['a', 'b'])
+        assert packet.validation_errors() == [
+            'DnList must have exactly one element',
+            'Invalid ActionType for request_user_modify: "delete", must be one of add',
+        ]
+
     def test_packet_fidelity(self):
         """
         Make sure that the data we put into the packet is the same as the data
@@ -252,8 +293,8 @@ class TestClient:
                 assert pkt_v == v
 
     def test_packet_resourcelist_validate(self):
-        # Get a packet
-        rac_packet = Packet.from_dict(DEMO_JSON_PKT_1)
+        # Get a packet, with its own copy of the data since we change it
+        rac_packet = Packet.from_dict(copy.deepcopy(DEMO_JSON_PKT_1))
         # Make sure it's otherwise valid
         rac_packet.validate_data(raise_on_invalid=True)
 
@@ -270,6 +311,27 @@ class TestClient:
         timestamp = datetime(2021, 8, 24, 14, 47, 51, 507000, tzinfo=tzutc())
         assert getattr(packet, 'packet_timestamp') == timestamp
 
+    def test_parse_datetime(self):
+        """
+        The ISO 8601 fast path parses timestamps the same way dateutil does
+        """
+        for ts in ['2021-08-24T14:47:51.507Z', '2021-08-24T14:47:51Z',
+                   '2021-08-24T14:47:51.5071234Z', '2021-08-24T14:47:51',
+                   '2021-08-24T14:47:51+00:00', '2021-08-24T14:47:51.5-05:00',
+                   '2021-08-24T14:47:51+0530', '2021-08-24 14:47', '2021-08-24',
+                   'August 24, 2021 2:47PM']:
+            parsed = _parse_datetime(ts)
+            assert parsed == dtparse(ts)
+            assert parsed.utcoffset() == dtparse(ts).utcoffset()
+
+    def test_packet_date_body_keys(self):
+        """
+        Body keys with dates in them are parsed into datetimes
+        """
+        npc = NotifyProjectCreate('12345', StartDate='2021-08-24', EndDate=None)
+        assert npc.StartDate == datetime(2021, 8, 24)
+        assert npc.EndDate is None
+
     def test_packet_null_timestamp(self):
         """
         Test that a packet whose timestamp is null/None is processed properly
@@ -282,3 +344,145 @@ class TestClient:
         assert getattr(packet, 'packet_timestamp') is None
         # Test that the resulting JSON does not have timestamp set
         assert json.loads(packet.json())['header'].get('packet_timestamp') is None
+
+    def test_register_packet_type(self):
+        """
+        A registered subclass is used when decoding packets of its type, and
+        keeps its parent's expected replies
+        """
+        class SiteRequestAccountCreate(RequestAccountCreate):
+            pass
+
+        # Subclasses aren't used until they're registered
+        assert type(Packet.from_dict(DEMO_JSON_PKT_1)) is RequestAccountCreate
+        try:
+            register_packet_type(SiteRequestAccountCreate, type_id=16)
+            packet = Packet.from_dict(DEMO_JSON_PKT_1)
+            assert type(packet) is SiteRequestAccountCreate
+            assert Packet._find_packet_type(16) is SiteRequestAccountCreate
+            assert packet.expected_reply == RequestAccountCreate.expected_reply
+            assert isinstance(packet.reply_packet(), NotifyAccountCreate)
+        finally:
+            register_packet_type(RequestAccountCreate)
+        assert type(Packet.from_dict(DEMO_JSON_PKT_1)) is RequestAccountCreate
+        assert Packet._find_packet_type(16) is RequestAccountCreate
+
+    def test_find_packet_type(self):
+        """
+        Every packet type maps to its own class
+        """
+        for pkt_class in [NotifyAccountCreate, NotifyPersonDuplicate,
+                          NotifyUserModify, RequestUserModify]:
+            assert Packet._find_packet_type(pkt_class._packet_type) is pkt_class
+        with pytest.raises(PacketInvalidType):
+            Packet._find_packet_type('not_a_packet_type')
+
+        # Packet types can also be found by their type_id
+        assert Packet._find_packet_type(16) is RequestAccountCreate
+        data = copy.deepcopy(DEMO_JSON_PKT_1)
+        del data['type']
+        assert type(Packet.from_dict(data)) is RequestAccountCreate
+
+    def test_packet_encoding(self):
+        """
+        Each class encodes the data keys it and its bases declare, along with
+        additional data, and formats datetimes
+        """
+        class SiteNotifyProjectCreate(NotifyProjectCreate):
+            _data_keys_allowed = ['SiteNotes']
+
+        npc = SiteNotifyProjectCreate('12345', ProjectID='CMU139',
+                                      StartDate='2021-08-24', Extra='x',
+                                      SiteNotes='notes', Comment=None)
+        npc.EndDate = datetime(2022, 8, 23)
+        body = npc.as_dict()['body']
+        assert body == {'ProjectID': 'CMU139', 'StartDate': '2021-08-24T00:00:00',
+                        'EndDate': '2022-08-23T00:00:00', 'SiteNotes': 'notes',
+                        'Extra': 'x'}
+        assert json.loads(npc.json())['body'] == body
+
+        # Datetimes are formatted whatever key they're under
+        rac = RequestAccountCreate(GrantNumber=datetime(2021, 8, 24))
+        assert rac.as_dict()['body']['GrantNumber'] == '2021-08-24T00:00:00'
+        assert json.loads(rac.json())['body']['GrantNumber'] == '2021-08-24T00:00:00'
+
+    def test_packet_json_timestamp(self):
+        """
+        Timestamps are given in the server's format, whether they were
+        parsed or not
+        """
+        packet = Packet.from_dict(DEMO_JSON_PKT_1)
+        raw = DEMO_JSON_PKT_1['header']['packet_timestamp']
+        assert json.loads(packet.json())['header']['packet_timestamp'] == raw
+        packet.packet_timestamp
+        assert json.loads(packet.json())['header']['packet_timestamp'] == raw
+
+        packet._packet_timestamp = datetime(2021, 8, 24, 9, 47, 51, tzinfo=tzoffset(None, -18000))
+        assert (json.loads(packet.json())['header']['packet_timestamp'] ==
+                '2021-08-24T14:47:51.000Z')
+
+    def test_packet_json_fast(self):
+        """
+        The fast JSON backend gives the same data as the standard one, and
+        json_kwargs still go to json.dumps
+        """
+        packet = Packet.from_dict(DEMO_JSON_PKT_1)
+        assert json.loads(packet.json(fast=True)) == json.loads(packet.json())
+        assert packet.json(fast=True, indent=4) == packet.json(indent=4)
+        packet.additional_data['Huge'] = 2 ** 70
+        assert json.loads(packet.json(fast=True))['body']['Huge'] == 2 ** 70
+
+
+class TestPacketList:
+    """
+    Test lists of packets
+    """
+
+    def test_lazy_packet_list(self):
+        """
+        A lazy PacketList only decodes packets when they're accessed, and
+        gives the same packets as an eager one
+        """
+        eager = PacketList.from_dict(DEMO_JSON_PKT_LIST)
+        lazy = PacketList.from_dict(DEMO_JSON_PKT_LIST, lazy=True)
+        assert len(lazy.packets) == 2
+
+        headers = list(lazy.headers())
+        assert not lazy.packets.is_decoded(0)
+        assert headers == list(eager.headers())
+        assert headers[0].packet_type == 'request_account_create'
+        assert headers[0].packet_rec_id == DEMO_JSON_PKT_1['header']['packet_rec_id']
+        assert headers[0].trans_rec_id == DEMO_JSON_PKT_1['header']['trans_rec_id']
+        assert headers[0].type_id == 16
+
+        packet = lazy.packets[1]
+        assert lazy.packets.is_decoded(1)
+        assert not lazy.packets.is_decoded(0)
+        assert lazy.packets[1] is packet
+        assert lazy.header(1) == eager.header(1)
+        assert lazy.as_dict() == eager.as_dict()
+
+    def test_packet_list_validation_errors(self):
+        """
+        Validation errors for a whole list are keyed by packet index
+        """
+        packet_list = PacketList.from_dict(DEMO_JSON_PKT_LIST)
+        assert packet_list.validation_errors() == {}
+        packet_list.packets.append(NotifyPersonDuplicate('12345', PersonID1='a', PersonID2='b'))
+        packet_list.packets.append(RequestUserModify('12346', PersonID='abcde'))
+        assert packet_list.validation_errors() == {
+            3: ['Invalid ActionType for request_user_modify: "None", '
+                'must be one of add, delete, replace'],
+        }
+
+    def test_lazy_packet_list_mutation(self):
+        """
+        Packets can be added to and removed from a lazy PacketList
+        """
+        lazy = PacketList.from_dict(DEMO_JSON_PKT_LIST, lazy=True)
+        reply = lazy.packets[0].reply_with_failure()
+        lazy.packets.append(reply)
+        del lazy.packets[0]
+        assert len(lazy.packets) == 2
+        assert lazy.packets[-1] is reply
+        assert lazy.header(1).packet_type == 'inform_transaction_complete'
@@ -0,0 +1,50 @@
+import copy
+
+from ..client import AMIEClient
+from ..poller import PacketPoller
+from .fixtures import DEMO_JSON_PKT_LIST
+
+
+class TestPacketPoller:
+
+    def test_poll(self, requests_mock, tmp_path):
+        """
+        Packets are only returned again if they change, and the state survives
+        a new poller
+        """
+        client = AMIEClient(site_name='test', api_key='test')
+        packet_url = 'https://amieclient.xsede.org/v0.10/packets/test'
+        pkt_list = copy.deepcopy(DEMO_JSON_PKT_LIST)
+        requests_mock.get(packet_url, json=pkt_list)
+        state_path = str(tmp_path / 'state.json')
+
+        poller = PacketPoller(client, state_path, incoming=True)
+        first = poller.poll()
+        assert len(first.packets) == 2
+        assert 'update_time' not in requests_mock.last_request.qs
+        assert requests_mock.last_request.qs['incoming'] == ['true']
+        poller.commit()
+
+        poller = PacketPoller(client, state_path, incoming=True)
+        assert len(poller.poll().packets) == 0
+        assert 'update_time' in requests_mock.last_request.qs
+
+        # Change the state of one of the packets
+        pkt_list['result'][1]['header']['client_state'] = 'processed'
+        requests_mock.get(packet_url, json=pkt_list)
+        changed = poller.poll()
+        assert len(changed.packets) == 1
+        assert (changed.packets[0].packet_rec_id ==
+                pkt_list['result'][1]['header']['packet_rec_id'])
+
+    def test_uncommitted_poll(self, requests_mock, tmp_path):
+        """
+        Packets from a poll that wasn't committed come back in the next run
+        """
+        client = AMIEClient(site_name='test', api_key='test')
+        packet_url = 'https://amieclient.xsede.org/v0.10/packets/test'
+        requests_mock.get(packet_url, json=DEMO_JSON_PKT_LIST)
+        state_path = str(tmp_path / 'state.json')
+
+        assert len(PacketPoller(client, state_path).poll().packets) == 2
+        assert len(PacketPoller(client, state_path).poll().packets) == 2
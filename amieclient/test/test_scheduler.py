@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from dateutil.tz import tzutc
+
+from ..packet import (NotifyAccountCreate, RequestAccountCreate,
+                      InformTransactionComplete, PacketList)
+from ..scheduler import PacketScheduler, packet_deadline
+
+
+def _packet(cls, packet_rec_id, age, **kwargs):
+    """
+    A packet sent age ago
+    """
+    return cls(packet_rec_id=packet_rec_id,
+               packet_timestamp=datetime.now(tzutc()) - age, **kwargs)
+
+
+class TestPacketScheduler:
+
+    def test_deadline(self):
+        """
+        A packet's deadline is its timestamp plus its shortest reply timeout
+        """
+        rac = _packet(RequestAccountCreate, 1, timedelta(0))
+        assert packet_deadline(rac) == rac.packet_timestamp + timedelta(minutes=30240)
+
+        class QuickNotifyAccountCreate(NotifyAccountCreate):
+            _expected_reply = [{'type': 'data_account_create', 'timeout': 60},
+                               {'type': 'inform_transaction_complete', 'timeout': 120}]
+
+        nac = _packet(QuickNotifyAccountCreate, 2, timedelta(0))
+        assert packet_deadline(nac) == nac.packet_timestamp + timedelta(minutes=60)
+        assert packet_deadline(RequestAccountCreate(packet_rec_id=3)) is None
+
+    def test_order(self):
+        """
+        Packets come out soonest due first, then packets with no deadline in
+        the order they were added
+        """
+        fresh = _packet(RequestAccountCreate, 1, timedelta(days=1))
+        old = _packet(RequestAccountCreate, 2, timedelta(days=20))
+        overdue = _packet(RequestAccountCreate, 3, timedelta(days=30))
+        undated_1 = RequestAccountCreate(packet_rec_id=4)
+        undated_2 = InformTransactionComplete(packet_rec_id=5)
+
+        scheduler = PacketScheduler(PacketList(packets=[undated_1, fresh, old]))
+        scheduler.extend([overdue, undated_2])
+        # Already waiting, so not added again
+        assert not scheduler.push(_packet(RequestAccountCreate, 2, timedelta(days=20)))
+        assert len(scheduler) == 5
+        assert scheduler.peek() is overdue
+
+        stats = scheduler.stats()
+        assert stats['depth'] == 5
+        assert stats['overdue'] == 1
+        assert -10 * 86400 < stats['min_slack'] < -8 * 86400
+
+        assert list(scheduler.drain()) == [overdue, old, fresh, undated_1, undated_2]
+        assert len(scheduler) == 0 and scheduler.peek() is None
+
+        stats = scheduler.stats()
+        assert stats['depth'] == 0 and stats['min_slack'] is None
+        popped = stats['popped_slack']
+        assert popped['count'] == 3
+        assert popped['buckets'][0] == 1
+        assert popped['buckets'][3 * 86400] == 2
+
+        # A packet can be queued again once it's been taken off
+        assert scheduler.push(old)
@@ -0,0 +1,99 @@
+from ..packet import (PacketList, RequestProjectCreate, NotifyProjectCreate,
+                      DataProjectCreate, InformTransactionComplete)
+from ..transaction import TransactionIndex
+
+
+def _project_create_transaction(trans_rec_id, first_id):
+    """
+    A whole request_project_create transaction, RPC -> NPC -> DPC -> ITC
+    """
+    rpc = RequestProjectCreate(packet_rec_id=first_id, trans_rec_id=trans_rec_id,
+                               ResourceList=['test.psc.xsede'])
+    npc = NotifyProjectCreate(packet_rec_id=first_id + 1, trans_rec_id=trans_rec_id,
+                              in_reply_to=rpc)
+    dpc = DataProjectCreate(packet_rec_id=first_id + 2, trans_rec_id=trans_rec_id,
+                            in_reply_to=npc)
+    itc = InformTransactionComplete(packet_rec_id=first_id + 3,
+                                    trans_rec_id=trans_rec_id, in_reply_to=dpc)
+    return [rpc, npc, dpc, itc]
+
+
+class TestTransactionIndex:
+
+    def test_grouping_and_order(self):
+        """
+        Packets are grouped by transaction and put in reply order, no matter
+        what order they're added in
+        """
+        txn_1 = _project_create_transaction(1, 100)
+        txn_2 = _project_create_transaction(2, 200)
+        shuffled = [txn_1[2], txn_2[3], txn_1[0], txn_2[1], txn_1[3], txn_2[0],
+                    txn_1[1], txn_2[2]]
+        index = TransactionIndex([PacketList(packets=shuffled[:4]), shuffled[4:]])
+
+        assert len(index) == 8
+        assert index.transaction(1) == txn_1
+        assert index.transaction(2) == txn_2
+        assert index.originating_packet(txn_1[2]) is txn_1[0]
+        assert index.originating_packet(txn_2[3].packet_rec_id) is txn_2[0]
+        assert index.in_reply_to(txn_1[2]) is txn_1[1]
+        assert index.incomplete() == []
+
+    def test_missing_origin(self):
+        """
+        Transactions whose first packet we don't have are reported, and can be
+        filled in later
+        """
+        txn = _project_create_transaction(1, 100)
+        index = TransactionIndex([txn[2:]])
+        assert index.originating_packet(txn[2]) is None
+        assert index.incomplete() == [1]
+
+        index.add(txn[:2])
+        assert index.originating_packet(txn[2]) is txn[0]
+        assert index.transaction(1) == txn
+        assert index.incomplete() == []
+
+    def test_moved_packet(self):
+        """
+        A packet added again with a different trans_rec_id moves to the new
+        transaction
+        """
+        txn_1 = _project_create_transaction(1, 100)
+        txn_2 = _project_create_transaction(2, 200)
+        index = TransactionIndex([txn_1, txn_2[:3]])
+
+        moved = InformTransactionComplete(packet_rec_id=103, trans_rec_id=2,
+                                          in_reply_to=txn_2[2])
+        index.add([moved])
+        assert len(index) == 7
+        assert index.transaction(1) == txn_1[:3]
+        assert index.transaction(2) == txn_2[:3] + [moved]
+
+        # Moving a transaction's only packet leaves nothing behind
+        index = TransactionIndex([txn_1[:1]])
+        index.add([RequestProjectCreate(packet_rec_id=100, trans_rec_id=2,
+                                        ResourceList=['test.psc.xsede'])])
+        assert index.transaction(1) == []
+        assert [p.packet_rec_id for p in index.transaction(2)] == [100]
+        assert index.incomplete() == []
+        assert len(index._transactions) == 1
+
+    def test_no_trans_rec_id(self):
+        """
+        Packets without a trans_rec_id are grouped together, and can move to
+        a real transaction later
+        """
+        rpc = RequestProjectCreate(packet_rec_id=100, ResourceList=['test.psc.xsede'])
+        index = TransactionIndex([[rpc]])
+        assert len(index) == 1
+        assert index.transaction(None) == [rpc]
+
+        index.add([rpc])
+        assert index.transaction(None) == [rpc]
+
+        rpc_1 = RequestProjectCreate(packet_rec_id=100, trans_rec_id=1,
+                                     ResourceList=['test.psc.xsede'])
+        index.add([rpc_1])
+        assert index.transaction(None) == []
+        assert index.transaction(1) == [rpc_1]
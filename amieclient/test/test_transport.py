@@ -0,0 +1,91 @@
+import pytest
+import requests
+
+from ..client import AMIEClient, AMIERequestError, UsageClient
+from ..metrics import ClientMetrics
+from ..transport import TransportPolicy, _parse_retry_after
+from ..packet import Packet
+from .fixtures import DEMO_JSON_PKT_1, DEMO_JSON_PKT_LIST, compute_record
+
+# No waiting between retries
+NO_WAIT = dict(backoff_factor=0)
+
+
+class TestTransportPolicy:
+    def test_session(self):
+        policy = TransportPolicy(pool_size=32)
+        client = AMIEClient(site_name='test', api_key='test', transport=policy)
+        assert client._session.adapters['https://']._pool_maxsize == 32
+
+    def test_can_retry(self):
+        policy = TransportPolicy(retries=2)
+        assert policy.can_retry('GET', 0)
+        assert policy.can_retry('put', 1)
+        assert not policy.can_retry('GET', 2)
+        assert not policy.can_retry('POST', 0)
+        assert policy.can_retry('POST', 0, idempotent=True)
+
+    def test_backoff(self):
+        policy = TransportPolicy(backoff_factor=1, max_backoff=5)
+        for attempt in range(6):
+            assert 0 <= policy.backoff(attempt) <= min(2 ** attempt, 5)
+        assert policy.backoff(0, retry_after='3') == 3
+        assert policy.backoff(0, retry_after='120') == 5
+        assert _parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') < 0
+        assert _parse_retry_after('soon') is None
+
+    def test_retry_get(self, requests_mock):
+        metrics = ClientMetrics()
+        client = AMIEClient(site_name='test', api_key='test', metrics=metrics,
+                            transport=TransportPolicy(**NO_WAIT))
+        requests_mock.get('https://amieclient.xsede.org/v0.10/packets/test',
+                          [{'status_code': 502, 'json': {}},
+                           {'status_code': 503, 'json': {}, 'headers': {'Retry-After': '0'}},
+                           {'json': DEMO_JSON_PKT_LIST}])
+        assert len(client.list_packets().packets) == 2
+        assert requests_mock.call_count == 3
+        assert metrics.as_dict()['list_packets']['retries'] == 2
+
+    def test_connection_errors(self, requests_mock):
+        client = AMIEClient(site_name='test', api_key='test',
+                            transport=TransportPolicy(retries=1, **NO_WAIT))
+        requests_mock.get('https://amieclient.xsede.org/v0.10/packets/test',
+                          exc=requests.ConnectTimeout)
+        with pytest.raises(requests.ConnectTimeout):
+            client.list_packets()
+        assert requests_mock.call_count == 2
+
+    def test_no_retry_for_post(self, requests_mock):
+        client = AMIEClient(site_name='test', api_key='test',
+                            transport=TransportPolicy(**NO_WAIT))
+        requests_mock.post('https://amieclient.xsede.org/v0.10/packets/test',
+                           status_code=502, json={'message': 'Bad gateway'})
+        reply = Packet.from_dict(DEMO_JSON_PKT_1).reply_with_failure()
+        with pytest.raises(AMIERequestError):
+            client.send_packet(reply)
+        # Sending a packet twice isn't safe, so it's not retried
+        assert requests_mock.call_count == 1
+
+    def test_usage_chunk_retried_alone(self, requests_mock):
+        client = UsageClient(site_name='test', api_key='test',
+                             transport=TransportPolicy(**NO_WAIT))
+        client.max_request_size = 1024
+        requests_mock.post('https://usage.xsede.org/api/v1/usage/',
+                           [{'json': {'Message': 'OK'}},
+                            {'status_code': 502},
+                            {'json': {'Message': 'OK'}}])
+        records = [compute_record(i, 'job') for i in range(4)]
+        responses = client.send(records)
+        bodies = [r.body for r in requests_mock.request_history]
+        # The second chunk was sent again on its own; the first wasn't
+        assert len(responses) == 2
+        assert requests_mock.call_count == 3
+        assert bodies[1] == bodies[2] != bodies[0]
+
+    def test_usage_gives_up(self, requests_mock):
+        client = UsageClient(site_name='test', api_key='test',
+                             transport=TransportPolicy(retries=2, **NO_WAIT))
+        requests_mock.post('https://usage.xsede.org/api/v1/usage/', status_code=503)
+        with pytest.raises(requests.HTTPError):
+            client.send(compute_record(1, 'job'))
+        assert requests_mock.call_count == 3
@@ -0,0 +1,326 @@
+import array
+import json
+import pytest
+
+from ..client import UsageClient
+from ..usage import (ComputeUsageRecord, SeenIndex, UploadJournal,
+                     UsageBatch, UsageResponse, UsageResponseError)
+from ..usage.message import UsageMessage, UsageMessageException, _chunk_records
+from ..usage.record import (AdjustmentUsageRecord, ComputeUsageAttributes,
+                            StorageUsageAttributes)
+from .fixtures import compute_record, storage_record
+
+
+class TestUsageRecord:
+
+    def test_no_instance_dict(self):
+        for record in [compute_record(1), storage_record(1),
+                       AdjustmentUsageRecord(adjustment_type='credit', charge='1',
+                                             start_time='2021-08-24T14:40:00Z',
+                                             local_project_id='TST123', local_record_id='1',
+                                             resource='test.psc.xsede', username='testuser')]:
+            assert not hasattr(record, '__dict__')
+            assert type(record).from_dict(record.as_dict()).as_dict() == record.as_dict()
+
+    def test_attributes(self):
+        record = compute_record(1)
+        assert record.attributes == ComputeUsageAttributes(NodeCount='1', JobName='test_job')
+        record.attributes = record.attributes._replace(Queue='RM')
+        assert record.queue == 'RM'
+        assert record.as_dict()['Attributes'] == {'NodeCount': '1', 'JobName': 'test_job',
+                                                  'Queue': 'RM'}
+
+        record = storage_record(1)
+        record.attributes = StorageUsageAttributes(BytesStored='100', FileCount='2')
+        assert record.as_dict()['Attributes'] == {'BytesStored': '100', 'FileCount': '2'}
+
+
+class TestUsageMessage:
+
+    def test_append(self):
+        """
+        Records of the same type can be appended one at a time
+        """
+        message = UsageMessage([])
+        for i in range(3):
+            message.records.append(compute_record(i))
+        assert len(message.records) == 3
+        assert message.as_dict()['UsageType'] == 'Compute'
+        with pytest.raises(UsageMessageException):
+            message.records.append(storage_record(3))
+        assert len(message.records) == 3
+
+    def test_extend_mixed_types(self):
+        """
+        A failed extend leaves the message unchanged
+        """
+        message = UsageMessage([compute_record(0)])
+        with pytest.raises(UsageMessageException):
+            message.records.extend([compute_record(1), storage_record(2)])
+        assert len(message.records) == 1
+        with pytest.raises(UsageMessageException):
+            UsageMessage([compute_record(0), 'not a record'])
+
+
+class TestUsageChunking:
+
+    def test_chunks_respect_max_size(self):
+        """
+        Chunks never go over the size limit, and keep every record in order
+        """
+        records = [compute_record(i) for i in range(100)]
+        chunks = list(_chunk_records(records, max_size=4096))
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert len(chunk.body) <= 4096
+            body = json.loads(chunk.body.decode('utf-8'))
+            assert body['UsageType'] == 'Compute'
+            assert body['Records'] == [json.loads(r.json()) for r in chunk.records]
+        sent_ids = [r.local_record_id for c in chunks for r in c.records]
+        assert sent_ids == [str(i) for i in range(100)]
+
+    def test_chunks_from_generator(self):
+        """
+        Any iterable of records can be chunked
+        """
+        records = (compute_record(i) for i in range(10))
+        chunks = list(_chunk_records(records))
+        assert len(chunks) == 1
+        assert len(chunks[0]) == 10
+
+    def test_oversized_record(self):
+        """
+        A record that can't fit in a request by itself raises an error
+        """
+        records = [compute_record(0, job_name='x' * 5000)]
+        with pytest.raises(UsageMessageException):
+            list(_chunk_records(records, max_size=4096))
+
+    def test_mixed_types(self):
+        """
+        Records of different types can't be chunked together
+        """
+        records = [compute_record(0), storage_record(1)]
+        with pytest.raises(UsageMessageException):
+            list(_chunk_records(records))
+
+
+class TestUsageClient:
+
+    def test_send_chunked(self, requests_mock):
+        """
+        Large uploads are sent as several requests, each one under the limit
+        """
+        client = UsageClient(site_name='test', api_key='test')
+        client.max_request_size = 4096
+        usage_url = 'https://usage.xsede.org/api/v1/usage/'
+        requests_mock.post(usage_url, json={'Message': 'ok'})
+
+        message = UsageMessage([compute_record(i) for i in range(100)])
+        responses = client.send(message)
+        assert len(responses) == requests_mock.call_count
+        assert len(responses) > 1
+        assert all(isinstance(r, UsageResponse) for r in responses)
+        for req in requests_mock.request_history:
+            assert len(req.body) <= 4096
+
+    def test_send_concurrent(self, requests_mock):
+        """
+        Concurrent sends return responses in chunk order, and those responses
+        can be merged
+        """
+        client = UsageClient(site_name='test', api_key='test')
+        client.max_request_size = 4096
+        usage_url = 'https://usage.xsede.org/api/v1/usage/'
+
+        def echo_first_record(request, context):
+            first = request.json()['Records'][0]
+            first['UsageType'] = 'Compute'
+            first['Error'] = 'test error'
+            return {'Message': first['LocalRecordID'],
+                    'ValidationFailedRecords': [first]}
+
+        requests_mock.post(usage_url, json=echo_first_record)
+
+        records = [compute_record(i) for i in range(100)]
+        chunks = list(_chunk_records(records, max_size=4096))
+        responses = client.send_concurrent(iter(records), max_workers=4,
+                                           max_in_flight=2)
+        assert [r.message for r in responses] == [c.records[0].local_record_id
+                                                  for c in chunks]
+        merged = UsageResponse.merge(responses)
+        assert len(merged.failed_records) == len(chunks)
+        assert ([f.record.local_record_id for f in merged.failed_records] ==
+                [c.records[0].local_record_id for c in chunks])
+
+    def test_send_resumes_from_journal(self, requests_mock, tmp_path):
+        """
+        Re-running an interrupted upload with the same journal only sends
+        the chunks that weren't accepted, and still returns every response
+        """
+        client = UsageClient(site_name='test', api_key='test')
+        client.max_request_size = 4096
+        usage_url = 'https://usage.xsede.org/api/v1/usage/'
+        records = [compute_record(i) for i in range(100)]
+        chunks = list(_chunk_records(records, max_size=4096))
+        journal_path = str(tmp_path / 'upload.journal')
+
+        def fail_third_chunk(request, context):
+            first = request.json()['Records'][0]
+            if first['LocalRecordID'] == chunks[2].records[0].local_record_id:
+                context.status_code = 400
+                return {'error': 'try again later'}
+            first['UsageType'] = 'Compute'
+            first['Error'] = 'test error'
+            return {'Message': first['LocalRecordID'],
+                    'ValidationFailedRecords': [first]}
+
+        requests_mock.post(usage_url, json=fail_third_chunk)
+        with UploadJournal(journal_path) as journal:
+            with pytest.raises(UsageResponseError):
+                client.send(records, journal=journal)
+            assert len(journal) == 2
+            assert journal.entries()[0]['first_local_record_id'] == records[0].local_record_id
+
+        requests_mock.reset_mock()
+        requests_mock.post(usage_url, json=lambda request, context: {
+            'Message': request.json()['Records'][0]['LocalRecordID']})
+        with UploadJournal(journal_path) as journal:
+            responses = client.send_concurrent(records, journal=journal)
+            assert len(journal) == len(chunks)
+        assert requests_mock.call_count == len(chunks) - 2
+        assert [r.message for r in responses] == [c.records[0].local_record_id
+                                                  for c in chunks]
+        # Responses from the journal keep their failed records
+        assert responses[0].failed_records[0].record.local_record_id == records[0].local_record_id
+
+    def test_send_skips_seen_records(self, requests_mock, tmp_path):
+        """
+        Records sent before are skipped, but ones the server rejected aren't
+        """
+        client = UsageClient(site_name='test', api_key='test')
+        usage_url = 'https://usage.xsede.org/api/v1/usage/'
+
+        def reject_record_1(request, context):
+            rejected = [dict(r, UsageType='Compute', Error='bad')
+                        for r in request.json()['Records'] if r['LocalRecordID'] == '1']
+            return {'Message': 'ok', 'ValidationFailedRecords': rejected}
+
+        requests_mock.post(usage_url, json=reject_record_1)
+        with SeenIndex(str(tmp_path / 'seen.db')) as seen:
+            client.send([compute_record(i) for i in range(3)], seen_index=seen)
+            assert len(seen) == 2
+            client.send([compute_record(i) for i in range(5)], seen_index=seen)
+        sent = [r['LocalRecordID'] for r in requests_mock.last_request.json()['Records']]
+        assert sent == ['1', '3', '4']
+
+
+class TestSeenIndex:
+
+    def test_seen(self, tmp_path):
+        path = str(tmp_path / 'seen.db')
+        with SeenIndex(path, capacity=100) as seen:
+            seen.add(compute_record(i) for i in range(50))
+            assert compute_record(1) in seen
+            assert compute_record(50) not in seen
+            # Same ID, but a different record type
+            assert storage_record(1) not in seen
+            assert len(list(seen.filter(compute_record(i) for i in range(40, 60)))) == 10
+
+        # Records are looked up in the database only when the Bloom filter
+        # can't rule them out
+        with SeenIndex(path) as seen:
+            unseen = [compute_record(i) for i in range(1000, 2000)]
+            assert list(seen.filter(unseen)) == unseen
+            assert seen.lookups == 1000
+            assert seen.exact_lookups < 100
+
+    def test_bloom_catches_up(self, tmp_path):
+        """
+        Records added after the Bloom filter was last saved are still found
+        """
+        path = str(tmp_path / 'seen.db')
+        seen = SeenIndex(path)
+        seen.save()
+        seen.add([compute_record(1)])
+        # Closed without saving
+        seen._conn.close()
+        with SeenIndex(path) as seen:
+            assert compute_record(1) in seen
+
+
+class TestUsageBatch:
+
+    def test_same_json_as_records(self):
+        """
+        A batch serializes each row as its record would be
+        """
+        compute = [compute_record(i) for i in range(5)]
+        compute[1].parent_record_id = '0'
+        compute[2].queue = 'RM'
+        compute[3].local_reference = '50% "quoted"'
+        compute[4].job_name = None
+        storage = [storage_record(i) for i in range(3)]
+        storage[1].bytes_stored = 1024
+        adjustment = [AdjustmentUsageRecord(adjustment_type='Refund', charge='1',
+                                            start_time='2021-08-24T14:40:00Z',
+                                            local_project_id='TST123', local_record_id=str(i),
+                                            resource='test.psc.xsede', username='testuser',
+                                            comment='ok' if i else None)
+                      for i in range(2)]
+        for records in [compute, storage, adjustment]:
+            batch = UsageBatch.from_records(records)
+            assert ([json.loads(row._json.decode('utf-8')) for row in batch] ==
+                    [r.as_dict() for r in records])
+            assert json.loads(batch.json()) == json.loads(UsageMessage(records).json())
+            assert [r.as_dict() for r in batch.to_records()] == [r.as_dict() for r in records]
+
+    def test_columns(self):
+        batch = UsageBatch('Compute', resource='test.psc.xsede', username='testuser',
+                           local_project_id='TST123', local_record_id=['1', '2'],
+                           submit_time='2021-08-24T14:40:00Z',
+                           start_time='2021-08-24T14:47:51Z',
+                           end_time='2021-08-24T15:47:51Z',
+                           charge=array.array('d', [1.5, 2.0]),
+                           node_count=[1, None])
+        rows = list(batch)
+        assert rows[0].as_dict()['Charge'] == 1.5
+        assert rows[0].as_dict()['Attributes'] == {'NodeCount': 1}
+        assert rows[1].as_dict()['Attributes'] == {}
+        assert rows[1].local_record_id == '2'
+        assert rows[1].record_type == 'compute'
+        # Arrays are kept, and converted as they're read
+        assert isinstance(batch._columns['charge'], array.array)
+        assert rows[1].charge == 2.0
+
+    @pytest.mark.parametrize('columns', [
+        dict(bogus=['1']),
+        dict(charge=None),
+        dict(charge=['1', None]),
+        dict(charge=['1', '2', '3']),
+    ])
+    def test_validation(self, columns):
+        base = dict(resource='r', username='u', local_project_id='p',
+                    local_record_id=['1', '2'], submit_time='t', start_time='t',
+                    end_time='t', charge='1')
+        base.update(columns)
+        with pytest.raises(UsageMessageException):
+            UsageBatch(ComputeUsageRecord, **base)
+
+    def test_send_batch(self, requests_mock, tmp_path):
+        client = UsageClient(site_name='test', api_key='test')
+        client.max_request_size = 4096
+        requests_mock.post('https://usage.xsede.org/api/v1/usage/', json={'Message': 'ok'})
+        records = [compute_record(i) for i in range(100)]
+        batch = UsageBatch.from_records(records)
+        batch.block_size = 30
+
+        with SeenIndex(str(tmp_path / 'seen.db')) as seen:
+            seen.add(records[:10])
+            responses = client.send(batch, seen_index=seen)
+            assert len(seen) == 100
+        # Chunked just as the records would have been
+        expected = list(_chunk_records(records[10:], max_size=4096))
+        assert len(responses) == len(expected)
+        assert ([json.loads(r.body.decode('utf-8')) for r in requests_mock.request_history] ==
+                [json.loads(c.body.decode('utf-8')) for c in expected])
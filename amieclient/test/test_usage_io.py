@@ -0,0 +1,80 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from ..client import UsageClient
+from ..usage import ComputeUsageRecord, StorageUsageRecord
+from ..usage.io import read_csv, read_jsonl, read_sacct
+from ..usage.record import UsageRecordException
+from .fixtures import compute_record, storage_record
+
+SACCT_OUTPUT = """JobID|JobName|User|Account|Partition|Submit|Start|End|NNodes|NCPUS|ElapsedRaw|State
+1001|sim|alice|TG-ABC123|RM|2021-08-24T14:00:00|2021-08-24T14:10:00|2021-08-24T16:10:00|2|128|7200|COMPLETED
+1001.batch|batch|||RM|2021-08-24T14:10:00|2021-08-24T14:10:00|2021-08-24T16:10:00|1|64|7200|COMPLETED
+1001.0|sim|||RM|2021-08-24T14:10:00|2021-08-24T14:10:00|2021-08-24T16:10:00|2|128|7200|COMPLETED
+1002|long|bob|TG-XYZ789|RM|2021-08-24T15:00:00|2021-08-24T15:00:00|Unknown|1|64|3600|RUNNING
+1003|queued|bob|TG-XYZ789|RM|2021-08-24T15:00:00|None|Unknown|1|64|0|PENDING
+1004_1|array|carol|TG-XYZ789|RM-shared|2021-08-24T15:00:00|2021-08-24T15:01:00|2021-08-24T15:31:00|1|4|1800|FAILED
+"""
+
+
+class TestUsageReaders:
+
+    def test_read_jsonl(self, tmp_path):
+        path = tmp_path / 'usage.jsonl.gz'
+        records = [compute_record(i) for i in range(3)] + [storage_record(3)]
+        with gzip.open(str(path), 'wt') as f:
+            for r in records:
+                d = r.as_dict()
+                d['UsageType'] = r.record_type
+                f.write(json.dumps(d) + '\n\n')
+
+        read = list(read_jsonl(str(path)))
+        assert [type(r) for r in read] == [ComputeUsageRecord] * 3 + [StorageUsageRecord]
+        assert [r.as_dict() for r in read] == [r.as_dict() for r in records]
+
+        lines = io.StringIO(records[0].json())
+        assert next(read_jsonl(lines, record_type='compute')).as_dict() == records[0].as_dict()
+        with pytest.raises(UsageRecordException):
+            list(read_jsonl(io.StringIO(records[0].json())))
+
+    def test_read_csv(self):
+        f = io.StringIO('Username,LocalProjectID,LocalRecordID,Resource,SubmitTime,'
+                        'StartTime,EndTime,Charge,NodeCount,JobName,Queue\n'
+                        'alice,TG-ABC123,1,test.psc.xsede,2021-08-24T14:00:00Z,'
+                        '2021-08-24T14:10:00Z,2021-08-24T16:10:00Z,2.5,2,sim,\n')
+        record, = read_csv(f)
+        assert record.local_record_id == '1'
+        assert record.as_dict()['Attributes'] == {'NodeCount': '2', 'JobName': 'sim'}
+
+        with pytest.raises(UsageRecordException, match='Line 2'):
+            list(read_csv(io.StringIO('Username,Resource\nalice,test\n')))
+
+    def test_read_sacct(self):
+        records = list(read_sacct(io.StringIO(SACCT_OUTPUT), resource='test.psc.xsede'))
+        # Steps and unfinished jobs are skipped
+        assert [r.local_record_id for r in records] == ['1001', '1004_1']
+        assert records[0].charge == '256.0'
+        assert records[0].local_project_id == 'TG-ABC123'
+        assert records[0].attributes.NodeCount == '2'
+        assert records[1].attributes.Queue == 'RM-shared'
+
+        no_header = SACCT_OUTPUT.split('\n', 1)[1]
+        records = read_sacct(io.StringIO(no_header), resource='test.psc.xsede',
+                             charge=lambda row: '1',
+                             local_project_id=lambda row: row['Account'].lower(),
+                             fieldnames=SACCT_OUTPUT.split('\n', 1)[0].split('|'))
+        assert next(records).local_project_id == 'tg-abc123'
+
+    def test_send_from_reader(self, requests_mock):
+        """
+        A reader can be sent directly, without building a list of records
+        """
+        client = UsageClient(site_name='test', api_key='test')
+        requests_mock.post('https://usage.xsede.org/api/v1/usage/', json={'Message': 'ok'})
+        client.send(read_sacct(io.StringIO(SACCT_OUTPUT), resource='test.psc.xsede'))
+        sent = requests_mock.last_request.json()
+        assert sent['UsageType'] == 'Compute'
+        assert [r['LocalRecordID'] for r in sent['Records']] == ['1001', '1004_1']
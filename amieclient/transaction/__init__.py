@@ -2,6 +2,7 @@ import json
 from datetime import datetime
 
 from ..packet.base import Packet
+from .index import TransactionIndex
 
 
 class Transaction(object):
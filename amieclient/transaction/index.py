@@ -0,0 +1,145 @@
+from collections import defaultdict
+
+
+class TransactionIndex(object):
+    """
+    An index of packets we've already downloaded, grouped by transaction.
+
+    Packets in each transaction are ordered so that every packet comes after
+    the one it is in reply to, which lets you look up things like the
+    originating request of a data_project_create packet (which has no
+    resource of its own) without another trip to the server.
+
+    Args:
+        packet_sources: PacketLists, Transactions, or lists of Packets to
+            index.
+
+    Example:
+        >>> index = TransactionIndex([amie_client.list_packets()])
+        >>> rpc = index.originating_packet(dpc_packet)
+        >>> resource = rpc.ResourceList[0]
+    """
+    def __init__(self, packet_sources=None):
+        # packet_rec_id -> packet
+        self._packets = {}
+        # trans_rec_id -> packet_rec_ids in the transaction, in reply order
+        self._transactions = defaultdict(list)
+        # packet_rec_id -> trans_rec_id
+        self._trans_rec_ids = {}
+        for source in packet_sources or []:
+            self.add(source)
+
+    def add(self, packets):
+        """
+        Adds packets to the index. Takes a PacketList, a Transaction, or any
+        iterable of Packets. A packet that's already in the index is replaced.
+        """
+        if hasattr(packets, 'packets'):
+            packets = packets.packets
+        changed = set()
+        for pkt in packets:
+            indexed = pkt.packet_rec_id in self._trans_rec_ids
+            previous = self._trans_rec_ids.get(pkt.packet_rec_id)
+            if not indexed or previous != pkt.trans_rec_id:
+                if indexed:
+                    # The packet has moved to another transaction
+                    self._transactions[previous].remove(pkt.packet_rec_id)
+                    if self._transactions[previous]:
+                        changed.add(previous)
+                    else:
+                        del self._transactions[previous]
+                self._transactions[pkt.trans_rec_id].append(pkt.packet_rec_id)
+            self._packets[pkt.packet_rec_id] = pkt
+            self._trans_rec_ids[pkt.packet_rec_id] = pkt.trans_rec_id
+            changed.add(pkt.trans_rec_id)
+        for trans_rec_id in changed:
+            self._order(trans_rec_id)
+
+    def _order(self, trans_rec_id):
+        """
+        Orders the packets of a transaction so each one comes after the packet
+        it is in reply to. Packets whose parent isn't in the index come first,
+        with ties broken by packet_rec_id.
+        """
+        ids = sorted(self._transactions[trans_rec_id])
+        children = defaultdict(list)
+        roots = []
+        for pid in ids:
+            parent = self._packets[pid].in_reply_to_id
+            if parent is not None and parent in self._packets and parent != pid:
+                children[parent].append(pid)
+            else:
+                roots.append(pid)
+
+        ordered = []
+        visited = set()
+        stack = list(reversed(roots))
+        while stack:
+            pid = stack.pop()
+            if pid in visited:
+                continue
+            visited.add(pid)
+            ordered.append(pid)
+            stack.extend(reversed(children[pid]))
+        # Anything left over is in a reply loop; keep it rather than lose it
+        ordered.extend(pid for pid in ids if pid not in visited)
+        self._transactions[trans_rec_id] = ordered
+
+    @staticmethod
+    def _packet_rec_id(packet_or_id):
+        if hasattr(packet_or_id, 'packet_rec_id'):
+            return packet_or_id.packet_rec_id
+        return int(packet_or_id)
+
+    def transaction(self, trans_rec_id):
+        """
+        The indexed packets of a transaction, in reply order
+        """
+        return [self._packets[pid] for pid in self._transactions.get(trans_rec_id, [])]
+
+    def in_reply_to(self, packet_or_id):
+        """
+        The packet that the given packet is in reply to, or None if it isn't
+        a reply or we don't have that packet.
+        """
+        pkt = self._packets.get(self._packet_rec_id(packet_or_id))
+        if pkt is None or pkt.in_reply_to_id is None:
+            return None
+        return self._packets.get(pkt.in_reply_to_id)
+
+    def originating_packet(self, packet_or_id):
+        """
+        The packet that started the transaction the given packet is part of
+        (e.g. the request_project_create for a data_project_create), or None
+        if we don't have it.
+
+        Args:
+            packet_or_id (Packet, int): A packet or packet_rec_id in the index
+        """
+        trans_rec_id = self._trans_rec_ids.get(self._packet_rec_id(packet_or_id))
+        if trans_rec_id is None:
+            return None
+        first = self._packets[self._transactions[trans_rec_id][0]]
+        if first.in_reply_to_id is not None:
+            # The real first packet isn't one we've downloaded
+            return None
+        return first
+
+    def incomplete(self):
+        """
+        The trans_rec_ids of transactions whose originating packet isn't in
+        the index. Fetch them with AMIEClient.get_transactions and add them,
+        if you need their originating packets.
+        """
+        return [trans_rec_id for trans_rec_id, ids in self._transactions.items()
+                if ids and self._packets[ids[0]].in_reply_to_id is not None]
+
+    def __contains__(self, packet_or_id):
+        return self._packet_rec_id(packet_or_id) in self._packets
+
+    def __len__(self):
+        return len(self._packets)
+
+    def __repr__(self):
+        return "<TransactionIndex: {p} packets in {t} transactions>".format(
+            p=len(self._packets), t=len(self._transactions))
@@ -0,0 +1,199 @@
+"""
+Connection pooling, timeouts and retries for the clients' HTTP sessions
+"""
+import random
+import time
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+
+class TransportPolicy(object):
+    """
+    How a client talks to the API: how many connections it keeps open, how
+    long it waits for the server, and which requests it retries.
+
+    A request is retried if it fails to connect, times out, or gets one of
+    the retry_statuses back, as long as its method is one of the
+    idempotent_methods, so that sending it twice does no harm. Between
+    attempts we wait a random time between zero and backoff_factor * 2 **
+    attempt seconds, capped at max_backoff, so that many clients retrying
+    at once don't all hit the server at the same moment. If the server
+    sends a Retry-After header, we wait that long instead (also capped at
+    max_backoff).
+
+    Args:
+        pool_size (int): How many connections to keep open to each host.
+            Sending from more threads than this at once makes them wait for
+            a connection.
+        connect_timeout (float): Seconds to wait for a connection to the
+            server. None waits forever.
+        read_timeout (float): Seconds to wait for the server to respond.
+            None waits forever.
+        retries (int): How many times to retry a request, after the first
+            attempt. 0 turns retries off.
+        backoff_factor (float): Base of the backoff between retries, in
+            seconds.
+        max_backoff (float): Longest we'll wait between retries, in seconds.
+        retry_statuses: HTTP statuses that are worth retrying.
+        idempotent_methods: HTTP methods that are safe to retry.
+
+    Example:
+        >>> policy = TransportPolicy(pool_size=16, read_timeout=120, retries=5)
+        >>> usage_client = UsageClient(site_name='PSC', api_key=api_key, transport=policy)
+    """
+    def __init__(self, pool_size=10, connect_timeout=10, read_timeout=60,
+                 retries=3, backoff_factor=0.5, max_backoff=30,
+                 retry_statuses=(429, 502, 503, 504),
+                 idempotent_methods=('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(m.upper() for m in idempotent_methods)
+
+    @property
+    def timeout(self):
+        """
+        The timeout to give requests, as a (connect, read) tuple
+        """
+        return (self.connect_timeout, self.read_timeout)
+
+    def can_retry(self, method, attempt, idempotent=None):
+        """
+        Whether a request that failed on the given attempt (counting from 0)
+        can be tried again
+
+        Args:
+            method (str): The request's HTTP method.
+            attempt (int): How many times the request has been retried so far.
+            idempotent (bool): Whether the request is safe to send twice. If
+                None, this is decided by its method.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in self.idempotent_methods
+        return idempotent and attempt < self.retries
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        How long to wait, in seconds, before retrying a request that failed
+        on the given attempt (counting from 0)
+
+        Args:
+            attempt (int): How many times the request has been retried so far.
+            retry_after (str): The Retry-After header of the response, if any.
+        """
+        delay = _parse_retry_after(retry_after)
+        if delay is None:
+            delay = random.uniform(0, self.backoff_factor * (2 ** attempt))
+        return min(max(delay, 0), self.max_backoff)
+
+    def __repr__(self):
+        return ("<TransportPolicy: pool_size={s.pool_size}, timeout={s.timeout}, "
+                "retries={s.retries}>").format(s=self)
+
+
+def _parse_retry_after(value):
+    """
+    Gets the number of seconds a Retry-After header asks us to wait, or None
+    if it's missing or can't be understood
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return (when - datetime.now(timezone.utc)).total_seconds()
+
+
+def _ensure_pool_size(session, size):
+    """
+    Makes sure that the session will keep at least size connections open
+    to each host, so that requests made from that many threads at once
+    don't have to wait on each other for a connection.
+    """
+    for prefix in ['https://', 'http://']:
+        adapter = session.adapters.get(prefix)
+        if getattr(adapter, '_pool_maxsize', 0) < size:
+            session.mount(prefix, requests.adapters.HTTPAdapter(pool_maxsize=size))
+            if adapter is not None:
+                adapter.close()
+
+
+def _new_session(headers, policy):
+    """
+    Builds a requests.Session with the given headers, and connection pools
+    sized for the policy
+    """
+    s = requests.Session()
+    s.headers.update(headers)
+    _ensure_pool_size(s, policy.pool_size)
+    return s
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    try:
+        return len(body)
+    except TypeError:
+        # A generator or file, which we can't measure without reading it
+        return 0
+
+
+def _request(session, policy, metrics, endpoint, method, url, idempotent=None,
+             **kwargs):
+    """
+    Makes a request with session, retrying it as the policy allows, and
+    recording it in metrics if that isn't None.
+
+    Returns the last response we got, which may be an error response if we
+    ran out of retries. Raises the last exception if the final attempt
+    didn't get a response at all.
+    """
+    kwargs.setdefault('timeout', policy.timeout)
+    attempt = 0
+    while True:
+        try:
+            if metrics is None:
+                r = session.request(method, url, **kwargs)
+            else:
+                start = time.perf_counter()
+                try:
+                    r = session.request(method, url, **kwargs)
+                except Exception as e:
+                    metrics.observe_error(endpoint, e)
+                    raise
+                metrics.observe_request(endpoint, r.status_code,
+                                        time.perf_counter() - start,
+                                        _body_size(r.request.body), len(r.content))
+        except (requests.ConnectionError, requests.Timeout):
+            if not policy.can_retry(method, attempt, idempotent):
+                raise
+            delay = policy.backoff(attempt)
+        else:
+            if (r.status_code not in policy.retry_statuses
+                    or not policy.can_retry(method, attempt, idempotent)):
+                return r
+            delay = policy.backoff(attempt, r.headers.get('Retry-After'))
+
+        if metrics is not None:
+            metrics.observe_retry(endpoint)
+        time.sleep(delay)
+        attempt += 1
@@ -2,4 +2,7 @@ from .record import (ComputeUsageRecord, StorageUsageRecord,
                      AdjustmentUsageRecord, UsageRecordError,
                      UsageRecord)
 from .message import UsageMessage
+from .batch import UsageBatch
 from .response import UsageResponse, UsageResponseError, UsageStatus, FailedUsageResponse
+from .journal import UploadJournal
+from .dedup import SeenIndex
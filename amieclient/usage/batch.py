@@ -0,0 +1,369 @@
+"""
+A column-wise store of usage records, serialized without building a
+record object per row
+"""
+import json
+
+from json.encoder import encode_basestring_ascii
+
+from .message import UsageMessageException, _usage_type
+from .record import (ComputeUsageRecord, StorageUsageRecord,
+                     AdjustmentUsageRecord, _record_class)
+
+
+class _BatchSpec(object):
+    """
+    How the records of one class are laid out when serialized, matching
+    the class's as_dict()
+
+    Args:
+        required: (API name, field name) of the top-level fields that come
+            before Attributes, which must have a value for every record.
+        optional: (API name, field name) of the top-level fields that come
+            after Attributes, and are left out when None.
+    """
+    def __init__(self, record_class, required, optional):
+        self.record_class = record_class
+        self.required = required
+        self.attributes = record_class._attribute_fields
+        self.optional = optional
+        self.fields = frozenset(name for _, name in required + self.attributes + optional)
+
+
+_SPECS = {spec.record_class: spec for spec in [
+    _BatchSpec(ComputeUsageRecord,
+               required=(('Username', 'username'),
+                         ('LocalProjectID', 'local_project_id'),
+                         ('LocalRecordID', 'local_record_id'),
+                         ('Resource', 'resource'),
+                         ('SubmitTime', 'submit_time'),
+                         ('StartTime', 'start_time'),
+                         ('EndTime', 'end_time'),
+                         ('Charge', 'charge')),
+               optional=(('ParentRecordID', 'parent_record_id'),
+                         ('LocalReference', 'local_reference'))),
+    _BatchSpec(StorageUsageRecord,
+               required=(('Charge', 'charge'),
+                         ('CollectionTime', 'collection_time'),
+                         ('LocalProjectID', 'local_project_id'),
+                         ('LocalRecordID', 'local_record_id'),
+                         ('Resource', 'resource'),
+                         ('Username', 'username')),
+               optional=(('LocalReference', 'local_reference'),)),
+    _BatchSpec(AdjustmentUsageRecord,
+               required=(('AdjustmentType', 'adjustment_type'),
+                         ('Charge', 'charge'),
+                         ('StartTime', 'start_time'),
+                         ('LocalProjectID', 'local_project_id'),
+                         ('LocalRecordID', 'local_record_id'),
+                         ('Resource', 'resource'),
+                         ('Username', 'username')),
+               optional=(('Comment', 'comment'),
+                         ('LocalReference', 'local_reference'))),
+]}
+
+
+def _encode(value):
+    # The same JSON that json.dumps gives, but quicker for strings
+    if value.__class__ is str:
+        return encode_basestring_ascii(value)
+    return json.dumps(value)
+
+
+def _block(column, start, stop):
+    """
+    Values start to stop of a column, as plain Python values. Columns with a
+    tolist() method, like NumPy arrays, are only converted a block at a time.
+    """
+    values = column[start:stop]
+    if hasattr(values, 'tolist'):
+        values = values.tolist()
+    return values
+
+
+def _encode_all(values):
+    try:
+        return list(map(encode_basestring_ascii, values))
+    except TypeError:
+        # Not all strings
+        return list(map(_encode, values))
+
+
+class _BatchRow(object):
+    """
+    One record of a UsageBatch, along with its serialized JSON. Fields are
+    read from the batch's columns.
+    """
+    __slots__ = ('batch', 'index', '_json')
+
+    # Tells the chunker that _json is already filled in
+    _preencoded = True
+
+    def __init__(self, batch, index, encoded):
+        self.batch = batch
+        self.index = index
+        self._json = encoded
+
+    @property
+    def usage_type(self):
+        return self.batch.usage_type
+
+    @property
+    def record_type(self):
+        return self.batch.record_class.record_type
+
+    def __getattr__(self, name):
+        if name in self.batch._spec.fields:
+            return self.batch._value(name, self.index)
+        raise AttributeError(name)
+
+    def as_dict(self):
+        return json.loads(self._json.decode('utf-8'))
+
+    def to_record(self):
+        return self.batch._record(self.index)
+
+    def __repr__(self):
+        return "<{t} UsageBatch row: resource={r} local_record_id={l}>".format(
+            t=self.record_type, r=self.resource, l=self.local_record_id)
+
+
+class UsageBatch(object):
+    """
+    Usage records of one type, stored column by column: one list (or array)
+    of values per field, rather than one object per record. A batch is
+    validated a column at a time, and serialized straight from its columns,
+    which is much quicker than going through a record object for each row.
+
+    Columns are given as keyword arguments named for the fields of the
+    record class, as in its constructor (local_record_id, charge, node_count
+    and so on). A column can be a list, tuple, or anything that can be
+    sliced and has a tolist() method, such as a NumPy array or pandas
+    Series. Arrays are kept as they are, and only converted to Python values
+    a block of rows at a time, as they're validated and serialized. A single
+    value, such as a string, is used for every record. Optional fields can
+    be left out, or have None for the records that don't have them.
+
+    Pass a UsageBatch to UsageClient.send() in place of a UsageMessage.
+
+    Args:
+        record_type: The class of the records, or their usage type (e.g.
+            'Compute').
+        **columns: The values of each field.
+
+    Example:
+        >>> batch = UsageBatch('Compute', resource='bridges2.psc.xsede',
+        ...                    local_record_id=job_ids, username=users,
+        ...                    local_project_id=projects, charge=charges,
+        ...                    submit_time=submits, start_time=starts,
+        ...                    end_time=ends, node_count=nodes)
+        >>> usage_client.send(batch)
+    """
+    # How many rows are serialized at once while sending
+    block_size = 10000
+
+    def __init__(self, record_type, **columns):
+        self.record_class = _record_class(record_type)
+        self.usage_type = _usage_type(self.record_class)
+        spec = _SPECS.get(self.record_class)
+        if spec is None:
+            raise UsageMessageException("Can't make a UsageBatch of {}"
+                                        .format(self.record_class.__name__))
+        self._spec = spec
+        self._columns = {}
+        self._scalars = {}
+        for name, values in columns.items():
+            if hasattr(values, 'tolist') and getattr(values, 'ndim', 1) == 0:
+                # A NumPy scalar, used for every record
+                values = values.tolist()
+            if isinstance(values, (list, tuple)) or hasattr(values, 'tolist'):
+                self._columns[name] = values
+            else:
+                self._scalars[name] = values
+        self._length = len(next(iter(self._columns.values()))) if self._columns else 1
+        self.validate()
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Makes a UsageBatch from a list of usage records, all of the same type
+        """
+        records = list(records)
+        if not records:
+            raise UsageMessageException("Can't make a UsageBatch of no records")
+        record_class = records[0].__class__
+        if any(r.__class__ is not record_class for r in records):
+            raise UsageMessageException("Can't make a UsageBatch of mixed record types")
+        spec = _SPECS.get(record_class)
+        if spec is None:
+            raise UsageMessageException("Can't make a UsageBatch of {}"
+                                        .format(record_class.__name__))
+        return cls(record_class, **{name: [getattr(r, name) for r in records]
+                                    for name in spec.fields})
+
+    def validate(self):
+        """
+        Checks the columns all at once, raising a UsageMessageException for
+        unknown fields, missing required fields, or columns of different
+        lengths
+        """
+        spec = self._spec
+        names = set(self._columns) | set(self._scalars)
+        unknown = names - spec.fields
+        if unknown:
+            raise UsageMessageException('Unknown {} fields: {}'.format(
+                self.usage_type, ', '.join(sorted(unknown))))
+
+        for name, column in self._columns.items():
+            if len(column) != self._length:
+                raise UsageMessageException(
+                    'Column {} has {} values, but the batch has {} records'
+                    .format(name, len(column), self._length))
+
+        for _, name in spec.required:
+            if name in self._columns:
+                missing = self._first_none(name)
+                if missing is not None:
+                    raise UsageMessageException('Record {} has no {}'.format(missing, name))
+            elif self._scalars.get(name) is None:
+                raise UsageMessageException('Missing required field {}'.format(name))
+
+        if self.record_class is AdjustmentUsageRecord:
+            valid = AdjustmentUsageRecord.VALID_ADJUSTMENT_TYPES
+            if 'adjustment_type' in self._columns:
+                types = [t.lower() for t in
+                         _block(self._columns['adjustment_type'], 0, self._length)]
+                self._columns['adjustment_type'] = types
+                invalid = set(types) - set(valid)
+            else:
+                self._scalars['adjustment_type'] = self._scalars['adjustment_type'].lower()
+                invalid = set([self._scalars['adjustment_type']]) - set(valid)
+            if invalid:
+                raise UsageMessageException(
+                    'Adjustment types {} invalid, must be one of {}'
+                    .format(sorted(invalid), valid))
+
+    def _first_none(self, name):
+        """
+        The index of the first record with no value in a column, or None
+        """
+        column = self._columns[name]
+        if isinstance(column, (list, tuple)):
+            return column.index(None) if None in column else None
+        for start in range(0, self._length, self.block_size):
+            values = _block(column, start, start + self.block_size)
+            if None in values:
+                return start + values.index(None)
+        return None
+
+    def _value(self, name, i):
+        if name in self._columns:
+            column = self._columns[name]
+            if isinstance(column, (list, tuple)):
+                return column[i]
+            return _block(column, i, i + 1)[0]
+        return self._scalars.get(name)
+
+    def _record(self, i):
+        return self.record_class(**{name: self._value(name, i)
+                                    for name in self._spec.fields})
+
+    def to_records(self):
+        """
+        Generator that yields each row of the batch as a usage record
+        """
+        for i in range(len(self)):
+            yield self._record(i)
+
+    def _fragments(self, name, start, stop, prefix=''):
+        """
+        The serialized values of a field for rows start to stop, each
+        preceded by prefix. Missing values are None. For a single value
+        shared by every row, returns just that one fragment (or None).
+        """
+        if name in self._columns:
+            values = _block(self._columns[name], start, stop)
+            if not prefix:
+                return _encode_all(values)
+            return [None if v is None else prefix + _encode(v) for v in values]
+        value = self._scalars.get(name)
+        return None if value is None else prefix + _encode(value)
+
+    def _encode_rows(self, start, stop):
+        """
+        Serializes rows start to stop, giving the same JSON as
+        json.dumps(record.as_dict()) would for each
+        """
+        n = stop - start
+        spec = self._spec
+
+        # The required fields always appear, so they're filled in to a
+        # template. Values shared by every row go right in the template.
+        template = []
+        columns = []
+        for api_name, name in spec.required:
+            fragments = self._fragments(name, start, stop)
+            if isinstance(fragments, list):
+                template.append('"{}": %s'.format(api_name))
+                columns.append(fragments)
+            else:
+                template.append('"{}": {}'.format(api_name, fragments.replace('%', '%%')))
+        template = '{' + ', '.join(template)
+        if columns:
+            rows = [template % values for values in zip(*columns)]
+        else:
+            rows = [template % ()] * n
+
+        def per_row(fragments):
+            return fragments if isinstance(fragments, list) else [fragments] * n
+
+        if spec.attributes:
+            attributes = [per_row(self._fragments(name, start, stop, '"{}": '.format(api_name)))
+                          for api_name, name in spec.attributes
+                          if name in self._columns or self._scalars.get(name) is not None]
+            if attributes:
+                rows = ['{}, "Attributes": {{{}}}'.format(row, ', '.join(filter(None, a)))
+                        for row, a in zip(rows, zip(*attributes))]
+            else:
+                rows = [row + ', "Attributes": {}' for row in rows]
+
+        for api_name, name in spec.optional:
+            if name not in self._columns and self._scalars.get(name) is None:
+                continue
+            fragments = per_row(self._fragments(name, start, stop, ', "{}": '.format(api_name)))
+            rows = [row if f is None else row + f for row, f in zip(rows, fragments)]
+
+        return [(row + '}').encode('utf-8') for row in rows]
+
+    def __iter__(self):
+        """
+        Yields each row of the batch, serialized a block at a time
+        """
+        for start in range(0, len(self), self.block_size):
+            stop = min(start + self.block_size, len(self))
+            for i, encoded in enumerate(self._encode_rows(start, stop), start):
+                yield _BatchRow(self, i, encoded)
+
+    def __len__(self):
+        return self._length
+
+    def as_dict(self):
+        """
+        Returns a dictionary version of this batch, like UsageMessage.as_dict()
+        """
+        return {
+            'UsageType': self.usage_type,
+            'Records': [row.as_dict() for row in self],
+        }
+
+    def json(self):
+        """
+        Returns a JSON version of this batch, like UsageMessage.json(),
+        serialized straight from the columns
+        """
+        records = b', '.join(row._json for row in self).decode('utf-8')
+        return '{{"UsageType": {}, "Records": [{}]}}'.format(
+            json.dumps(self.usage_type), records)
+
+    def __repr__(self):
+        return "<UsageBatch: {s.usage_type} type, {l} records>".format(s=self, l=len(self))
@@ -0,0 +1,201 @@
+"""
+A persistent index of the usage records we've already sent, for skipping
+duplicates
+"""
+import hashlib
+import math
+import sqlite3
+import struct
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS seen (
+        id INTEGER PRIMARY KEY,
+        resource TEXT NOT NULL,
+        record_type TEXT NOT NULL,
+        local_record_id TEXT NOT NULL,
+        UNIQUE (resource, record_type, local_record_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bloom (
+        num_bits INTEGER NOT NULL,
+        num_hashes INTEGER NOT NULL,
+        last_id INTEGER NOT NULL,
+        bits BLOB NOT NULL
+    )
+    """,
+]
+
+
+class _BloomFilter(object):
+    """
+    A fixed-size Bloom filter over byte strings. Never gives false
+    negatives; gives false positives more often once it holds more than
+    it was sized for.
+    """
+    def __init__(self, num_bits, num_hashes, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        capacity = max(capacity, 1)
+        num_bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        h1, h2 = struct.unpack_from('<QQ', hashlib.sha256(key).digest())
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+def _bloom_key(key):
+    return '\x1f'.join(key).encode('utf-8')
+
+
+class SeenIndex(object):
+    """
+    A persistent set of the usage records the server has accepted, keyed by
+    (resource, record_type, local_record_id). Pass one to UsageClient.send()
+    to skip records that were already sent, such as when the time windows
+    of exports overlap.
+
+    The records are kept in an SQLite database, with a Bloom filter in front
+    of it. Most records we haven't seen are ruled out by the Bloom filter
+    alone; only the ones it can't rule out, which includes every record we
+    have seen, are looked up in the database. The Bloom filter is saved in
+    the database too, when you call save() or close().
+
+    The Bloom filter is sized when the index is first created. If the index
+    grows well past capacity, more records have to be looked up in the
+    database, but none are wrongly skipped.
+
+    Args:
+        path (str): Path of the SQLite database. It's created if it doesn't
+            exist yet.
+        capacity (int): How many records the Bloom filter is sized for.
+        error_rate (float): Fraction of unseen records the Bloom filter
+            fails to rule out, when it holds capacity records.
+
+    Example:
+        >>> with SeenIndex('sent_usage.db', capacity=50000000) as seen:
+        ...     usage_client.send(records_from_slurm(), seen_index=seen)
+    """
+    def __init__(self, path, capacity=1000000, error_rate=0.001):
+        self.path = path
+        # How many records were checked, and how many of those needed a
+        # database lookup
+        self.lookups = 0
+        self.exact_lookups = 0
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+        self._load_bloom(capacity, error_rate)
+
+    def _load_bloom(self, capacity, error_rate):
+        row = self._conn.execute(
+            'SELECT num_bits, num_hashes, last_id, bits FROM bloom').fetchone()
+        if row is None:
+            self._bloom = _BloomFilter.for_capacity(capacity, error_rate)
+            self._last_id = 0
+        else:
+            num_bits, num_hashes, self._last_id, bits = row
+            self._bloom = _BloomFilter(num_bits, num_hashes, bits)
+        # Catch up on anything added after the Bloom filter was last saved
+        self._catch_up()
+
+    def _catch_up(self):
+        cursor = self._conn.execute(
+            'SELECT id, resource, record_type, local_record_id FROM seen '
+            'WHERE id > ? ORDER BY id', (self._last_id,))
+        for row in cursor:
+            self._bloom.add(_bloom_key(row[1:]))
+            self._last_id = row[0]
+
+    @staticmethod
+    def key(record):
+        """
+        The key a usage record is indexed by
+        """
+        return (str(record.resource), str(record.record_type),
+                str(record.local_record_id))
+
+    def _contains_key(self, key):
+        self.lookups += 1
+        if _bloom_key(key) not in self._bloom:
+            return False
+        self.exact_lookups += 1
+        row = self._conn.execute(
+            'SELECT 1 FROM seen WHERE resource = ? AND record_type = ? '
+            'AND local_record_id = ?', key).fetchone()
+        return row is not None
+
+    def __contains__(self, record):
+        return self._contains_key(self.key(record))
+
+    def filter(self, records):
+        """
+        Generator that yields the records that aren't in the index
+        """
+        for record in records:
+            if not self._contains_key(self.key(record)):
+                yield record
+
+    def add(self, records):
+        """
+        Adds records to the index. Records that are already in it are
+        ignored.
+        """
+        keys = [self.key(r) for r in records]
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO seen (resource, record_type, local_record_id) '
+                'VALUES (?, ?, ?)', keys)
+        self._catch_up()
+
+    def save(self):
+        """
+        Saves the Bloom filter, so it doesn't have to be rebuilt the next
+        time the index is opened
+        """
+        with self._conn:
+            self._conn.execute('DELETE FROM bloom')
+            self._conn.execute('INSERT INTO bloom VALUES (?, ?, ?, ?)',
+                               (self._bloom.num_bits, self._bloom.num_hashes,
+                                self._last_id, bytes(self._bloom.bits)))
+
+    def close(self):
+        """
+        Saves the Bloom filter and closes the database
+        """
+        self.save()
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "<SeenIndex: {p}>".format(p=self.path)
@@ -0,0 +1,176 @@
+"""
+Readers that stream usage records from files, one at a time. Each one is a
+generator, so you can pass it straight to UsageClient.send() and upload a
+file of any size without loading it all into memory:
+
+    >>> usage_client.send(read_sacct('sacct.txt', resource='bridges2.psc.xsede'))
+
+Files can be given as paths, which are opened (and, if they end in .gz,
+decompressed) for you, or as file objects already opened in text mode.
+"""
+import csv
+import gzip
+import json
+
+from contextlib import contextmanager
+
+from .record import (ComputeUsageRecord, StorageUsageRecord,
+                     ComputeUsageAttributes, StorageUsageAttributes,
+                     UsageRecordException, _record_class)
+
+# Fields that go in a record's Attributes, rather than at the top level
+_ATTRIBUTE_FIELDS = {
+    ComputeUsageRecord: frozenset(ComputeUsageAttributes._fields),
+    StorageUsageRecord: frozenset(StorageUsageAttributes._fields),
+}
+
+# What sacct shows for the start or end time of a job that hasn't started or
+# finished
+_UNFINISHED_TIMES = frozenset(['', 'None', 'Unknown'])
+
+
+@contextmanager
+def _open_text(source, newline=None):
+    if hasattr(source, 'read'):
+        # Already open; leave closing it to whoever opened it
+        yield source
+        return
+    if str(source).endswith('.gz'):
+        f = gzip.open(source, 'rt', encoding='utf-8', newline=newline)
+    else:
+        f = open(source, 'r', encoding='utf-8', newline=newline)
+    with f:
+        yield f
+
+
+def _from_dict(record_class, d, line_num):
+    d.setdefault('Attributes', {})
+    try:
+        return record_class.from_dict(d)
+    except KeyError as e:
+        raise UsageRecordException('Line {}: missing {}'.format(line_num, e))
+
+
+def read_jsonl(source, record_type=None):
+    """
+    Generator that reads usage records from a JSON Lines file: one record
+    per line, in the same form as UsageRecord.json(). Blank lines are
+    skipped.
+
+    Args:
+        source: Path or file object to read from.
+        record_type: The class of the records, or their usage type (e.g.
+            'Compute'). If None, each line must have a UsageType, which is
+            used for that line.
+    """
+    record_class = _record_class(record_type) if record_type is not None else None
+    with _open_text(source) as f:
+        for line_num, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            d = json.loads(line)
+            usage_type = d.pop('UsageType', None)
+            if record_class is not None:
+                cls = record_class
+            elif usage_type is not None:
+                cls = _record_class(usage_type)
+            else:
+                raise UsageRecordException('Line {}: no UsageType'.format(line_num))
+            yield _from_dict(cls, d, line_num)
+
+
+def read_csv(source, record_type=ComputeUsageRecord, **csv_kwargs):
+    """
+    Generator that reads usage records from a CSV file with a header row.
+    Columns are named for the record's fields as the API names them
+    (Username, LocalProjectID, Charge and so on), with attributes like
+    NodeCount or JobName in columns of their own. Empty cells are left out.
+
+    Args:
+        source: Path or file object to read from.
+        record_type: The class of the records, or their usage type (e.g.
+            'Compute').
+        **csv_kwargs: Passed on to csv.DictReader, e.g. delimiter.
+    """
+    record_class = _record_class(record_type)
+    attribute_fields = _ATTRIBUTE_FIELDS.get(record_class, frozenset())
+    with _open_text(source, newline='') as f:
+        reader = csv.DictReader(f, **csv_kwargs)
+        for row in reader:
+            d = {}
+            attributes = {}
+            for k, v in row.items():
+                if v is None or v == '':
+                    continue
+                if k in attribute_fields:
+                    attributes[k] = v
+                else:
+                    d[k] = v
+            d['Attributes'] = attributes
+            yield _from_dict(record_class, d, reader.line_num)
+
+
+def sacct_core_hours(row):
+    """
+    The default charge for read_sacct: the job's CPU cores times its
+    elapsed hours
+    """
+    return str(round(int(row['NCPUS']) * int(row['ElapsedRaw']) / 3600.0, 4))
+
+
+def read_sacct(source, resource, charge=sacct_core_hours,
+               local_project_id=None, fieldnames=None):
+    """
+    Generator that reads compute usage records from the output of Slurm's
+    ``sacct --parsable2``. Job steps (such as 1234.batch) and jobs that
+    haven't finished are skipped.
+
+    The output needs the JobID, User, Account, Submit, Start and End
+    fields, plus NCPUS and ElapsedRaw for the default charge. JobName,
+    NNodes, NCPUS and Partition are used if they're there. For example:
+
+        sacct --parsable2 --allusers --starttime 2021-08-01 --endtime 2021-09-01 \\
+            --format JobID,JobName,User,Account,Partition,Submit,Start,End,NNodes,NCPUS,ElapsedRaw,State
+
+    sacct prints times in the local time zone of the machine it runs on,
+    unless SLURM_TIME_FORMAT says otherwise; they're passed on unchanged.
+
+    Args:
+        source: Path or file object to read from.
+        resource (str): The resource the jobs ran on, as AMIE knows it.
+        charge (callable): Takes a row of sacct output, as a dictionary, and
+            returns what to charge for the job. Defaults to core hours.
+        local_project_id (callable): Takes a row of sacct output, as a
+            dictionary, and returns the job's project ID. Defaults to the
+            job's Account.
+        fieldnames (list): The sacct fields, in order, if the output has no
+            header row (sacct --noheader).
+    """
+    with _open_text(source, newline='') as f:
+        reader = csv.DictReader(f, fieldnames=fieldnames, delimiter='|',
+                                quoting=csv.QUOTE_NONE)
+        for row in reader:
+            try:
+                job_id = row['JobID']
+                if '.' in job_id:
+                    continue
+                if row['Start'] in _UNFINISHED_TIMES or row['End'] in _UNFINISHED_TIMES:
+                    continue
+                project_id = (local_project_id(row) if local_project_id is not None
+                              else row['Account'])
+                yield ComputeUsageRecord(
+                    local_record_id=job_id,
+                    username=row['User'],
+                    local_project_id=project_id,
+                    resource=resource,
+                    submit_time=row['Submit'],
+                    start_time=row['Start'],
+                    end_time=row['End'],
+                    charge=charge(row),
+                    job_name=row.get('JobName') or None,
+                    node_count=row.get('NNodes') or None,
+                    cpu_core_count=row.get('NCPUS') or None,
+                    queue=row.get('Partition') or None,
+                )
+            except KeyError as e:
+                raise UsageRecordException('Line {}: missing {}'.format(reader.line_num, e))
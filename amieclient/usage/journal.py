@@ -0,0 +1,109 @@
+"""
+An on-disk journal of usage chunks the server has accepted, so that an
+interrupted upload can be resumed
+"""
+import hashlib
+import sqlite3
+import time
+
+from .response import UsageResponse
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    digest TEXT PRIMARY KEY,
+    usage_type TEXT NOT NULL,
+    first_local_record_id TEXT,
+    last_local_record_id TEXT,
+    record_count INTEGER NOT NULL,
+    response TEXT NOT NULL,
+    sent_at REAL NOT NULL
+)
+"""
+
+
+def _chunk_digest(chunk):
+    return hashlib.sha256(chunk.body).hexdigest()
+
+
+class UploadJournal(object):
+    """
+    Keeps track, in an SQLite database, of which chunks of a usage upload the
+    server has accepted. Pass one to UsageClient.send() and, if the upload is
+    interrupted, pass the same journal to a re-run of it: chunks that were
+    already accepted aren't sent again. Their saved responses are returned
+    instead, so the re-run returns the same list of responses as an upload
+    that went through in one go.
+
+    Chunks are identified by a digest of their request body, so a re-run
+    has to send the same records, in the same order, for earlier chunks to
+    be recognized. If a record has changed since, the chunk it's in is
+    simply sent again.
+
+    Each entry also keeps the first and last LocalRecordID in the chunk,
+    its record count, and when it was sent, for looking at by hand.
+
+    Args:
+        path (str): Path of the SQLite database. It's created if it doesn't
+            exist yet.
+
+    Example:
+        >>> with UploadJournal('backfill-2021.journal') as journal:
+        ...     responses = usage_client.send(read_records(), journal=journal)
+    """
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def response(self, chunk):
+        """
+        The UsageResponse the server gave for a chunk, or None if it hasn't
+        been accepted yet
+        """
+        row = self._conn.execute('SELECT response FROM chunks WHERE digest = ?',
+                                 (_chunk_digest(chunk),)).fetchone()
+        if row is None:
+            return None
+        return UsageResponse.from_json(row[0])
+
+    def record(self, chunk, response):
+        """
+        Records that the server accepted a chunk, with the given
+        UsageResponse. Each chunk is committed to disk as soon as it's
+        recorded.
+        """
+        first = last = None
+        if chunk.records:
+            first = chunk.records[0].local_record_id
+            last = chunk.records[-1].local_record_id
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (_chunk_digest(chunk), chunk.usage_type, first, last,
+                 len(chunk.records), response.json(), time.time()))
+
+    def entries(self):
+        """
+        The chunks recorded so far, oldest first, as a list of dictionaries
+        """
+        cursor = self._conn.execute(
+            'SELECT digest, usage_type, first_local_record_id, last_local_record_id, '
+            'record_count, response, sent_at FROM chunks ORDER BY sent_at')
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM chunks').fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "<UploadJournal: {p}>".format(p=self.path)
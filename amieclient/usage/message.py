@@ -2,6 +2,11 @@ import json
 
 from .record import _type_lookup, UsageRecord, UsageRecordError
 
+# The API has a request size limit of 1024KiB. Capping what we send at 768KiB
+# leaves ample room for overhead added by intermediate layers (reverse
+# proxies, etc)
+MAX_REQUEST_SIZE = 786432
+
 
 class UsageMessageException(Exception):
     """
@@ -10,39 +15,148 @@ class UsageMessageException(Exception):
     pass
 
 
+def _usage_type(record_class):
+    """
+    Returns the usage type name for a record class, checking that it is
+    one we know about
+    """
+    if not issubclass(record_class, UsageRecord):
+        raise UsageMessageException("Can't add something that isn't a UsageRecord")
+    rt = record_class.record_type.lower().capitalize()
+    if rt not in ['Compute', 'Storage', 'Adjustment']:
+        raise UsageMessageException('Invalid usage type {}'.format(rt))
+    return rt
+
+
+class UsageChunk:
+    """
+    A batch of UsageRecords, along with the serialized request body that
+    carries them.
+
+    Args:
+        usage_type (str): The usage type of the records ('Compute', etc)
+        records ([UsageRecord]): The records in this chunk
+        body (bytes): The JSON request body for this chunk
+    """
+    def __init__(self, usage_type, records, body):
+        self.usage_type = usage_type
+        self.records = records
+        self.body = body
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return "<UsageChunk: {s.usage_type} type, {l} records, {b} bytes>".format(
+            s=self, l=len(self), b=len(self.body))
+
+
+def _encode_records(records):
+    """
+    Generator that serializes UsageRecords one at a time, yielding (usage
+    type, record, JSON bytes) for each. Rows of a UsageBatch come already
+    serialized, and are passed through as they are.
+    """
+    record_class = None
+    preencoded = False
+    rt = None
+    for record in records:
+        # Usage types are set per class, so only look when the class changes
+        if record.__class__ is not record_class:
+            record_class = record.__class__
+            preencoded = getattr(record_class, '_preencoded', False)
+            if not preencoded:
+                rt = _usage_type(record_class)
+        if preencoded:
+            yield record.usage_type, record, record._json
+        else:
+            yield rt, record, json.dumps(record.as_dict()).encode('utf-8')
+
+
+def _chunk_records(records, max_size=MAX_REQUEST_SIZE):
+    """
+    Generator that serializes UsageRecords one at a time and yields a
+    UsageChunk as soon as adding the next record would push its body past
+    max_size bytes. Only one chunk is held in memory at a time, so records
+    can come from any iterable, including other generators.
+
+    Raises a UsageMessageException if the records are of mixed types, or if
+    a single record is too big to fit in a request on its own.
+    """
+    usage_type = None
+    head = tail = b''
+    batch = []
+    parts = []
+    size = 0
+    for rt, record, encoded in _encode_records(records):
+        if rt != usage_type:
+            if usage_type is None:
+                usage_type = rt
+                head = '{{"UsageType": {}, "Records": ['.format(json.dumps(rt)).encode('utf-8')
+                tail = b']}'
+            else:
+                raise UsageMessageException("Can't add a {} record to a {} message"
+                                            .format(rt, usage_type))
+
+        if len(head) + len(encoded) + len(tail) > max_size:
+            raise UsageMessageException('{!r} is {} bytes once serialized, which is over'
+                                        ' the {} byte request limit'
+                                        .format(record, len(encoded), max_size))
+        # Records after the first in a chunk need a separating comma
+        if batch and len(head) + size + 1 + len(encoded) + len(tail) > max_size:
+            yield UsageChunk(usage_type, batch, head + b','.join(parts) + tail)
+            batch = []
+            parts = []
+            size = 0
+        size += len(encoded) + (1 if batch else 0)
+        batch.append(record)
+        parts.append(encoded)
+
+    if batch:
+        yield UsageChunk(usage_type, batch, head + b','.join(parts) + tail)
+
+
 class _UsageRecordList:
     def __init__(self, in_list=None):
-        self._list = in_list if in_list is not None else []
+        self._list = []
         self._record_type = None
-        if not self._check_usage_type():
-            self._list = []
-            raise UsageMessageException('Cannot create a UsageMessage with mixed types')
-
-    def _check_usage_type(self):
-        if self._record_type is None and len(self._list) > 0:
-            rt = self._list[0].record_type.lower().capitalize()
-            if rt not in ['Compute', 'Storage', 'Adjustment']:
-                raise UsageMessageException('Invalid usage type {}'
-                                            .format(rt))
-            self._record_type = rt
-        # iterate over list records and check against stored type
-        return all([x.record_type.lower().capitalize() == self._record_type for x in self._list])
+        if in_list is not None:
+            self.extend(in_list)
+
+    def _check_usage_type(self, record_classes):
+        """
+        Checks the given record classes against the type of this list,
+        returning what the type of the list would be after adding them.
+        The type is fixed by the first record added, so this never needs
+        to look at the records already in the list.
+        """
+        record_type = self._record_type
+        for record_class in record_classes:
+            rt = _usage_type(record_class)
+            if record_type is None:
+                record_type = rt
+            elif rt != record_type:
+                raise UsageMessageException("Can't add a {} record to a {} message"
+                                            .format(rt, record_type))
+        return record_type
 
     def append(self, item):
-        if not isinstance(item, UsageRecord):
-            raise UsageMessageException("Can't add something that isn't a UsageRecord")
-        if (self._record_type is not None and
-                item.record_type != self._record_type):
-            raise UsageMessageException("Can't add a {} record to a {} message"
-                                        .format(item.record_type, self._record_type))
+        self._record_type = self._check_usage_type([item.__class__])
         self._list.append(item)
-        if not self._check_usage_type():
-            self._list.pop()
-            raise UsageMessageException('Cannot create a UsageMessage with mixed types')
 
     def extend(self, items):
-        for item in items:
-            self.append(item)
+        """
+        Adds all of the given records. Every record is checked in a single
+        pass before any are added, so a bad record leaves the list unchanged.
+        """
+        items = list(items)
+        # Usage types are set per class, so we only need to check each
+        # distinct class once, rather than every record
+        self._record_type = self._check_usage_type(set(map(type, items)))
+        self._list.extend(items)
+
+    def __iter__(self):
+        return iter(self._list)
 
     def __getitem__(self, i):
         return self._list.__getitem__(i)
@@ -1,6 +1,6 @@
 import json
 from collections import namedtuple, defaultdict
-from abc import ABC, abstractmethod
+from abc import ABCMeta, abstractmethod
 
 ComputeUsageAttributes = namedtuple('ComputeUsageAttributes',
                                     ['NodeCount', 'CpuCoreCount',
@@ -26,10 +26,28 @@ class UsageRecordException(Exception):
     pass
 
 
-class UsageRecord(ABC):
+class UsageRecord(metaclass=ABCMeta):
     """
     Abstract base class for a usage record
     """
+    # Records are held by the million in big uploads, so none of them get a
+    # per-instance __dict__
+    __slots__ = ()
+
+    # (API name, attribute name) of each field in the record's Attributes
+    _attribute_fields = ()
+
+    def _attributes_dict(self):
+        """
+        The record's Attributes, skipping over anything not specified
+        """
+        attributes = {}
+        for api_name, name in self._attribute_fields:
+            v = getattr(self, name)
+            if v is not None:
+                attributes[api_name] = v
+        return attributes
+
     @classmethod
     @abstractmethod
     def from_dict(cls, input_dict):
@@ -72,6 +90,17 @@ class ComputeUsageRecord(UsageRecord):
     """
     record_type = 'compute'
 
+    _attribute_fields = (('NodeCount', 'node_count'),
+                         ('CpuCoreCount', 'cpu_core_count'),
+                         ('JobName', 'job_name'),
+                         ('Memory', 'memory'),
+                         ('Queue', 'queue'))
+
+    __slots__ = ('node_count', 'cpu_core_count', 'job_name', 'memory', 'queue',
+                 'parent_record_id', 'charge', 'end_time', 'local_project_id',
+                 'local_record_id', 'local_reference', 'resource',
+                 'start_time', 'submit_time', 'username')
+
     def __init__(self, *,
                  parent_record_id=None, queue=None, cpu_core_count=None,
                  job_name=None, memory=None, local_reference=None, charge,
@@ -106,10 +135,13 @@ class ComputeUsageRecord(UsageRecord):
             ComputeUsageRecord
         """
 
-        self.attributes = ComputeUsageAttributes(node_count, cpu_core_count,
-                                                 job_name, memory, queue)
+        self.node_count = node_count
+        self.cpu_core_count = cpu_core_count
+        self.job_name = job_name
+        self.memory = memory
+        self.queue = queue
 
-        self.parent_record_id = parent_record_id,
+        self.parent_record_id = parent_record_id
         self.charge = charge
         self.end_time = end_time
         self.local_project_id = local_project_id
@@ -144,16 +176,24 @@ class ComputeUsageRecord(UsageRecord):
             local_reference=input_dict.get('LocalReference'),
         )
 
+    @property
+    def attributes(self):
+        """
+        The record's attributes, as a ComputeUsageAttributes
+        """
+        return ComputeUsageAttributes(self.node_count, self.cpu_core_count,
+                                      self.job_name, self.memory, self.queue)
+
+    @attributes.setter
+    def attributes(self, attributes):
+        (self.node_count, self.cpu_core_count, self.job_name, self.memory,
+         self.queue) = attributes
+
     def as_dict(self):
         """
         Returns a dictionary version of this record
         """
-
-        # Get the attributes, skip over anything not specified
-        attributes = {}
-        for k, v in self.attributes._asdict().items():
-            if v is not None:
-                attributes[k] = v
+        attributes = self._attributes_dict()
 
         d = {
             'Username': self.username,
@@ -177,7 +217,6 @@ class ComputeUsageRecord(UsageRecord):
 
 
 class StorageUsageRecord(UsageRecord):
-    record_type = 'storage'
     """
     A usage record for storage usage.
 
@@ -214,17 +253,41 @@ class StorageUsageRecord(UsageRecord):
         user_copies (str): Number of copies of the data the user has chosen
                            to keep
     """
+    record_type = 'storage'
+
+    _attribute_fields = (('BytesRead', 'bytes_read'),
+                         ('BytesStored', 'bytes_stored'),
+                         ('BytesWritten', 'bytes_written'),
+                         ('CollectionInterval', 'collection_interval'),
+                         ('FileCount', 'file_count'),
+                         ('FilesRead', 'files_read'),
+                         ('FilesWritten', 'files_written'),
+                         ('MediaType', 'media_type'),
+                         ('SystemCopies', 'system_copies'),
+                         ('UserCopies', 'user_copies'))
+
+    __slots__ = ('bytes_read', 'bytes_stored', 'bytes_written',
+                 'collection_interval', 'file_count', 'files_read',
+                 'files_written', 'media_type', 'system_copies', 'user_copies',
+                 'charge', 'collection_time', 'local_project_id',
+                 'local_record_id', 'local_reference', 'resource', 'username')
+
     def __init__(self, charge, collection_time, local_project_id,
                  local_record_id, resource, username,
                  bytes_read=None, bytes_stored=None, bytes_written=None,
                  collection_interval=None, file_count=None, files_read=None,
                  files_written=None, media_type=None, system_copies=None,
                  user_copies=None, local_reference=None):
-        self.attributes = StorageUsageAttributes(bytes_read, bytes_stored,
-                                                 bytes_written, collection_interval,
-                                                 file_count, files_read,
-                                                 files_written, media_type,
-                                                 system_copies, user_copies)
+        self.bytes_read = bytes_read
+        self.bytes_stored = bytes_stored
+        self.bytes_written = bytes_written
+        self.collection_interval = collection_interval
+        self.file_count = file_count
+        self.files_read = files_read
+        self.files_written = files_written
+        self.media_type = media_type
+        self.system_copies = system_copies
+        self.user_copies = user_copies
         self.charge = charge
         self.collection_time = collection_time
         self.local_project_id = local_project_id
@@ -241,11 +304,11 @@ class StorageUsageRecord(UsageRecord):
             collection_time=input_dict['CollectionTime'],
             local_project_id=input_dict['LocalProjectID'],
             local_record_id=input_dict['LocalRecordID'],
-            record=input_dict['Resource'],
+            resource=input_dict['Resource'],
             username=input_dict['Username'],
             bytes_read=attributes.get('BytesRead'),
             bytes_stored=attributes.get('BytesStored'),
-            bytes_writen=attributes.get('BytesWritten'),
+            bytes_written=attributes.get('BytesWritten'),
             collection_interval=attributes.get('CollectionInterval'),
             file_count=attributes.get('FileCount'),
             files_read=attributes.get('FilesRead'),
@@ -256,12 +319,21 @@ class StorageUsageRecord(UsageRecord):
             local_reference=input_dict.get('LocalReference'),
         )
 
+    @property
+    def attributes(self):
+        """
+        The record's attributes, as a StorageUsageAttributes
+        """
+        return StorageUsageAttributes(*[getattr(self, name)
+                                        for _, name in self._attribute_fields])
+
+    @attributes.setter
+    def attributes(self, attributes):
+        for (_, name), v in zip(self._attribute_fields, attributes):
+            setattr(self, name, v)
+
     def as_dict(self):
-        # Get the attributes, skip over anything not specified
-        attributes = {}
-        for k, v in self.attributes._asdict().items():
-            if v is not None:
-                attributes[k] = v
+        attributes = self._attributes_dict()
 
         d = {
             'Charge': self.charge,
@@ -318,6 +390,10 @@ class AdjustmentUsageRecord(UsageRecord):
     VALID_ADJUSTMENT_TYPES = ['credit', 'refund', 'storage-credit', 'debit',
                               'reservation', 'storage-debit']
 
+    __slots__ = ('adjustment_type', 'charge', 'start_time', 'local_project_id',
+                 'local_record_id', 'local_reference', 'resource', 'username',
+                 'comment')
+
     def __init__(self, adjustment_type, charge, start_time, local_project_id,
                  local_record_id, resource, username, comment=None,
                  local_reference=None):
@@ -409,7 +485,7 @@ class UsageRecordError:
 
     def as_dict(self):
         d = {
-            'UsageType': self.record.record_type,
+            'UsageType': self.record.record_type.lower().capitalize(),
             'Error': self.error
         }
         if self.failed_record_id is not None:
@@ -446,3 +522,13 @@ def _type_lookup(ut):
         raise UsageRecordException('Invalid usage type {}'.format(ut))
 
     return ur_class
+
+
+def _record_class(record_type):
+    """
+    Gets a record class from a record class, or a usage type name like
+    'Compute'
+    """
+    if isinstance(record_type, type) and issubclass(record_type, UsageRecord):
+        return record_type
+    return _type_lookup(str(record_type).lower().capitalize())
@@ -19,6 +19,21 @@ class UsageResponse:
         message = input_dict['Message']
         return cls(message=message, failed_records=records)
 
+    @classmethod
+    def merge(cls, responses):
+        """
+        Combines a list of UsageResponses, such as those returned for a
+        chunked upload, into one. The failed records of every response are
+        kept, in order, and each distinct message is kept once.
+        """
+        messages = []
+        failed_records = []
+        for r in responses:
+            if r.message not in messages:
+                messages.append(r.message)
+            failed_records.extend(r.failed_records)
+        return cls(message='\n'.join(messages), failed_records=failed_records)
+
     @classmethod
     def from_json(cls, input_json):
         d = json.loads(input_json)
@@ -0,0 +1,70 @@
+"""
+Compares Packet.from_dict throughput when timestamps are parsed with
+dateutil (as they used to be) against the ISO 8601 fast path.
+
+Usage (with amieclient installed, e.g. via pip install -e .):
+    python benchmarks/bench_packet_decode.py [num_packets]
+"""
+import sys
+import time
+
+from dateutil.parser import parse as dtparse
+
+from amieclient.packet import Packet
+from amieclient.packet import base
+from amieclient.test.fixtures import DEMO_JSON_PKT_1
+
+# A project packet, so there are Date keys in the body to parse as well
+DEMO_NPC = {
+    'DATA_TYPE': 'Packet',
+    'type': 'notify_project_create',
+    'header': dict(DEMO_JSON_PKT_1['header']),
+    'body': {
+        'GrantNumber': 'IRI120015',
+        'ProjectID': 'CMU139',
+        'ResourceList': ['comet-gpu.sdsc.xsede'],
+        'StartDate': '2021-08-24',
+        'EndDate': '2022-08-23',
+        'ServiceUnitsAllocated': '1000',
+    }
+}
+
+
+def decode(packets, read_timestamp):
+    for d in packets:
+        pkt = Packet.from_dict(d)
+        if read_timestamp:
+            pkt.packet_timestamp
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n=10000):
+    packets = [DEMO_JSON_PKT_1, DEMO_NPC] * (n // 2)
+
+    fast_parse = base._parse_datetime
+    base._parse_datetime = dtparse
+    try:
+        old = best_of(lambda: decode(packets, True))
+    finally:
+        base._parse_datetime = fast_parse
+    new = best_of(lambda: decode(packets, True))
+    deferred = best_of(lambda: decode(packets, False))
+
+    print('{} packets'.format(len(packets)))
+    print('{:>34} {:>10} {:>14}'.format('', 'time (s)', 'packets/s'))
+    for name, t in [('dateutil', old),
+                    ('fast path', new),
+                    ('fast path, timestamp never read', deferred)]:
+        print('{:>34} {:>10.4f} {:>14.0f}'.format(name, t, len(packets) / t))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,98 @@
+"""
+Compares how quickly packets can be decoded and archived as JSON when they
+are encoded the way they used to be (walking every data dict, then parsing
+and re-formatting the timestamp) against the current encoder, with and
+without the orjson backend.
+
+Usage (with amieclient installed, e.g. via pip install -e .):
+    python benchmarks/bench_packet_encode.py [num_packets]
+"""
+import json
+import sys
+import time
+
+from datetime import datetime
+
+from dateutil.tz import tzutc
+
+from amieclient.packet import Packet
+from amieclient.packet import base
+from amieclient.test.fixtures import DEMO_JSON_PKT_1, DEMO_JSON_PKT_2
+
+
+def old_json(pkt):
+    # Packet.as_dict() and Packet.json() as they were before
+    data_body = {}
+    for d in [pkt._required_data, pkt._allowed_data, pkt.additional_data]:
+        for k, v in d.items():
+            if isinstance(v, datetime):
+                data_body[k] = v.isoformat()
+            elif v is not None:
+                data_body[k] = v
+    header = {
+        'packet_rec_id': pkt.packet_rec_id,
+        'packet_id': pkt.packet_id,
+        'transaction_id': pkt.transaction_id,
+        'trans_rec_id': pkt.trans_rec_id,
+        'expected_reply_list': pkt.expected_reply,
+        'local_site_name': pkt.local_site_name,
+        'remote_site_name': pkt.remote_site_name,
+        'originating_site_name': pkt.originating_site_name,
+        'outgoing_flag': pkt.outgoing_flag,
+        'transaction_state': pkt.transaction_state,
+        'packet_state': pkt.packet_state,
+        'packet_timestamp': pkt.packet_timestamp,
+    }
+    if pkt.in_reply_to_id:
+        header['in_reply_to'] = pkt.in_reply_to_id
+    if pkt.client_state:
+        header['client_state'] = pkt.client_state
+    if pkt.client_json:
+        header['client_json'] = pkt.client_json
+    d = {'DATA_TYPE': 'Packet', 'type': pkt.packet_type,
+         'body': data_body, 'header': header}
+    if pkt.type_id is not None:
+        d['type_id'] = pkt.type_id
+    if d['header']['packet_timestamp'] is not None:
+        d['header']['packet_timestamp'] = (d['header']['packet_timestamp']
+                                           .astimezone(tzutc())
+                                           .isoformat()
+                                           .split('+', 1)[0][:-3] + 'Z')
+    else:
+        del d['header']['packet_timestamp']
+    return json.dumps(d)
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n=10000):
+    dicts = [DEMO_JSON_PKT_1, DEMO_JSON_PKT_2] * (n // 2)
+    for d in dicts:
+        assert (json.loads(old_json(Packet.from_dict(d))) ==
+                json.loads(Packet.from_dict(d).json()))
+
+    # Decoding each packet, then archiving it as JSON
+    old = best_of(lambda: [old_json(Packet.from_dict(d)) for d in dicts])
+    new = best_of(lambda: [Packet.from_dict(d).json() for d in dicts])
+    results = [('as it was', old), ('current encoder', new)]
+    if base.orjson is not None:
+        fast = best_of(lambda: [Packet.from_dict(d).json(fast=True) for d in dicts])
+        results.append(('current encoder, orjson', fast))
+
+    print('{} packets, decoded then serialized'.format(len(dicts)))
+    print('{:>28} {:>10} {:>14}'.format('', 'time (s)', 'packets/s'))
+    for name, t in results:
+        print('{:>28} {:>10.4f} {:>14.0f}'.format(name, t, len(dicts) / t))
+    if base.orjson is None:
+        print('(orjson is not installed)')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
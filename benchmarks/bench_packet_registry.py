@@ -0,0 +1,73 @@
+"""
+Compares decoding a 10k-packet PacketList using the packet type registry
+against the old linear scan over Packet.__subclasses__().
+
+Usage (with amieclient installed, e.g. via pip install -e .):
+    python benchmarks/bench_packet_registry.py [num_packets]
+"""
+import copy
+import sys
+import time
+
+from amieclient.packet import Packet, PacketList, PacketInvalidType
+from amieclient.packet.base import _packet_types
+from amieclient.test.fixtures import DEMO_JSON_PKT_1
+
+
+def linear_find_packet_type(cls, packet_type):
+    # The lookup as it was before the registry
+    for subclass in Packet.__subclasses__():
+        if subclass._packet_type == packet_type:
+            return subclass
+    raise PacketInvalidType(packet_type)
+
+
+def make_packet_list(n):
+    # Spread the packets over every type, so the linear scan has to go
+    # through a representative number of classes
+    types = sorted(_packet_types)
+    result = []
+    for i in range(n):
+        pkt = copy.deepcopy(DEMO_JSON_PKT_1)
+        pkt['type'] = types[i % len(types)]
+        pkt['header']['packet_rec_id'] = i
+        result.append(pkt)
+    return {'message': '', 'result': result}
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n=10000):
+    data = make_packet_list(n)
+    types = [d['type'] for d in data['result']]
+
+    lookup_registry = best_of(lambda: [Packet._find_packet_type(t) for t in types])
+    decode_registry = best_of(lambda: PacketList.from_dict(data))
+
+    registry_find = Packet.__dict__['_find_packet_type']
+    Packet._find_packet_type = classmethod(linear_find_packet_type)
+    try:
+        lookup_linear = best_of(lambda: [Packet._find_packet_type(t) for t in types])
+        decode_linear = best_of(lambda: PacketList.from_dict(data))
+    finally:
+        Packet._find_packet_type = registry_find
+
+    print('{} packets, {} packet types'.format(n, len(_packet_types)))
+    print('{:>10} {:>14} {:>14} {:>16}'.format('', 'lookup (s)', 'decode (s)',
+                                               'per packet (us)'))
+    for name, lookup, decode in [('linear', lookup_linear, decode_linear),
+                                 ('registry', lookup_registry, decode_registry)]:
+        print('{:>10} {:>14.4f} {:>14.4f} {:>16.2f}'.format(name, lookup, decode,
+                                                            decode / n * 1e6))
+    print('Saved per packet: {:.2f}us'.format((decode_linear - decode_registry) / n * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
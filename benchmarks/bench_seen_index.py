@@ -0,0 +1,61 @@
+"""
+Times adding records to a SeenIndex, and filtering a batch of records that
+are mostly new against it, as the index grows.
+
+Usage (with amieclient installed, e.g. via pip install -e .):
+    python benchmarks/bench_seen_index.py [max_records] [batch_size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from amieclient.usage import ComputeUsageRecord, SeenIndex
+
+
+def make_records(start, n):
+    return [ComputeUsageRecord(charge='1.0',
+                               end_time='2021-08-24T15:47:51Z',
+                               local_project_id='TST123',
+                               local_record_id=str(i),
+                               resource='test.psc.xsede',
+                               start_time='2021-08-24T14:47:51Z',
+                               submit_time='2021-08-24T14:40:00Z',
+                               username='testuser',
+                               node_count='1')
+            for i in range(start, start + n)]
+
+
+def main(max_records=1000000, batch_size=10000):
+    path = os.path.join(tempfile.mkdtemp(), 'seen.db')
+    seen = SeenIndex(path, capacity=max_records)
+    print('{:>10} {:>12} {:>14} {:>14}'.format('indexed', 'add (s)', 'filter (s)',
+                                               'db lookups'))
+    indexed = 0
+    target = batch_size
+    while indexed < max_records:
+        new = make_records(indexed, target - indexed)
+        start = time.perf_counter()
+        for i in range(0, len(new), batch_size):
+            seen.add(new[i:i + batch_size])
+        add_time = time.perf_counter() - start
+        indexed = target
+
+        # A batch that overlaps the index by 10%, like an export whose time
+        # window overlaps the last one
+        overlap = batch_size // 10
+        batch = make_records(indexed - overlap, batch_size)
+        seen.exact_lookups = 0
+        start = time.perf_counter()
+        kept = list(seen.filter(batch))
+        filter_time = time.perf_counter() - start
+        assert len(kept) == batch_size - overlap
+
+        print('{:>10} {:>12.4f} {:>14.4f} {:>14}'.format(indexed, add_time, filter_time,
+                                                         seen.exact_lookups))
+        target = min(target * 10, max_records)
+    seen.close()
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,57 @@
+"""
+Compares serializing usage for upload from a list of ComputeUsageRecords
+against serializing the same usage from a column-wise UsageBatch.
+
+Usage (with amieclient installed, e.g. via pip install -e .):
+    python benchmarks/bench_usage_batch.py [num_records]
+"""
+import json
+import sys
+import time
+
+from amieclient.usage import ComputeUsageRecord, UsageBatch
+from amieclient.usage.message import _chunk_records
+
+
+def make_columns(n):
+    return dict(local_record_id=[str(i) for i in range(n)],
+                username=['user{}'.format(i % 100) for i in range(n)],
+                local_project_id=['TST{}'.format(i % 10) for i in range(n)],
+                charge=[str(i % 64) for i in range(n)],
+                node_count=[str(i % 4 + 1) for i in range(n)],
+                job_name=[None if i % 3 else 'job' for i in range(n)],
+                resource='test.psc.xsede',
+                submit_time='2021-08-24T14:40:00Z',
+                start_time='2021-08-24T14:47:51Z',
+                end_time='2021-08-24T15:47:51Z')
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(num_records=300000):
+    columns = make_columns(num_records)
+    batch = UsageBatch(ComputeUsageRecord, **columns)
+    records = list(batch.to_records())
+
+    def chunk_records():
+        return [c.body for c in _chunk_records(records)]
+
+    def chunk_batch():
+        return [c.body for c in _chunk_records(batch)]
+
+    assert ([json.loads(body.decode('utf-8')) for body in chunk_records()] ==
+            [json.loads(body.decode('utf-8')) for body in chunk_batch()])
+    print('{:>10} {:>14} {:>14}'.format('records', 'records (s)', 'batch (s)'))
+    print('{:>10} {:>14.3f} {:>14.3f}'.format(num_records, best_of(chunk_records),
+                                              best_of(chunk_batch)))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
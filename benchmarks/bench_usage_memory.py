@@ -0,0 +1,68 @@
+"""
+Measures how much memory a batch of usage records takes, and how long it
+takes to build and serialize them.
+
+Usage (with amieclient installed, e.g. via pip install -e .):
+    python benchmarks/bench_usage_memory.py [num_records]
+"""
+import sys
+import time
+import tracemalloc
+
+from amieclient.usage import ComputeUsageRecord, StorageUsageRecord
+
+
+def make_compute_records(n):
+    return [ComputeUsageRecord(charge='1.0',
+                               end_time='2021-08-24T15:47:51Z',
+                               local_project_id='TST123',
+                               local_record_id=str(i),
+                               resource='test.psc.xsede',
+                               start_time='2021-08-24T14:47:51Z',
+                               submit_time='2021-08-24T14:40:00Z',
+                               username='testuser',
+                               node_count='1',
+                               cpu_core_count='64',
+                               queue='RM')
+            for i in range(n)]
+
+
+def make_storage_records(n):
+    return [StorageUsageRecord(charge='1.0',
+                               collection_time='2021-08-24T14:47:51Z',
+                               local_project_id='TST123',
+                               local_record_id=str(i),
+                               resource='test.psc.xsede',
+                               username='testuser',
+                               bytes_stored='1000000',
+                               file_count='10')
+            for i in range(n)]
+
+
+def measure(name, make, n):
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = make(n)
+    build_time = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for r in records:
+        r.as_dict()
+    as_dict_time = time.perf_counter() - start
+
+    print('{:>10} {:>10} {:>12.1f} {:>14.1f} {:>12.2f} {:>12.2f}'.format(
+        name, n, size / 2 ** 20, size / n, build_time, as_dict_time))
+
+
+def main(num_records=1000000):
+    print('{:>10} {:>10} {:>12} {:>14} {:>12} {:>12}'.format(
+        'type', 'records', 'memory (MiB)', 'bytes/record', 'build (s)',
+        'as_dict (s)'))
+    measure('compute', make_compute_records, num_records)
+    measure('storage', make_storage_records, num_records)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,56 @@
+"""
+Times building UsageMessages of increasing size, to check that adding
+records stays linear in the number of records.
+
+Usage (with amieclient installed, e.g. via pip install -e .):
+    python benchmarks/bench_usage_message.py [max_records]
+"""
+import sys
+import time
+
+from amieclient.usage import ComputeUsageRecord, UsageMessage
+
+
+def make_records(n):
+    return [ComputeUsageRecord(charge='1.0',
+                               end_time='2021-08-24T15:47:51Z',
+                               local_project_id='TST123',
+                               local_record_id=str(i),
+                               resource='test.psc.xsede',
+                               start_time='2021-08-24T14:47:51Z',
+                               submit_time='2021-08-24T14:40:00Z',
+                               username='testuser',
+                               node_count='1')
+            for i in range(n)]
+
+
+def main(max_records=1000000):
+    records = make_records(max_records)
+    print('{:>10} {:>12} {:>12} {:>14}'.format('records', 'init (s)', 'extend (s)',
+                                               'append (s)'))
+    n = 1000
+    while n <= max_records:
+        subset = records[:n]
+
+        start = time.perf_counter()
+        UsageMessage(subset)
+        init_time = time.perf_counter() - start
+
+        message = UsageMessage([])
+        start = time.perf_counter()
+        message.records.extend(iter(subset))
+        extend_time = time.perf_counter() - start
+
+        message = UsageMessage([])
+        start = time.perf_counter()
+        for r in subset:
+            message.records.append(r)
+        append_time = time.perf_counter() - start
+
+        print('{:>10} {:>12.4f} {:>12.4f} {:>14.4f}'.format(n, init_time, extend_time,
+                                                            append_time))
+        n *= 10
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
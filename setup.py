@@ -13,7 +13,9 @@ setup(
         "python-dateutil>=2.8.1,<2.9;python_version>='3.7'"
     ],
     extras_require={
-        'tests': ['requests-mock>=1.9.3,<1.10.0']
+        'tests': ['requests-mock>=1.9.3,<1.10.0'],
+        'async': ['aiohttp>=3.6,<4'],
+        'fast': ["orjson>=3.0,<4;python_version>='3.6'"],
     },
     author='G. Ryan Sablosky',
     author_email='sablosky@psc.edu',